@@ -64,7 +64,9 @@ def process_agent_response(response: dict) -> AgentResponse:
 async def chat_with_agent():
     try:
         user_query = "Explain the concept of photosynthesis as per the syllabus."
-        response = agent_executor.invoke({"input": user_query})
+        response = agent_executor.invoke(
+            {"input": user_query}, {"metadata": {"chain": "agent"}}
+        )
         structured_response = process_agent_response(response)
         return structured_response
     except Exception as e:
@@ -11,11 +11,20 @@ from routes import (
     class_assignment_student,
     classroom_assignment_admin,
     mermaid_gen_test,
+    signed_upload,
+    transcription_webhook,
+    metrics,
 )
 from fastapi import FastAPI, status
 from contextlib import asynccontextmanager
 from utils.db_util import lifespan_manager
+from services.ingestion_service import start_ingestion_workers, stop_ingestion_workers
+from services.reevaluation_service import resume_reevaluations, stop_reevaluations
+from services.submission_service import resume_transcriptions, stop_transcriptions
+from utils.chroma_util import load_query_embedding_cache, save_query_embedding_cache
 from fastapi.middleware.cors import CORSMiddleware
+from utils.idempotency_util import IdempotencyMiddleware
+from utils.llm_telemetry_util import RequestTagMiddleware
 from routes.fcm_route import notification_service_router
 
 # from agent.classroom_ai_agent import agent_router
@@ -26,7 +35,15 @@ from routes.fcm_route import notification_service_router
 async def lifespan(app: FastAPI):
     # Startup
     async with lifespan_manager():
+        load_query_embedding_cache()
+        await start_ingestion_workers()
+        await resume_reevaluations()
+        await resume_transcriptions()
         yield
+        await stop_transcriptions()
+        await stop_reevaluations()
+        await stop_ingestion_workers()
+        save_query_embedding_cache()
 
 
 # Create FastAPI instance with lifespan
@@ -37,6 +54,10 @@ app = FastAPI(
     description="A FastAPI application with Prisma & NeonDB",
 )
 
+# replays responses of retried requests sent with an Idempotency-Key
+# (added first so it runs inside CORS)
+app.add_middleware(IdempotencyMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -46,6 +67,9 @@ app.add_middleware(
     allow_credentials=True,
 )
 
+# tags llm calls with the route (and class) of the request that made them
+app.add_middleware(RequestTagMiddleware)
+
 # Auth routes
 app.include_router(auth.router)
 
@@ -64,10 +88,18 @@ app.include_router(class_assignment_student.router)
 
 app.include_router(classroom_meetings.router)
 
+# direct-to-cloudinary upload routes
+app.include_router(signed_upload.router)
+
+# assemblyai transcript callbacks
+app.include_router(transcription_webhook.router)
+
 app.include_router(mermaid_gen_test.router)
 
 app.include_router(notification_service_router)
 
+app.include_router(metrics.router)
+
 # app.include_router(agent_router)
 
 
@@ -0,0 +1,14 @@
+-- CreateTable
+CREATE TABLE "FileAsset" (
+    "id" TEXT NOT NULL,
+    "sha256" TEXT NOT NULL,
+    "fileUrl" TEXT NOT NULL,
+    "pages" TEXT[] DEFAULT ARRAY[]::TEXT[],
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "FileAsset_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "FileAsset_sha256_key" ON "FileAsset"("sha256");
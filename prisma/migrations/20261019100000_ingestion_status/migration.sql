@@ -0,0 +1,12 @@
+-- CreateEnum
+CREATE TYPE "IngestionStatus" AS ENUM ('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED');
+
+-- AlterTable
+ALTER TABLE "Classroom" ADD COLUMN     "ingestionStatus" "IngestionStatus" NOT NULL DEFAULT 'PENDING';
+
+-- AlterTable
+ALTER TABLE "Material" ADD COLUMN     "ingestionStatus" "IngestionStatus" NOT NULL DEFAULT 'PENDING';
+
+-- existing rows were indexed inline before the queue existed
+UPDATE "Classroom" SET "ingestionStatus" = 'COMPLETED';
+UPDATE "Material" SET "ingestionStatus" = 'COMPLETED';
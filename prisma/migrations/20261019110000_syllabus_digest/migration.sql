@@ -0,0 +1,18 @@
+-- CreateTable
+CREATE TABLE "SyllabusDigest" (
+    "id" TEXT NOT NULL,
+    "outline" TEXT[] DEFAULT ARRAY[]::TEXT[],
+    "keyTerms" TEXT[] DEFAULT ARRAY[]::TEXT[],
+    "pages" JSONB NOT NULL,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+    "classroomId" TEXT NOT NULL,
+
+    CONSTRAINT "SyllabusDigest_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "SyllabusDigest_classroomId_key" ON "SyllabusDigest"("classroomId");
+
+-- AddForeignKey
+ALTER TABLE "SyllabusDigest" ADD CONSTRAINT "SyllabusDigest_classroomId_fkey" FOREIGN KEY ("classroomId") REFERENCES "Classroom"("id") ON DELETE CASCADE ON UPDATE CASCADE;
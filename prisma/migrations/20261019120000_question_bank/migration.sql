@@ -0,0 +1,42 @@
+-- CreateTable
+CREATE TABLE "QuestionPool" (
+    "id" TEXT NOT NULL,
+    "topic" TEXT NOT NULL,
+    "difficulty" TEXT NOT NULL,
+    "title" TEXT NOT NULL,
+    "description" TEXT NOT NULL,
+    "requests" INTEGER NOT NULL DEFAULT 0,
+    "lastRequestedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "lastToppedUpAt" TIMESTAMP(3),
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+    "classroomId" TEXT NOT NULL,
+
+    CONSTRAINT "QuestionPool_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateTable
+CREATE TABLE "BankQuestion" (
+    "id" TEXT NOT NULL,
+    "question" TEXT NOT NULL,
+    "options" TEXT[],
+    "answer" INTEGER NOT NULL,
+    "contentHash" TEXT NOT NULL,
+    "timesServed" INTEGER NOT NULL DEFAULT 0,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "poolId" TEXT NOT NULL,
+
+    CONSTRAINT "BankQuestion_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "QuestionPool_classroomId_topic_difficulty_key" ON "QuestionPool"("classroomId", "topic", "difficulty");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "BankQuestion_poolId_contentHash_key" ON "BankQuestion"("poolId", "contentHash");
+
+-- AddForeignKey
+ALTER TABLE "QuestionPool" ADD CONSTRAINT "QuestionPool_classroomId_fkey" FOREIGN KEY ("classroomId") REFERENCES "Classroom"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- AddForeignKey
+ALTER TABLE "BankQuestion" ADD CONSTRAINT "BankQuestion_poolId_fkey" FOREIGN KEY ("poolId") REFERENCES "QuestionPool"("id") ON DELETE CASCADE ON UPDATE CASCADE;
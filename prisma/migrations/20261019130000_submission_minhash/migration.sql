@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "Submission" ADD COLUMN     "minhash" INTEGER[] DEFAULT ARRAY[]::INTEGER[];
@@ -0,0 +1,27 @@
+-- CreateEnum
+CREATE TYPE "ReevaluationStatus" AS ENUM ('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', 'CANCELED');
+
+-- CreateTable
+CREATE TABLE "ReevaluationJob" (
+    "id" TEXT NOT NULL,
+    "status" "ReevaluationStatus" NOT NULL DEFAULT 'PENDING',
+    "total" INTEGER NOT NULL DEFAULT 0,
+    "processed" INTEGER NOT NULL DEFAULT 0,
+    "rescored" INTEGER NOT NULL DEFAULT 0,
+    "skipped" INTEGER NOT NULL DEFAULT 0,
+    "failed" INTEGER NOT NULL DEFAULT 0,
+    "cursor" TEXT,
+    "error" TEXT,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+    "finishedAt" TIMESTAMP(3),
+    "assignmentId" TEXT NOT NULL,
+
+    CONSTRAINT "ReevaluationJob_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "ReevaluationJob_assignmentId_idx" ON "ReevaluationJob"("assignmentId");
+
+-- AddForeignKey
+ALTER TABLE "ReevaluationJob" ADD CONSTRAINT "ReevaluationJob_assignmentId_fkey" FOREIGN KEY ("assignmentId") REFERENCES "Assignment"("id") ON DELETE CASCADE ON UPDATE CASCADE;
@@ -0,0 +1,19 @@
+-- CreateEnum
+CREATE TYPE "IdempotencyStatus" AS ENUM ('PROCESSING', 'COMPLETED');
+
+-- CreateTable
+CREATE TABLE "IdempotencyKey" (
+    "id" TEXT NOT NULL,
+    "fingerprint" TEXT NOT NULL,
+    "status" "IdempotencyStatus" NOT NULL DEFAULT 'PROCESSING',
+    "statusCode" INTEGER,
+    "contentType" TEXT,
+    "body" TEXT,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "expiresAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "IdempotencyKey_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "IdempotencyKey_expiresAt_idx" ON "IdempotencyKey"("expiresAt");
@@ -0,0 +1,5 @@
+-- AlterTable
+ALTER TABLE "VoiceSubmission" ADD COLUMN     "transcriptId" TEXT;
+
+-- CreateIndex
+CREATE UNIQUE INDEX "VoiceSubmission_transcriptId_key" ON "VoiceSubmission"("transcriptId");
@@ -3,9 +3,11 @@ from io import BytesIO
 import cloudinary.uploader
 from utils.db_util import get_db
 from utils.cloudinary_util import *
-from utils.aai_util import aai_transcriber
 from utils.user_util import get_current_student
-from scripts.assignment_eval import evaluate_assignment
+from utils.llm_telemetry_util import llm_tags
+from services.similarity_service import index_submission
+from services.evaluation_service import evaluate_answer
+from services.submission_service import start_voice_transcription
 from fastapi import APIRouter, HTTPException, Depends, status, Path, UploadFile, File
 from schemas.assignment import (
     AssignmentTypeEnum,
@@ -173,9 +175,12 @@ async def submit_text_assignment(
                 "assignmentId": assignmentId,
             }
         )
-        eval_result: AssignmentEvalOutput = await evaluate_assignment(
-            existing_assignment.question, existing_assignment.referenceAns, data.content
-        )
+        with llm_tags(class_id=existing_assignment.classroomId):
+            eval_result: AssignmentEvalOutput = await evaluate_answer(
+                existing_assignment.question,
+                existing_assignment.referenceAns,
+                data.content,
+            )
         await db.textsubmission.create(
             data={
                 "content": data.content,
@@ -186,6 +191,7 @@ async def submit_text_assignment(
                 "improvements": eval_result.areas_for_improvement,
             }
         )
+        await index_submission(db, assignmentId, submission.id, data.content)
         return {
             "detail": "Text assignment submitted successfully",
         }
@@ -215,33 +221,20 @@ async def submit_voice_assignment(
         if not file_bytes:
             raise HTTPException(status_code=400, detail="Empty audio file.")
 
-        async def upload_file() -> str:
-            file_res = cloudinary.uploader.upload(
-                BytesIO(file_bytes),
-                resource_type="auto",
-                folder=f"submissions/{assignmentId}/{student.id}",
-                access_mode="public",
-            )
-            if not file_res:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="file upload failed",
-                )
-            return file_res.get("secure_url")
-
-        async def transcribe_file() -> str:
-            transcript = aai_transcriber.transcribe(BytesIO(file_bytes))
-            if transcript.status == "error":
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Transcription failed: {transcript.error}",
-                )
-            return transcript.text
-
-        file_url, transcript_text = await asyncio.gather(
-            upload_file(),
-            transcribe_file(),
+        # stored once; assemblyai transcribes from the url, and the answer is
+        # evaluated when the transcript comes back
+        file_res = await asyncio.to_thread(
+            cloudinary.uploader.upload,
+            BytesIO(file_bytes),
+            resource_type="auto",
+            folder=f"submissions/{assignmentId}/{student.id}",
+            access_mode="public",
         )
+        if not file_res:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="file upload failed",
+            )
 
         submission = await db.submission.create(
             data={
@@ -249,27 +242,21 @@ async def submit_voice_assignment(
                 "assignmentId": assignmentId,
             }
         )
-
-        eval_result: AssignmentEvalOutput = await evaluate_assignment(
-            existing_assignment.question,
-            existing_assignment.referenceAns,
-            transcript_text,
-        )
-
-        await db.voicesubmission.create(
+        voice_submission = await db.voicesubmission.create(
             data={
-                "fileUrl": file_url,
-                "score": eval_result.score,
-                "transcript": transcript_text,
+                "fileUrl": file_res.get("secure_url"),
                 "submissionId": submission.id,
-                "feedback": eval_result.feedback,
-                "strengths": eval_result.strengths,
-                "improvements": eval_result.areas_for_improvement,
             }
         )
+        await start_voice_transcription(
+            voice_submission_id=voice_submission.id,
+            file_url=voice_submission.fileUrl,
+            db=db,
+        )
 
         return {
             "detail": "Voice assignment submitted successfully",
+            "submissionId": submission.id,
         }
     except Exception as e:
         raise HTTPException(
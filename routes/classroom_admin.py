@@ -1,7 +1,7 @@
-import os
 from dotenv import load_dotenv
-from utils.chroma_util import syllabus_vector_store
 from utils.db_util import get_db
+from services.ingestion_service import enqueue_syllabus, enqueue_class_deletion
+from utils.content_store_util import sha256_hex, find_file_asset, save_file_asset
 from utils.user_util import get_current_teacher
 from schemas.classroom import CreateOrUpdateClassRoom
 from utils.class_code_util import gen_class_code_recommended
@@ -15,11 +15,9 @@ from fastapi import (
     UploadFile,
     Form,
 )
-import tempfile
 from io import BytesIO
 from utils.cloudinary_util import *
 import cloudinary.uploader
-from langchain_community.document_loaders import PyPDFLoader
 
 load_dotenv()
 
@@ -43,18 +41,25 @@ async def create_classroom(
                 detail="Classroom with this code already exists",
             )
         file_bytes = await syllabus.read()
-        file_res = cloudinary.uploader.upload(
-            BytesIO(file_bytes),
-            resource_type="auto",
-            folder=f"syllabus/{code}",
-            access_mode="public",
-        )
-        if not file_res:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="file upload failed",
+        sha256 = sha256_hex(file_bytes)
+        # identical bytes were uploaded before, reuse the stored file
+        file_asset = await find_file_asset(db, sha256)
+        if file_asset:
+            file_url = file_asset.fileUrl
+        else:
+            file_res = cloudinary.uploader.upload(
+                BytesIO(file_bytes),
+                resource_type="auto",
+                folder=f"syllabus/{code}",
+                access_mode="public",
             )
-        file_url = file_res.get("secure_url")
+            if not file_res:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="file upload failed",
+                )
+            file_url = file_res.get("secure_url")
+            await save_file_asset(db, sha256, file_url)
         db_classroom = await db.classroom.create(
             data={
                 "name": name,
@@ -69,14 +74,8 @@ async def create_classroom(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create classroom",
             )
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(file_bytes)
-            tmp_path = tmp.name
-        loader = PyPDFLoader(tmp_path)
-        docs = loader.load()
-        for doc in docs:
-            doc.metadata["class_id"] = db_classroom.id
-        syllabus_vector_store.add_documents(docs)
+        # parse/embed runs on the ingestion queue, see classroom.ingestionStatus
+        await enqueue_syllabus(db_classroom.id, file_url, file_bytes)
         return {
             "message": "Classroom created successfully",
             "classroom": db_classroom,
@@ -89,9 +88,6 @@ async def create_classroom(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal Server Error",
         )
-    finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
 
 
 @router.get("/classrooms", status_code=status.HTTP_200_OK)
@@ -180,6 +176,7 @@ async def delete_classroom(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Classroom not found"
             )
         await db.classroom.delete(where={"id": classId})
+        await enqueue_class_deletion(classId)
         return {"detail": "Classroom deleted successfully"}
     except HTTPException:
         raise
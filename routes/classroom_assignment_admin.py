@@ -1,7 +1,21 @@
 from utils.db_util import get_db
-from schemas.assignment import AssignmentBase
+from schemas.assignment import AssignmentBase, AssignmentUpdate
 from utils.user_util import get_current_teacher
-from fastapi import APIRouter, HTTPException, Depends, status, Path, BackgroundTasks
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Depends,
+    status,
+    Path,
+    Query,
+    BackgroundTasks,
+)
+from services.reevaluation_service import start_reevaluation, latest_reevaluation
+from services.similarity_service import (
+    SIMILARITY_THRESHOLD,
+    similarity_clusters,
+    forget_similarity_index,
+)
 from utils.background_tasks_util import get_tokens_and_send_notification
 
 router = APIRouter(prefix="/assignment", tags=["Classroom Assignment Admin"])
@@ -98,6 +112,7 @@ async def delete_assignment(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
             )
         await db.assignment.delete(where={"id": assignment_id})
+        forget_similarity_index(assignment_id)
         return {"detail": f"Assignment {assignment_id} deleted successfully"}
     except Exception as e:
         raise HTTPException(
@@ -133,3 +148,129 @@ async def get_assignment_submissions(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
+
+
+# groups of near-identical answers (minhash/lsh over the answer text)
+@router.get("/{assignment_id}/similarity", status_code=status.HTTP_200_OK)
+async def get_assignment_similarity(
+    assignment_id: str = Path(..., description="ID of the assignment"),
+    threshold: float = Query(SIMILARITY_THRESHOLD, ge=0.5, le=1.0),
+    teacher=Depends(get_current_teacher),
+    db=Depends(get_db),
+):
+    try:
+        assignment = await db.assignment.find_unique(
+            where={"id": assignment_id, "teacherId": teacher.id}
+        )
+        if not assignment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
+            )
+        clusters = await similarity_clusters(db, assignment_id, threshold)
+        return {"threshold": threshold, "clusters": clusters}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+# changing the question or reference answer re-scores the existing
+# submissions in the background unless reevaluate=false
+@router.patch("/{assignment_id}", status_code=status.HTTP_200_OK)
+async def update_assignment(
+    data: AssignmentUpdate,
+    assignment_id: str = Path(..., description="ID of the assignment"),
+    reevaluate: bool = Query(True),
+    teacher=Depends(get_current_teacher),
+    db=Depends(get_db),
+):
+    try:
+        existing_assignment = await db.assignment.find_unique(
+            where={"id": assignment_id, "teacherId": teacher.id}
+        )
+        if not existing_assignment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
+            )
+        changes = data.model_dump(exclude_none=True)
+        assignment = await db.assignment.update(
+            where={"id": assignment_id}, data=changes
+        )
+        job = None
+        rubric_changed = any(
+            changes.get(field, getattr(existing_assignment, field))
+            != getattr(existing_assignment, field)
+            for field in ("question", "referenceAns")
+        )
+        if reevaluate and rubric_changed:
+            job = await start_reevaluation(db, assignment_id)
+        return {
+            "assignment": assignment,
+            "reevaluation": job,
+            "detail": "Assignment updated successfully",
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+# re-score every submission with the current question and reference answer;
+# resume=true continues the last failed job from its checkpoint
+@router.post("/{assignment_id}/reevaluate", status_code=status.HTTP_202_ACCEPTED)
+async def reevaluate_assignment(
+    assignment_id: str = Path(..., description="ID of the assignment"),
+    resume: bool = Query(False),
+    teacher=Depends(get_current_teacher),
+    db=Depends(get_db),
+):
+    try:
+        assignment = await db.assignment.find_unique(
+            where={"id": assignment_id, "teacherId": teacher.id}
+        )
+        if not assignment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
+            )
+        job = await start_reevaluation(db, assignment_id, resume)
+        return {"reevaluation": job, "detail": "Re-evaluation started"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@router.get("/{assignment_id}/reevaluate", status_code=status.HTTP_200_OK)
+async def get_reevaluation_progress(
+    assignment_id: str = Path(..., description="ID of the assignment"),
+    teacher=Depends(get_current_teacher),
+    db=Depends(get_db),
+):
+    try:
+        assignment = await db.assignment.find_unique(
+            where={"id": assignment_id, "teacherId": teacher.id}
+        )
+        if not assignment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
+            )
+        job = await latest_reevaluation(db, assignment_id)
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No re-evaluation for this assignment",
+            )
+        progress = min(1.0, job.processed / job.total) if job.total else 1.0
+        return {"reevaluation": job, "progress": round(progress, 3)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
@@ -1,14 +1,12 @@
 import cloudinary.uploader
 from utils.db_util import get_db
 from utils.cloudinary_util import *
-import os
-import tempfile
 from io import BytesIO
 from dotenv import load_dotenv
-from utils.chroma_util import class_material_vector_store
 from prisma.errors import RecordNotFoundError
 from utils.user_util import get_current_teacher
-from langchain_community.document_loaders import PyPDFLoader
+from services.ingestion_service import enqueue_material, enqueue_material_deletion
+from utils.content_store_util import sha256_hex, find_file_asset, save_file_asset
 from fastapi import (
     Form,
     Path,
@@ -43,18 +41,25 @@ async def create_material(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Classroom not found"
             )
         file_bytes = await file.read()
-        file_res = cloudinary.uploader.upload(
-            BytesIO(file_bytes),
-            resource_type="auto",
-            folder=f"materials/{classroomId}",
-            access_mode="public",
-        )
-        if not file_res:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="file upload failed",
+        sha256 = sha256_hex(file_bytes)
+        # identical bytes were uploaded before, reuse the stored file
+        file_asset = await find_file_asset(db, sha256)
+        if file_asset:
+            file_url = file_asset.fileUrl
+        else:
+            file_res = cloudinary.uploader.upload(
+                BytesIO(file_bytes),
+                resource_type="auto",
+                folder=f"materials/{classroomId}",
+                access_mode="public",
             )
-        file_url = file_res.get("secure_url")
+            if not file_res:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="file upload failed",
+                )
+            file_url = file_res.get("secure_url")
+            await save_file_asset(db, sha256, file_url)
         material = await db.material.create(
             data={
                 "title": title,
@@ -68,15 +73,8 @@ async def create_material(
                 detail="Material creation failed",
             )
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(file_bytes)
-            tmp_path = tmp.name
-        loader = PyPDFLoader(tmp_path)
-        docs = loader.load()
-        for doc in docs:
-            doc.metadata["material_id"] = material.id
-            doc.metadata["class_id"] = existing_class.id
-        class_material_vector_store.add_documents(docs)
+        # parse/embed runs on the ingestion queue, see material.ingestionStatus
+        await enqueue_material(existing_class.id, material.id, file_url, file_bytes)
 
         background_tasks.add_task(
             get_tokens_and_send_notification,
@@ -92,9 +90,6 @@ async def create_material(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
-    finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
 
 
 @router.get("/materials/{classroom_id}", status_code=status.HTTP_200_OK)
@@ -133,8 +128,15 @@ async def delete_material(
     db=Depends(get_db),
 ):
     try:
-        await db.material.delete(where={"id": material_id})
+        material = await db.material.delete(where={"id": material_id})
+        if not material:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Material not found"
+            )
+        await enqueue_material_deletion(material.classroomId, material.id)
         return {"detail": "Material deleted successfully"}
+    except HTTPException:
+        raise
     except RecordNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Material not found"
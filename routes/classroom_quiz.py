@@ -1,14 +1,29 @@
-import asyncio
+import json
+import time
 from typing import List
 from dotenv import load_dotenv
 from utils.db_util import get_db
-from utils.gemini_util import gemini
-from langchain.prompts import PromptTemplate
-from langchain.output_parsers import PydanticOutputParser
+from fastapi.responses import StreamingResponse
 from utils.user_util import get_current_user, get_current_student
 from fastapi import APIRouter, HTTPException, Depends, status, Path, BackgroundTasks
-from schemas.classroom import ClassQuizBody, QuizResponse, QuizResponseSub
-from utils.chroma_util import syllabus_vector_store, class_material_vector_store
+from schemas.classroom import ClassQuizBody, QuizResponseSub
+from utils.metrics_util import increment, observe
+from utils.llm_telemetry_util import llm_tags
+from utils.syllabus_digest_util import topic_in_scope
+from services.syllabus_digest_service import get_syllabus_digest
+from services.quiz_generation_service import (
+    quiz_llm,
+    question_key,
+    build_quiz_inputs,
+    valid_questions,
+    distinct_questions,
+    stream_quiz_questions,
+)
+from services.question_bank_service import (
+    add_to_bank,
+    sample_from_bank,
+    record_pool_request,
+)
 from utils.background_tasks_util import get_tokens_and_send_notification
 
 load_dotenv()
@@ -16,43 +31,24 @@ load_dotenv()
 router = APIRouter(prefix="/quiz", tags=["Classroom Quiz"])
 
 
-parser = PydanticOutputParser(pydantic_object=QuizResponse)
-
-template = PromptTemplate(
-    input_variables=[
-        "title",
-        "topic",
-        "syllabus",
-        "materials",
-        "difficulty",
-        "description",
-        "number_of_questions",
-    ],
-    partial_variables={"format_instruction": parser.get_format_instructions()},
-    template="""
-        You are an expert educational content creator.
-
-        Task: Generate {number_of_questions} high-quality questions based on the given details.
-
-        Title: {title}
-        Topic: {topic}
-        Difficulty: {difficulty}
-        Description: {description}
-        Syllabus: {syllabus}
-        Materials: {materials}
-
-        Guidelines:
-        - Ensure all questions are strictly within the provided syllabus, class materials and aligned with the description and topic.
-        - Match the difficulty level accurately:
-            - Easy: basic recall or understanding
-            - Medium: requires some reasoning or multi-step thinking
-            - Hard: advanced critical thinking, problem-solving, or application
-        - Questions should be diverse (not repeating the same structure).
-        - Avoid vague or ambiguous wording.
-
-        {format_instruction}
-    """,
-)
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# returns the class's syllabus digest (if any) for building the prompt, and
+# whether the topic looks covered by it (retrieval is skipped when it doesn't)
+async def _check_quiz_request(data: ClassQuizBody, db):
+    existing_class = await db.classroom.find_first(where={"id": data.class_id})
+    if not existing_class:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Classroom with this {data.class_id} is not exists",
+        )
+    digest = await get_syllabus_digest(db, data.class_id)
+    in_scope = not digest or topic_in_scope(data.topic, digest.vocabulary)
+    if not in_scope:
+        increment("quiz.out_of_scope")
+    return digest, in_scope
 
 
 @router.post("/generate", status_code=status.HTTP_201_CREATED)
@@ -60,57 +56,112 @@ async def generate_quiz(
     data: ClassQuizBody, user=Depends(get_current_user), db=Depends(get_db)
 ):
     try:
-        existing_class = await db.classroom.find_first(where={"id": data.class_id})
-        if not existing_class:
-            return HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Classroom with this {data.class_id} is not exists",
+        digest, in_scope = await _check_quiz_request(data, db)
+        # serve from the class's question bank first, generate only the shortfall
+        pool = await record_pool_request(db, data)
+        questions = await sample_from_bank(db, pool.id, data.number_of_questions)
+        shortfall = data.number_of_questions - len(questions)
+        title, description = data.title, data.description
+        if shortfall > 0:
+            with llm_tags(class_id=data.class_id):
+                inputs = await build_quiz_inputs(data, digest, in_scope)
+                inputs["number_of_questions"] = shortfall
+                result = await quiz_llm.ainvoke(inputs)
+            title, description = result.title, result.description
+            seen = {question_key(q) for q in questions}
+            generated = distinct_questions(
+                valid_questions(result.questions), seen, shortfall
             )
-        query = f"{data.title}, {data.topic}, {data.description}"
-        docs_syllabus, docs_materials = await asyncio.gather(
-            asyncio.to_thread(
-                syllabus_vector_store.similarity_search,
-                query,
-                2,
-                {"class_id": data.class_id},
-            ),
-            asyncio.to_thread(
-                class_material_vector_store.similarity_search,
-                query,
-                4,
-                {"class_id": data.class_id},
-            ),
-        )
-        syllabus = "\n".join([doc.page_content for doc in docs_syllabus])
-        materials = "\n".join([doc.page_content for doc in docs_materials])
-        chain = template | gemini | parser
-        result = chain.invoke(
-            {
-                "title": data.title,
-                "topic": data.topic,
-                "syllabus": syllabus,
-                "materials": materials,
-                "difficulty": data.difficulty,
-                "description": data.description,
-                "number_of_questions": data.number_of_questions,
-            }
-        )
-        formatted_questions = [q.dict() for q in result.questions]
+            await add_to_bank(db, pool.id, generated)
+            questions += generated
+        increment("quiz.questions_from_bank", data.number_of_questions - shortfall)
+        formatted_questions = [q.dict() for q in questions]
         quiz = await db.quiz.create(
             data={
-                "title": result.title,
-                "description": result.description,
+                "title": title,
+                "description": description,
                 "creatorId": user.id,
                 "classroomId": data.class_id,
                 "questions": {"create": formatted_questions},
             }
         )
         return {"quiz": quiz, "detail": "Quiz generated successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+# same as /generate, but questions are sent (and saved) as server-sent events
+# while they are generated: a "quiz" event, one "question" event per question,
+# then "done" or "error"
+@router.post("/generate/stream", status_code=status.HTTP_200_OK)
+async def generate_quiz_stream(
+    data: ClassQuizBody, user=Depends(get_current_user), db=Depends(get_db)
+):
+    try:
+        digest, in_scope = await _check_quiz_request(data, db)
+        pool = await record_pool_request(db, data)
+        banked = await sample_from_bank(db, pool.id, data.number_of_questions)
+        quiz = await db.quiz.create(
+            data={
+                "title": data.title,
+                "description": data.description,
+                "creatorId": user.id,
+                "classroomId": data.class_id,
+            }
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
         )
 
+    # banked questions go out right away, the shortfall streams from the llm
+    async def questions():
+        for question in banked:
+            yield question
+        shortfall = data.number_of_questions - len(banked)
+        if shortfall > 0:
+            with llm_tags(class_id=data.class_id):
+                inputs = await build_quiz_inputs(data, digest, in_scope)
+                seen = {question_key(q) for q in banked}
+                async for question in stream_quiz_questions(inputs, shortfall, seen):
+                    await add_to_bank(db, pool.id, [question])
+                    yield question
+
+    async def events():
+        started = time.perf_counter()
+        saved = 0
+        yield sse_event("quiz", {"id": quiz.id, "title": quiz.title})
+        try:
+            async for question in questions():
+                db_question = await db.question.create(
+                    data={**question.dict(), "quizId": quiz.id}
+                )
+                if saved == 0:
+                    observe("quiz.first_question", time.perf_counter() - started)
+                saved += 1
+                yield sse_event("question", db_question.dict())
+            if saved == 0:
+                await db.quiz.delete(where={"id": quiz.id})
+                yield sse_event("error", {"detail": "No questions could be generated"})
+                return
+            observe("quiz.stream_total", time.perf_counter() - started)
+            yield sse_event("done", {"quiz_id": quiz.id, "questions": saved})
+        except Exception as e:
+            print(f"Quiz stream error: {e}")
+            yield sse_event("error", {"detail": str(e), "questions": saved})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @router.get("/all/{class_id}", status_code=status.HTTP_200_OK)
 async def get_all_quizzes_of_class(
@@ -1,14 +1,11 @@
-from utils.gemini_util import gemini
 from langchain.prompts import PromptTemplate
 from fastapi import APIRouter, HTTPException, status
-from langchain_core.output_parsers import PydanticOutputParser
+from utils.llm_util import StructuredLLM, format_instruction
 from schemas.mermaid import MermaidCodeResponse, MermaidRequest
 
-parser = PydanticOutputParser(pydantic_object=MermaidCodeResponse)
-
 prompt = PromptTemplate(
     input_variables=["user_query"],
-    partial_variables={"format_instruction": parser.get_format_instructions()},
+    partial_variables={"format_instruction": format_instruction(MermaidCodeResponse)},
     template="""
     You are a professional Mermaid diagram expert and code generator. Your role is to create clean, well-structured Mermaid diagrams based on user requirements.
 
@@ -116,15 +113,17 @@ prompt = PromptTemplate(
     """,
 )
 
+mermaid_llm = StructuredLLM(
+    "mermaid", prompt, MermaidCodeResponse, cache=True, semantic_fields=("user_query",)
+)
+
 router = APIRouter(prefix="/mermaid", tags=["Mermaid Generation"])
 
 
 @router.post("/generate", status_code=status.HTTP_200_OK)
 async def gen_mermaid(data: MermaidRequest):
     try:
-        chain = prompt | gemini | parser
-
-        result = chain.invoke(
+        result = await mermaid_llm.ainvoke(
             {
                 "user_query": data.query,
             }
@@ -0,0 +1,39 @@
+from utils.db_util import get_db
+from utils.metrics_util import snapshot, set_gauge
+from utils.user_util import get_current_teacher
+from utils.llm_telemetry_util import llm_telemetry
+from fastapi import APIRouter, HTTPException, Depends, status
+from services.ingestion_service import ingestion_queue
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("", status_code=status.HTTP_200_OK)
+async def get_metrics(teacher=Depends(get_current_teacher)):
+    try:
+        set_gauge("ingestion.queue_depth", ingestion_queue.qsize())
+        return snapshot()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+# llm and embedding usage since start, per chain, route and (the teacher's
+# own) class
+@router.get("/llm", status_code=status.HTTP_200_OK)
+async def get_llm_usage(teacher=Depends(get_current_teacher), db=Depends(get_db)):
+    try:
+        usage = llm_telemetry.summary()
+        classrooms = await db.classroom.find_many(where={"teacherId": teacher.id})
+        own = {classroom.id for classroom in classrooms}
+        usage["class_id"] = {
+            class_id: totals
+            for class_id, totals in usage["class_id"].items()
+            if class_id in own
+        }
+        return usage
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
@@ -0,0 +1,265 @@
+from utils.db_util import get_db
+from utils.user_util import get_current_user, get_current_teacher, get_current_student
+from utils.class_code_util import gen_class_code_recommended
+from utils.cloudinary_util import generate_upload_signature, verify_signed_upload
+from utils.content_store_util import find_owned_file_asset
+from utils.background_tasks_util import get_tokens_and_send_notification
+from services.submission_service import start_voice_transcription
+from services.ingestion_service import enqueue_syllabus, enqueue_material
+from fastapi import APIRouter, HTTPException, Depends, status, BackgroundTasks
+from schemas.upload import (
+    UploadPurposeEnum,
+    ConfirmVoiceUpload,
+    UploadSignatureRequest,
+    ConfirmMaterialUpload,
+    ConfirmClassroomUpload,
+)
+
+router = APIRouter(prefix="/upload", tags=["Signed Upload"])
+
+
+# confirm without an upload only works for bytes this teacher already uses
+async def resolve_known_file(sha256: str | None, teacher_id: str, db) -> str:
+    file_asset = (
+        await find_owned_file_asset(db, sha256, teacher_id) if sha256 else None
+    )
+    if not file_asset:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="upload or a known sha256 is required",
+        )
+    return file_asset.fileUrl
+
+
+@router.post("/signature", status_code=status.HTTP_200_OK)
+async def get_upload_signature(
+    data: UploadSignatureRequest,
+    user=Depends(get_current_user),
+    db=Depends(get_db),
+):
+    try:
+        if data.purpose == UploadPurposeEnum.SYLLABUS:
+            if user.role != "TEACHER":
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="User is not a teacher",
+                )
+            code = await gen_class_code_recommended()
+            folder = f"syllabus/{code}"
+
+        elif data.purpose == UploadPurposeEnum.MATERIAL:
+            if user.role != "TEACHER":
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="User is not a teacher",
+                )
+            existing_class = await db.classroom.find_unique(
+                where={"id": data.classroomId or ""}
+            )
+            if not existing_class:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Classroom not found",
+                )
+            folder = f"materials/{existing_class.id}"
+
+        else:
+            if user.role != "STUDENT":
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="User is not a student",
+                )
+            existing_assignment = await db.assignment.find_unique(
+                where={"id": data.assignmentId or "", "type": "VOICE"}
+            )
+            if not existing_assignment:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Assignment not found",
+                )
+            folder = f"submissions/{existing_assignment.id}/{user.id}"
+
+        # same bytes already in one of the teacher's classes, the client can
+        # confirm with just the hash
+        if data.sha256 and data.purpose != UploadPurposeEnum.VOICE:
+            file_asset = await find_owned_file_asset(db, data.sha256, user.id)
+            if file_asset:
+                response = {"upload": None, "fileUrl": file_asset.fileUrl}
+                if data.purpose == UploadPurposeEnum.SYLLABUS:
+                    response["code"] = code
+                return response
+
+        return {"upload": generate_upload_signature(folder)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@router.post("/classroom/confirm", status_code=status.HTTP_201_CREATED)
+async def confirm_classroom_upload(
+    data: ConfirmClassroomUpload,
+    db=Depends(get_db),
+    teacher=Depends(get_current_teacher),
+):
+    try:
+        if data.upload:
+            # public id looks like syllabus/{code}/{uuid}
+            parts = data.upload.public_id.split("/")
+            code = parts[1] if len(parts) == 3 else ""
+            if not verify_signed_upload(
+                public_id=data.upload.public_id,
+                version=data.upload.version,
+                signature=data.upload.signature,
+                secure_url=data.upload.secure_url,
+                folder=f"syllabus/{code}",
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid upload"
+                )
+            file_url = data.upload.secure_url
+        else:
+            file_url = await resolve_known_file(data.sha256, teacher.id, db)
+            code = await gen_class_code_recommended()
+        existing_class = await db.classroom.find_first(where={"code": code})
+        if existing_class:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Classroom with this code already exists",
+            )
+        db_classroom = await db.classroom.create(
+            data={
+                "name": data.name,
+                "description": data.description,
+                "teacherId": teacher.id,
+                "code": code,
+                "syllabusUrl": file_url,
+            }
+        )
+
+        await enqueue_syllabus(db_classroom.id, db_classroom.syllabusUrl)
+
+        return {
+            "message": "Classroom created successfully",
+            "classroom": db_classroom,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@router.post("/material/confirm", status_code=status.HTTP_201_CREATED)
+async def confirm_material_upload(
+    data: ConfirmMaterialUpload,
+    background_tasks: BackgroundTasks,
+    db=Depends(get_db),
+    teacher=Depends(get_current_teacher),
+):
+    try:
+        existing_class = await db.classroom.find_unique(where={"id": data.classroomId})
+        if not existing_class:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Classroom not found"
+            )
+        if data.upload:
+            if not verify_signed_upload(
+                public_id=data.upload.public_id,
+                version=data.upload.version,
+                signature=data.upload.signature,
+                secure_url=data.upload.secure_url,
+                folder=f"materials/{existing_class.id}",
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid upload"
+                )
+            file_url = data.upload.secure_url
+        else:
+            file_url = await resolve_known_file(data.sha256, teacher.id, db)
+        material = await db.material.create(
+            data={
+                "title": data.title,
+                "fileUrl": file_url,
+                "classroomId": existing_class.id,
+            }
+        )
+
+        await enqueue_material(existing_class.id, material.id, material.fileUrl)
+        background_tasks.add_task(
+            get_tokens_and_send_notification,
+            title=f"New 📖 Added to {existing_class.name}",
+            body=material.title,
+            class_id=existing_class.id,
+            db=db,
+            sub_route="/materials",
+        )
+
+        return {"material": material}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
+
+
+@router.post("/voice/confirm", status_code=status.HTTP_201_CREATED)
+async def confirm_voice_upload(
+    data: ConfirmVoiceUpload,
+    background_tasks: BackgroundTasks,
+    db=Depends(get_db),
+    student=Depends(get_current_student),
+):
+    try:
+        existing_assignment = await db.assignment.find_unique(
+            where={"id": data.assignmentId, "type": "VOICE"}
+        )
+        if not existing_assignment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found"
+            )
+        if not verify_signed_upload(
+            public_id=data.upload.public_id,
+            version=data.upload.version,
+            signature=data.upload.signature,
+            secure_url=data.upload.secure_url,
+            folder=f"submissions/{existing_assignment.id}/{student.id}",
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid upload"
+            )
+        submission = await db.submission.create(
+            data={
+                "studentId": student.id,
+                "assignmentId": existing_assignment.id,
+            }
+        )
+        voice_submission = await db.voicesubmission.create(
+            data={
+                "fileUrl": data.upload.secure_url,
+                "submissionId": submission.id,
+            }
+        )
+
+        # assemblyai transcribes from the url; evaluation follows its callback
+        background_tasks.add_task(
+            start_voice_transcription,
+            voice_submission_id=voice_submission.id,
+            file_url=voice_submission.fileUrl,
+            db=db,
+        )
+
+        return {
+            "detail": "Voice assignment submitted successfully",
+            "submissionId": submission.id,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
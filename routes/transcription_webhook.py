@@ -0,0 +1,34 @@
+from typing import Optional
+from utils.db_util import get_db
+from utils.aai_util import AAI_WEBHOOK_SECRET
+from schemas.voice_assignment import TranscriptWebhook
+from services.submission_service import complete_voice_transcription
+from fastapi import APIRouter, HTTPException, Depends, status, Header, BackgroundTasks
+
+router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
+
+
+# assemblyai calls this when a submitted voice answer is transcribed
+@router.post("/assemblyai", status_code=status.HTTP_200_OK)
+async def assemblyai_webhook(
+    data: TranscriptWebhook,
+    background_tasks: BackgroundTasks,
+    x_webhook_secret: Optional[str] = Header(None),
+    db=Depends(get_db),
+):
+    try:
+        if AAI_WEBHOOK_SECRET and x_webhook_secret != AAI_WEBHOOK_SECRET:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid webhook"
+            )
+        # evaluation happens after the response so assemblyai is not kept waiting
+        background_tasks.add_task(
+            complete_voice_transcription, db, data.transcript_id
+        )
+        return {"detail": "Transcript received"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e)
+        )
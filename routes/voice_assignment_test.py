@@ -4,11 +4,10 @@
 
 from io import BytesIO
 from dotenv import load_dotenv
-from utils.gemini_util import gemini
 from utils.aai_util import aai_transcriber
 from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
 from schemas.voice_assignment import VoiceAssignmentOutputFormat
+from utils.llm_util import StructuredLLM, format_instruction
 from fastapi import APIRouter, HTTPException, status, UploadFile, File
 
 load_dotenv()
@@ -28,8 +27,6 @@ A thread is a lightweight unit of execution within a process that shares the sam
 Threads are faster to create and switch between compared to processes because they avoid the overhead of separate memory allocation."""
 
 
-parser = PydanticOutputParser(pydantic_object=VoiceAssignmentOutputFormat)
-
 prompt = PromptTemplate(
     template="""
     You are an expert examiner with extensive experience in educational assessment. Your role is to provide constructive, detailed feedback that helps students learn and improve.
@@ -69,7 +66,13 @@ prompt = PromptTemplate(
     {format_instruction}
     """,
     input_variables=["question", "base_answer", "user_answer"],
-    partial_variables={"format_instruction": parser.get_format_instructions()},
+    partial_variables={
+        "format_instruction": format_instruction(VoiceAssignmentOutputFormat)
+    },
+)
+
+voice_eval_llm = StructuredLLM(
+    "voice_eval", prompt, VoiceAssignmentOutputFormat, cache=True
 )
 
 
@@ -114,9 +117,7 @@ async def voice_assignment(audio_ans: UploadFile = File(...)):
 
         print(transcript.text)
 
-        chain = prompt | gemini | parser
-
-        result = chain.invoke(
+        result = await voice_eval_llm.ainvoke(
             {
                 "question": question,
                 "base_answer": base_answer,
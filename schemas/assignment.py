@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from enum import Enum
-from typing import List
+from typing import List, Optional
 
 
 class AssignmentTypeEnum(str, Enum):
@@ -16,6 +16,13 @@ class AssignmentBase(BaseModel):
     type: AssignmentTypeEnum
 
 
+class AssignmentUpdate(BaseModel):
+    title: Optional[str] = None
+    dueDate: Optional[str] = None
+    question: Optional[str] = None
+    referenceAns: Optional[str] = None
+
+
 class TextAssignmentSubmission(BaseModel):
     content: str
 
@@ -33,3 +40,13 @@ class AssignmentEvalOutput(BaseModel):
     areas_for_improvement: List[str] = Field(
         description="Specific areas where the response could be enhanced"
     )
+
+
+class AnswerEvaluation(AssignmentEvalOutput):
+    answer_id: int = Field(description="Number of the student answer being evaluated")
+
+
+class BatchEvalOutput(BaseModel):
+    evaluations: List[AnswerEvaluation] = Field(
+        description="One evaluation per student answer, in the order given"
+    )
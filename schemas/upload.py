@@ -0,0 +1,44 @@
+from enum import Enum
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class UploadPurposeEnum(str, Enum):
+    SYLLABUS = "SYLLABUS"
+    MATERIAL = "MATERIAL"
+    VOICE = "VOICE"
+
+
+class UploadSignatureRequest(BaseModel):
+    purpose: UploadPurposeEnum
+    classroomId: Optional[str] = None
+    assignmentId: Optional[str] = None
+    sha256: Optional[str] = Field(
+        None, description="sha256 of the file, lets the server skip known uploads"
+    )
+
+
+class CloudinaryUploadResult(BaseModel):
+    public_id: str = Field(..., description="public_id returned by Cloudinary")
+    version: int = Field(..., description="version returned by Cloudinary")
+    signature: str = Field(..., description="signature returned by Cloudinary")
+    secure_url: str = Field(..., description="secure_url returned by Cloudinary")
+
+
+class ConfirmClassroomUpload(BaseModel):
+    name: str
+    description: str
+    upload: Optional[CloudinaryUploadResult] = None
+    sha256: Optional[str] = None
+
+
+class ConfirmMaterialUpload(BaseModel):
+    title: str
+    classroomId: str
+    upload: Optional[CloudinaryUploadResult] = None
+    sha256: Optional[str] = None
+
+
+class ConfirmVoiceUpload(BaseModel):
+    assignmentId: str
+    upload: CloudinaryUploadResult
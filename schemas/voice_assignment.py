@@ -15,3 +15,8 @@ class VoiceAssignmentOutputFormat(BaseModel):
     areas_for_improvement: List[str] = Field(
         description="Specific areas where the response could be enhanced"
     )
+
+
+class TranscriptWebhook(BaseModel):
+    transcript_id: str = Field(..., description="id of the assemblyai transcript")
+    status: str = Field(..., description="completed or error")
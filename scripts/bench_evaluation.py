@@ -0,0 +1,229 @@
+# bench_evaluation.py
+# Throughput + token benchmark for batched assignment evaluation. Submits a
+# burst of synthetic answers to one assignment through the EvaluationBatcher,
+# once per batch size, and reports llm calls, prompt tokens (counted on the
+# real single and batch prompts), wall time and answers per second.
+# By default the model is simulated (fixed call overhead plus output tokens
+# at a fixed rate, with a cap on calls in flight) so runs are offline and
+# comparable; --live sends the calls to gemini instead.
+#
+# usage:
+#   python scripts/bench_evaluation.py
+#   python scripts/bench_evaluation.py --answers 120 --sizes 1 4 8 16
+#   python scripts/bench_evaluation.py --live --answers 24 --sizes 1 8
+
+# imports
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("VECTOR_BACKEND", "memory")
+os.environ.setdefault("EMBEDDING_BACKEND", "local")
+
+from utils.token_util import count_tokens
+from utils.llm_gateway_util import LLM_MAX_CONCURRENCY
+from schemas.assignment import AssignmentEvalOutput
+from services.evaluation_service import EvaluationBatcher, EVAL_BATCH_MAX_TOKENS
+from scripts.assignment_eval import (
+    prompt,
+    batch_prompt,
+    format_answers,
+    evaluate_assignment,
+    evaluate_assignment_batch,
+)
+
+QUESTION = (
+    "Explain how virtual memory lets a process use more memory than is "
+    "physically available, and describe what happens on a page fault."
+)
+REFERENCE = (
+    "Virtual memory gives each process its own address space mapped to "
+    "physical frames through page tables. Pages not in memory are kept on "
+    "disk. When a process touches such a page the MMU raises a page fault, "
+    "the kernel picks a frame (evicting a victim page with a replacement "
+    "policy such as LRU if needed), reads the page from disk, updates the "
+    "page table and restarts the faulting instruction."
+)
+SENTENCES = [
+    "Virtual memory maps virtual addresses to physical frames using page tables.",
+    "Each process believes it has a large contiguous address space.",
+    "Pages that are not used recently can be moved out to disk.",
+    "A page fault happens when the page is not present in memory.",
+    "The operating system loads the missing page from the swap area.",
+    "If memory is full a victim page is chosen, for example with LRU.",
+    "After loading the page the instruction is executed again.",
+    "The TLB caches recent translations to make lookups faster.",
+    "I think virtual memory is when the computer uses the hard disk as RAM.",
+    "Thrashing occurs when the system spends most time swapping pages.",
+]
+
+
+def make_answers(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.sample(SENTENCES, rng.randint(2, 7))) for _ in range(count)
+    ]
+
+
+def fake_evaluation(answer: str) -> AssignmentEvalOutput:
+    return AssignmentEvalOutput(
+        score=min(100, 40 + 8 * answer.count(".")),
+        feedback="Simulated feedback " * 40,
+        strengths=["Simulated strength"] * 3,
+        areas_for_improvement=["Simulated improvement"] * 3,
+    )
+
+
+class Meter:
+    """Counts calls and prompt tokens; in simulated mode also plays the model."""
+
+    def __init__(self, args, live: bool):
+        self.args = args
+        self.live = live
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def _model(self, outputs: int):
+        async with self.semaphore:
+            await asyncio.sleep(
+                self.args.call_overhead
+                + outputs * self.args.output_tokens / self.args.output_tps
+            )
+
+    async def single(self, question, base_answer, user_answer):
+        self.calls += 1
+        self.prompt_tokens += count_tokens(
+            prompt.format(
+                question=question, base_answer=base_answer, user_answer=user_answer
+            )
+        )
+        if self.live:
+            return await evaluate_assignment(question, base_answer, user_answer)
+        await self._model(1)
+        return fake_evaluation(user_answer)
+
+    async def batch(self, question, base_answer, answers):
+        self.calls += 1
+        self.prompt_tokens += count_tokens(
+            batch_prompt.format(
+                question=question,
+                base_answer=base_answer,
+                answers=format_answers(answers),
+            )
+        )
+        if self.live:
+            return await evaluate_assignment_batch(question, base_answer, answers)
+        await self._model(len(answers))
+        return [fake_evaluation(answer) for answer in answers]
+
+
+async def run_size(args, size: int, answers: list) -> dict:
+    meter = Meter(args, args.live)
+    batcher = EvaluationBatcher(
+        size=size,
+        wait=args.wait,
+        max_tokens=EVAL_BATCH_MAX_TOKENS,
+        single=meter.single,
+        batch=meter.batch,
+    )
+
+    async def submit(i: int, answer: str):
+        # submissions trickle in over --spread seconds, like a deadline rush
+        await asyncio.sleep(args.spread * i / len(answers))
+        started = time.perf_counter()
+        result = await batcher.evaluate("bench", QUESTION, REFERENCE, answer)
+        return result, time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(submit(i, answer) for i, answer in enumerate(answers))
+    )
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for _, latency in results)
+    return {
+        "batch_size": size,
+        "answers": len(answers),
+        "calls": meter.calls,
+        "prompt_tokens": meter.prompt_tokens,
+        "prompt_tokens_per_answer": round(meter.prompt_tokens / len(answers), 1),
+        "seconds": round(elapsed, 3),
+        "answers_per_second": round(len(answers) / elapsed, 2),
+        "p50_latency": round(latencies[len(latencies) // 2], 3),
+        "p95_latency": round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+    }
+
+
+async def run(args) -> dict:
+    answers = make_answers(args.answers, args.seed)
+    rows = [await run_size(args, size, answers) for size in args.sizes]
+    return {
+        "mode": "live" if args.live else "simulated",
+        "answers": args.answers,
+        "spread": args.spread,
+        "wait": args.wait,
+        "concurrency": args.concurrency,
+        "results": rows,
+    }
+
+
+def print_report(result: dict):
+    rows = result["results"]
+    base = rows[0]
+    print(
+        f"{result['answers']} answers over {result['spread']}s, "
+        f"{result['mode']} model, {result['concurrency']} calls in flight"
+    )
+    print(
+        f"{'batch':>5} {'calls':>6} {'prompt tok':>11} {'tok/answer':>10} "
+        f"{'saved':>7} {'seconds':>8} {'answers/s':>10} {'p95 s':>7}"
+    )
+    for row in rows:
+        saved = 1 - row["prompt_tokens"] / base["prompt_tokens"]
+        print(
+            f"{row['batch_size']:>5} {row['calls']:>6} {row['prompt_tokens']:>11} "
+            f"{row['prompt_tokens_per_answer']:>10} {saved:>7.1%} "
+            f"{row['seconds']:>8} {row['answers_per_second']:>10} "
+            f"{row['p95_latency']:>7}"
+        )
+
+
+# main processing function
+def main():
+    parser = argparse.ArgumentParser(description="batched evaluation benchmark")
+    parser.add_argument("--answers", type=int, default=120)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--spread", type=float, default=10, help="seconds of arrivals")
+    parser.add_argument("--wait", type=float, default=2, help="batch wait seconds")
+    parser.add_argument("--concurrency", type=int, default=LLM_MAX_CONCURRENCY)
+    parser.add_argument("--call-overhead", type=float, default=1.5, help="simulated")
+    parser.add_argument("--output-tokens", type=int, default=350, help="per answer")
+    parser.add_argument("--output-tps", type=float, default=200, help="simulated")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--live", action="store_true", help="call gemini")
+    parser.add_argument("--output", help="json file for the results")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+
+    output = args.output or os.path.join(
+        "bench-results",
+        f"evaluation-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json",
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"results written to {output}")
+
+
+# entry point
+if __name__ == "__main__":
+    main()
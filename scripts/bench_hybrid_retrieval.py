@@ -0,0 +1,121 @@
+# bench_hybrid_retrieval.py
+# Benchmark of recall@k and latency for vector, lexical (bm25) and hybrid
+# retrieval over a synthetic class whose chunks mention course codes and
+# formula names. Uses the in-memory chroma backend and local embeddings, so it
+# needs no network access.
+# usage: python scripts/bench_hybrid_retrieval.py --chunks 300 --queries 100
+
+# imports
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("VECTOR_BACKEND", "memory")
+os.environ.setdefault("EMBEDDING_BACKEND", "local")
+os.environ.setdefault("VECTOR_PARTITIONING", "global")
+
+from utils.chroma_util import MATERIAL_COLLECTION, embeddings, get_vector_store
+from utils.retrieval_util import retrieve, retrieval_cache
+
+CLASS_ID = "bench-class"
+TOPICS = [
+    "sorting algorithms",
+    "graph traversal",
+    "dynamic programming",
+    "hash tables",
+    "binary search trees",
+    "process scheduling",
+    "virtual memory",
+    "relational algebra",
+]
+FORMULAS = [
+    "bayes theorem",
+    "master theorem",
+    "little's law",
+    "amdahl's law",
+    "euler's formula",
+    "fermat's little theorem",
+]
+FILLER = (
+    "this section explains the idea with worked examples and exercises "
+    "students should review before the next lecture"
+)
+
+
+def build_corpus(chunks: int, rng: random.Random):
+    """Each chunk names one unique course code, so a query for it has exactly
+    one relevant chunk."""
+    corpus = []
+    for i in range(chunks):
+        code = f"cs-{100 + i}"
+        topic = rng.choice(TOPICS)
+        formula = rng.choice(FORMULAS)
+        text = (
+            f"{code} covers {topic}. {FILLER}. the key result is {formula}, "
+            f"applied to {topic} problems."
+        )
+        corpus.append((f"{CLASS_ID}:m:{i}", code, text))
+    return corpus
+
+
+def load(corpus):
+    store = get_vector_store(MATERIAL_COLLECTION, CLASS_ID)
+    texts = [text for _, _, text in corpus]
+    store._collection.upsert(
+        ids=[doc_id for doc_id, _, _ in corpus],
+        embeddings=embeddings.embed_documents(texts),
+        documents=texts,
+        metadatas=[{"class_id": CLASS_ID, "material_id": "m"} for _ in corpus],
+    )
+
+
+async def measure(corpus, mode, queries, k, rng):
+    latencies, hits = [], 0
+    for _ in range(queries):
+        _, code, text = rng.choice(corpus)
+        query = f"explain {code}"
+        retrieval_cache.clear()
+        started = time.perf_counter()
+        docs = await retrieve(MATERIAL_COLLECTION, CLASS_ID, query, k, mode=mode)
+        latencies.append(time.perf_counter() - started)
+        hits += any(doc.page_content == text for doc in docs)
+    latencies.sort()
+    return {
+        "recall": hits / queries,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+
+async def run(args):
+    corpus = build_corpus(args.chunks, random.Random(args.seed))
+    load(corpus)
+    print(f"{'mode':<8} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode in ("vector", "lexical", "hybrid"):
+        result = await measure(
+            corpus, mode, args.queries, args.k, random.Random(args.seed + 1)
+        )
+        print(
+            f"{mode:<8} {result['recall']:>9.2f} "
+            f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hybrid retrieval benchmark")
+    parser.add_argument("--chunks", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+
+
+# entry point
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# bench_ingestion.py
+# Benchmark for the ingestion chunk + embed stages: reports chunks/sec and
+# embedding requests per document for page-per-document vs. chunked + batched.
+#
+# usage:
+#   python scripts/bench_ingestion.py                     # synthetic corpus, local embeddings
+#   python scripts/bench_ingestion.py a.pdf b.pdf         # real pdfs, local embeddings
+#   python scripts/bench_ingestion.py a.pdf --live        # real pdfs, gemini embeddings
+
+# imports
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.pdf_util import extract_pdf_pages, shutdown_pdf_pool
+from utils.local_embedding_util import LocalHashEmbeddings
+from utils.embedding_util import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    EMBED_BATCH_SIZE,
+    EMBED_CONCURRENCY,
+    chunk_pages,
+    embed_in_batches,
+)
+
+# the gemini client embeds up to this many texts per request
+GEMINI_MAX_BATCH = 100
+
+WORDS = (
+    "process thread memory scheduler kernel paging deadlock semaphore mutex "
+    "file system inode cache interrupt syscall virtual address segment queue "
+    "priority latency throughput algorithm complexity graph tree heap stack"
+).split()
+
+
+class CountingEmbeddings:
+    """Wraps an embedding model and counts the requests made to it."""
+
+    def __init__(self, model, latency: float = 0.0):
+        self.model = model
+        self.latency = latency
+        self.requests = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += (len(texts) + GEMINI_MAX_BATCH - 1) // GEMINI_MAX_BATCH
+        if self.latency:
+            time.sleep(self.latency)
+        return self.model.embed_documents(texts)
+
+
+def synthetic_documents(count: int, seed: int = 7) -> List[List[str]]:
+    rng = random.Random(seed)
+    docs = []
+    for _ in range(count):
+        pages = []
+        for _ in range(rng.randint(5, 40)):
+            # pages range from near empty to dense text, like real syllabi
+            length = rng.choice([20, 150, 600, 1500, 4000])
+            pages.append(" ".join(rng.choice(WORDS) for _ in range(length)))
+        docs.append(pages)
+    return docs
+
+
+async def pdf_documents(paths: List[str]) -> List[List[str]]:
+    return [await extract_pdf_pages(path) for path in paths]
+
+
+async def run_page_per_document(docs, model) -> dict:
+    started = time.perf_counter()
+    chunks = 0
+    for pages in docs:
+        texts = [p for p in pages if p.strip()]
+        chunks += len(texts)
+        await asyncio.to_thread(model.embed_documents, texts)
+    elapsed = time.perf_counter() - started
+    return {"chunks": chunks, "seconds": elapsed, "requests": model.requests}
+
+
+async def run_chunked(docs, model) -> dict:
+    started = time.perf_counter()
+    chunks = 0
+    for pages in docs:
+        chunk_docs = chunk_pages(pages, {})
+        chunks += len(chunk_docs)
+        await embed_in_batches(model, [d.page_content for d in chunk_docs])
+    elapsed = time.perf_counter() - started
+    return {"chunks": chunks, "seconds": elapsed, "requests": model.requests}
+
+
+def report(name: str, result: dict, doc_count: int):
+    print(
+        f"{name:<20} chunks={result['chunks']:<6} "
+        f"chunks/sec={result['chunks'] / max(result['seconds'], 1e-9):>9.1f} "
+        f"requests/doc={result['requests'] / doc_count:>5.2f} "
+        f"seconds={result['seconds']:.3f}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="ingestion chunk/embed benchmark")
+    parser.add_argument("pdfs", nargs="*", help="pdf files, synthetic corpus if empty")
+    parser.add_argument("--docs", type=int, default=20, help="synthetic documents")
+    parser.add_argument("--live", action="store_true", help="use gemini embeddings")
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="fake seconds per request"
+    )
+    args = parser.parse_args()
+
+    if args.pdfs:
+        docs = await pdf_documents(args.pdfs)
+    else:
+        docs = synthetic_documents(args.docs)
+
+    def make_model():
+        if args.live:
+            from utils.chroma_util import embeddings
+
+            return CountingEmbeddings(embeddings)
+        return CountingEmbeddings(LocalHashEmbeddings(), args.latency)
+
+    print(
+        f"documents={len(docs)} pages={sum(len(d) for d in docs)} "
+        f"chunk_size={CHUNK_SIZE} overlap={CHUNK_OVERLAP} "
+        f"batch={EMBED_BATCH_SIZE} concurrency={EMBED_CONCURRENCY}"
+    )
+    report("page-per-document", await run_page_per_document(docs, make_model()), len(docs))
+    report("chunked+batched", await run_chunked(docs, make_model()), len(docs))
+    shutdown_pdf_pool()
+
+
+# entry point
+if __name__ == "__main__":
+    asyncio.run(main())
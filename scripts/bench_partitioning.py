@@ -0,0 +1,118 @@
+# bench_partitioning.py
+# Benchmark of filtered query latency vs. number of classes for the global,
+# sharded and per_class vector layouts. Runs on an in-memory chroma client with
+# random vectors, so it needs no network access.
+# usage: python scripts/bench_partitioning.py --classes 10 100 500
+
+# imports
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chromadb
+from chromadb.config import Settings
+from utils.vector_partition_util import class_filter, route_collection
+
+BASE = "bench-materials"
+
+
+def random_vector(rng: random.Random, dim: int):
+    return [rng.uniform(-1, 1) for _ in range(dim)]
+
+
+def build(client, partitioning, class_ids, chunks, dim, shards, seed):
+    rng = random.Random(seed)
+    collections = {}
+    for class_id in class_ids:
+        name = route_collection(BASE, class_id, partitioning, shards)
+        if name not in collections:
+            collections[name] = client.get_or_create_collection(name)
+        collections[name].add(
+            ids=[f"{class_id}:{i}" for i in range(chunks)],
+            embeddings=[random_vector(rng, dim) for _ in range(chunks)],
+            documents=[f"chunk {i} of {class_id}" for i in range(chunks)],
+            metadatas=[{"class_id": class_id, "chunk": i} for i in range(chunks)],
+        )
+    return collections
+
+
+def measure(collections, partitioning, class_ids, queries, k, dim, shards, seed):
+    rng = random.Random(seed + 1)
+    latencies, hits = [], 0
+    for _ in range(queries):
+        class_id = rng.choice(class_ids)
+        name = route_collection(BASE, class_id, partitioning, shards)
+        started = time.perf_counter()
+        result = collections[name].query(
+            query_embeddings=[random_vector(rng, dim)],
+            n_results=k,
+            where=class_filter(class_id, partitioning),
+        )
+        latencies.append(time.perf_counter() - started)
+        hits += all(m["class_id"] == class_id for m in result["metadatas"][0])
+    latencies.sort()
+    return {
+        "collections": len(collections),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "correct": hits / queries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="vector partitioning benchmark")
+    parser.add_argument("--classes", type=int, nargs="+", default=[10, 100, 300])
+    parser.add_argument("--chunks", type=int, default=60, help="chunks per class")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(
+        f"{'classes':>8} {'layout':<10} {'collections':>11} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'correct':>8}"
+    )
+    for class_count in args.classes:
+        class_ids = [str(uuid.UUID(int=i + 1)) for i in range(class_count)]
+        for partitioning in ("global", "sharded", "per_class"):
+            client = chromadb.EphemeralClient(
+                settings=Settings(anonymized_telemetry=False, allow_reset=True)
+            )
+            client.reset()
+            collections = build(
+                client,
+                partitioning,
+                class_ids,
+                args.chunks,
+                args.dim,
+                args.shards,
+                args.seed,
+            )
+            result = measure(
+                collections,
+                partitioning,
+                class_ids,
+                args.queries,
+                args.k,
+                args.dim,
+                args.shards,
+                args.seed,
+            )
+            print(
+                f"{class_count:>8} {partitioning:<10} {result['collections']:>11} "
+                f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                f"{result['correct']:>8.2f}"
+            )
+
+
+# entry point
+if __name__ == "__main__":
+    main()
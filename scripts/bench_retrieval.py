@@ -0,0 +1,266 @@
+# bench_retrieval.py
+# Retrieval quality + latency benchmark for the quiz RAG path. Seeds a
+# synthetic corpus of classes (a syllabus and a few materials each, as parsed
+# page text), ingests it with the production chunking and embedding code, then
+# runs quiz queries through the same context builder generate_quiz uses.
+# Reports p50/p95 latency, recall of the packed context per collection and
+# prompt context tokens, and writes them to a json file so runs can be compared.
+# Runs offline on the in-memory chroma backend with local embeddings.
+#
+# usage:
+#   python scripts/bench_retrieval.py
+#   python scripts/bench_retrieval.py --output bench-results/run.json
+#   python scripts/bench_retrieval.py --baseline bench-results/previous.json
+#   CHUNK_SIZE=500 RETRIEVAL_MODE=vector python scripts/bench_retrieval.py
+
+# imports
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("VECTOR_BACKEND", "memory")
+os.environ.setdefault("EMBEDDING_BACKEND", "local")
+
+from utils.vector_partition_util import VECTOR_PARTITIONING
+from utils.embedding_util import CHUNK_SIZE, CHUNK_OVERLAP, chunk_pages, embed_in_batches
+from utils.retrieval_util import RETRIEVAL_MODE, retrieval_cache
+from utils.chroma_util import (
+    VECTOR_BACKEND,
+    EMBEDDING_BACKEND,
+    SYLLABUS_COLLECTION,
+    MATERIAL_COLLECTION,
+    embeddings,
+    get_vector_store,
+)
+from services.quiz_context_service import (
+    QUIZ_SYLLABUS_K,
+    QUIZ_MATERIAL_K,
+    QUIZ_CONTEXT_TOKEN_BUDGET,
+    QUIZ_CONTEXT_COMPRESSION,
+    quiz_query,
+    assemble_quiz_context,
+)
+
+WORDS = (
+    "process thread memory scheduler kernel paging deadlock semaphore mutex "
+    "inode cache interrupt syscall address segment queue priority latency "
+    "throughput algorithm complexity graph tree heap stack hashing sorting "
+    "recursion pointer array matrix vector gradient entropy probability "
+    "regression network protocol routing packet socket transaction index"
+).split()
+FILLER = (
+    "the lecture introduces the idea then works through examples and common "
+    "mistakes before the exercises at the end of the unit"
+).split()
+
+
+def page_text(rng: random.Random, topic: str, heading: str) -> str:
+    # dense and sparse pages, long ones split into several chunks
+    length = rng.choice([60, 200, 450, 900])
+    words = topic.split()
+    body = []
+    for _ in range(length):
+        roll = rng.random()
+        if roll < 0.12:
+            body.append(rng.choice(words))
+        elif roll < 0.5:
+            body.append(rng.choice(FILLER))
+        else:
+            body.append(rng.choice(WORDS))
+    return f"{heading}: {topic}. " + " ".join(body)
+
+
+def build_corpus(args, rng: random.Random):
+    """Returns classes as {class_id, topics, syllabus pages, materials} with
+    the pages relevant to each topic recorded for recall."""
+    classes = []
+    for c in range(args.classes):
+        class_id = f"bench-class-{c}"
+        topics = []
+        while len(topics) < args.topics:
+            topic = " ".join(rng.sample(WORDS, 2))
+            if topic not in topics:
+                topics.append(topic)
+        syllabus = [page_text(rng, t, f"unit {i + 1}") for i, t in enumerate(topics)]
+        materials = {}
+        relevant = {t: {("syllabus", i)} for i, t in enumerate(topics)}
+        for m in range(args.materials):
+            material_id = f"{class_id}-material-{m}"
+            pages = []
+            for p in range(args.pages):
+                topic = rng.choice(topics)
+                pages.append(page_text(rng, topic, f"notes {p + 1}"))
+                relevant[topic].add((material_id, p))
+            materials[material_id] = pages
+        classes.append(
+            {
+                "class_id": class_id,
+                "topics": topics,
+                "syllabus": syllabus,
+                "materials": materials,
+                "relevant": relevant,
+            }
+        )
+    return classes
+
+
+async def ingest(base: str, class_id: str, material_id, pages):
+    source = {"material_id": material_id} if material_id else {"class_id": class_id}
+    docs = chunk_pages(pages, {**source, "class_id": class_id})
+    vectors = await embed_in_batches(embeddings, [doc.page_content for doc in docs])
+    prefix = f"{class_id}:{material_id or 'syllabus'}"
+    get_vector_store(base, class_id)._collection.upsert(
+        ids=[f"{prefix}:{i}" for i in range(len(docs))],
+        embeddings=vectors,
+        documents=[doc.page_content for doc in docs],
+        metadatas=[doc.metadata for doc in docs],
+    )
+    return len(docs)
+
+
+def recall(docs, relevant) -> float:
+    """Share of the packed chunks that could be relevant which actually is."""
+    found = {
+        (doc.metadata.get("material_id") or "syllabus", doc.metadata.get("page"))
+        for doc in docs
+    }
+    possible = min(len(docs) or 1, len(relevant))
+    return len(found & relevant) / possible if possible else 0.0
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "mean": round(statistics.fmean(values), 3),
+        "p50": round(statistics.median(values), 3),
+        "p95": round(values[int(0.95 * (len(values) - 1))], 3),
+        "max": round(values[-1], 3),
+    }
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    classes = build_corpus(args, rng)
+
+    started = time.perf_counter()
+    chunks = 0
+    for cls in classes:
+        chunks += await ingest(SYLLABUS_COLLECTION, cls["class_id"], None, cls["syllabus"])
+        for material_id, pages in cls["materials"].items():
+            chunks += await ingest(MATERIAL_COLLECTION, cls["class_id"], material_id, pages)
+    ingest_seconds = time.perf_counter() - started
+
+    latencies, tokens, syllabus_recall, material_recall = [], [], [], []
+    for _ in range(args.queries):
+        cls = rng.choice(classes)
+        topic = rng.choice(cls["topics"])
+        relevant = cls["relevant"][topic]
+        query = quiz_query(f"{topic} quiz", topic, f"questions covering {topic}")
+
+        if not args.warm:
+            retrieval_cache.clear()
+        started = time.perf_counter()
+        context = await assemble_quiz_context(cls["class_id"], query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        tokens.append(context.tokens)
+
+        docs_syllabus = [d for d in context.docs if "material_id" not in d.metadata]
+        docs_materials = [d for d in context.docs if "material_id" in d.metadata]
+        syllabus_recall.append(
+            recall(docs_syllabus, {r for r in relevant if r[0] == "syllabus"})
+        )
+        material_recall.append(
+            recall(docs_materials, {r for r in relevant if r[0] != "syllabus"})
+        )
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "classes": args.classes,
+            "topics": args.topics,
+            "materials": args.materials,
+            "pages": args.pages,
+            "queries": args.queries,
+            "seed": args.seed,
+            "warm_cache": args.warm,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "syllabus_k": QUIZ_SYLLABUS_K,
+            "material_k": QUIZ_MATERIAL_K,
+            "context_token_budget": QUIZ_CONTEXT_TOKEN_BUDGET,
+            "context_compression": QUIZ_CONTEXT_COMPRESSION,
+            "retrieval_mode": RETRIEVAL_MODE,
+            "vector_backend": VECTOR_BACKEND,
+            "embedding_backend": EMBEDDING_BACKEND,
+            "partitioning": VECTOR_PARTITIONING,
+        },
+        "ingest": {"chunks": chunks, "seconds": round(ingest_seconds, 3)},
+        "latency_ms": summarize(latencies),
+        "prompt_context_tokens": summarize(tokens),
+        "syllabus_recall": round(statistics.fmean(syllabus_recall), 4),
+        "material_recall": round(statistics.fmean(material_recall), 4),
+    }
+
+
+def flatten(result: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def print_report(result: dict, baseline: dict = None):
+    current = flatten({k: v for k, v in result.items() if k != "config"})
+    previous = flatten(baseline) if baseline else {}
+    for key, value in current.items():
+        line = f"{key:<32} {value:>10}"
+        if key in previous:
+            line += f"   (baseline {previous[key]}, {value - previous[key]:+.3f})"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="quiz retrieval benchmark")
+    parser.add_argument("--classes", type=int, default=5)
+    parser.add_argument("--topics", type=int, default=10, help="topics per class")
+    parser.add_argument("--materials", type=int, default=4, help="materials per class")
+    parser.add_argument("--pages", type=int, default=12, help="pages per material")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--warm", action="store_true", help="keep the retrieval cache")
+    parser.add_argument("--output", help="json file for the results")
+    parser.add_argument("--baseline", help="earlier results json to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(
+        "bench-results",
+        f"retrieval-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json",
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"results written to {output}")
+
+
+# entry point
+if __name__ == "__main__":
+    main()
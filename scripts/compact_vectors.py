@@ -0,0 +1,40 @@
+# compact_vectors.py
+# Script to remove orphaned vectors (no matching Classroom/Material row) from chroma.
+# usage: python scripts/compact_vectors.py [--dry-run]
+
+# imports
+import os
+import sys
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db_util import db
+from services.vector_cleanup_service import compact_orphaned_vectors
+
+
+# main processing function
+async def main():
+    parser = argparse.ArgumentParser(description="remove orphaned vectors")
+    parser.add_argument("--dry-run", action="store_true", help="only count orphans")
+    args = parser.parse_args()
+
+    await db.connect()
+    try:
+        result = await compact_orphaned_vectors(dry_run=args.dry_run)
+    finally:
+        await db.disconnect()
+
+    for collection, counts in result.items():
+        action = "would reclaim" if args.dry_run else "reclaimed"
+        print(
+            f"{collection}: scanned {counts['scanned']} vectors "
+            f"in {counts['collections']} collections, "
+            f"{action} {counts['orphaned']} orphaned"
+        )
+
+
+# entry point
+if __name__ == "__main__":
+    asyncio.run(main())
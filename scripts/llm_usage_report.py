@@ -0,0 +1,141 @@
+# llm_usage_report.py
+# Script to summarise the llm usage log (LLM_USAGE_LOG) offline: calls, latency,
+# tokens, retries, parse failures and estimated cost, grouped by chain, route,
+# class or model, most expensive first.
+# usage: python scripts/llm_usage_report.py [--log llm-usage.jsonl] [--by chain] [--since-hours 24] [--json]
+
+# imports
+import os
+import sys
+import json
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.llm_telemetry_util import LLM_USAGE_LOG, LLM_USAGE_LOG_BACKUPS
+
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def read_records(path: str, since: datetime = None):
+    # rotated files first (oldest is the highest number), then the live one
+    paths = [f"{path}.{i}" for i in range(LLM_USAGE_LOG_BACKUPS, 0, -1)] + [path]
+    for log_path in paths:
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if since and datetime.fromisoformat(record["at"]) < since:
+                    continue
+                yield record
+
+
+def build_report(records, by: str) -> list:
+    groups = defaultdict(
+        lambda: {
+            "calls": 0,
+            "errors": 0,
+            "retries": 0,
+            "parse_failures": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cost": 0.0,
+            "latencies": [],
+        }
+    )
+    for record in records:
+        group = groups[record.get(by) or "none"]
+        if record["event"] == "parse_failure":
+            group["parse_failures"] += 1
+            continue
+        group["calls"] += 1
+        group["errors"] += 1 if record.get("error") else 0
+        group["retries"] += record.get("retries", 0)
+        group["input_tokens"] += record.get("input_tokens", 0)
+        group["output_tokens"] += record.get("output_tokens", 0)
+        group["cost"] += record.get("cost", 0.0)
+        group["latencies"].append(record.get("seconds", 0.0))
+
+    rows = []
+    for key, group in groups.items():
+        latencies = group.pop("latencies")
+        rows.append(
+            {
+                by: key,
+                **group,
+                "cost": round(group["cost"], 6),
+                "p50_seconds": round(percentile(latencies, 50), 3),
+                "p95_seconds": round(percentile(latencies, 95), 3),
+                "total_seconds": round(sum(latencies), 3),
+            }
+        )
+    return sorted(rows, key=lambda row: row["cost"], reverse=True)
+
+
+# main processing function
+def main():
+    parser = argparse.ArgumentParser(description="summarise llm usage")
+    parser.add_argument("--log", default=LLM_USAGE_LOG, help="usage log path")
+    parser.add_argument(
+        "--by", default="chain", choices=["chain", "route", "class_id", "model"]
+    )
+    parser.add_argument("--since-hours", type=float, help="only recent calls")
+    parser.add_argument("--json", action="store_true", help="print json rows")
+    args = parser.parse_args()
+
+    if not args.log or not os.path.exists(args.log):
+        print(f"No usage log at {args.log!r}")
+        return
+
+    since = None
+    if args.since_hours:
+        since = datetime.now(timezone.utc) - timedelta(hours=args.since_hours)
+    rows = build_report(read_records(args.log, since), args.by)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    columns = [
+        args.by,
+        "calls",
+        "errors",
+        "retries",
+        "parse_failures",
+        "input_tokens",
+        "output_tokens",
+        "p50_seconds",
+        "p95_seconds",
+        "cost",
+    ]
+    widths = [
+        max(len(column), *(len(str(row[column])) for row in rows)) if rows else len(column)
+        for column in columns
+    ]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(w) for c, w in zip(columns, widths)))
+    print(
+        f"\n{sum(row['calls'] for row in rows)} calls, "
+        f"{sum(row['input_tokens'] + row['output_tokens'] for row in rows)} tokens, "
+        f"${sum(row['cost'] for row in rows):.4f} estimated"
+    )
+
+
+# entry point
+if __name__ == "__main__":
+    main()
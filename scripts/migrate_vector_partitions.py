@@ -0,0 +1,111 @@
+# migrate_vector_partitions.py
+# Script to move existing vectors from the global collections into the
+# partitioned layout (per_class or sharded). Vector ids are kept, so the script
+# can be re-run safely after an interruption.
+# usage: python scripts/migrate_vector_partitions.py --to per_class [--delete-source]
+
+# imports
+import os
+import sys
+import argparse
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.vector_partition_util import (
+    VECTOR_SHARDS,
+    route_collection,
+    PARTITIONING_CHOICES,
+)
+from utils.chroma_util import (
+    SYLLABUS_COLLECTION,
+    MATERIAL_COLLECTION,
+    get_collection_store,
+)
+
+PAGE_SIZE = 300  # vectors read per page
+
+
+def migrate_collection(
+    base: str, partitioning: str, shards: int, delete_source: bool, dry_run: bool
+) -> dict:
+    source = get_collection_store(base)._collection
+    moved, skipped, offset = 0, 0, 0
+    targets = set()
+
+    while True:
+        page = source.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=PAGE_SIZE,
+            offset=offset,
+        )
+        ids = page.get("ids") or []
+        if not ids:
+            break
+
+        grouped = defaultdict(lambda: ([], [], [], []))
+        for vector_id, embedding, document, metadata in zip(
+            ids, page["embeddings"], page["documents"], page["metadatas"]
+        ):
+            class_id = (metadata or {}).get("class_id")
+            if not class_id:
+                skipped += 1
+                continue
+            target = route_collection(base, class_id, partitioning, shards)
+            group = grouped[target]
+            group[0].append(vector_id)
+            group[1].append(list(embedding))
+            group[2].append(document)
+            group[3].append(metadata)
+
+        for target, (t_ids, t_embeddings, t_documents, t_metadatas) in grouped.items():
+            targets.add(target)
+            moved += len(t_ids)
+            if dry_run or target == base:
+                continue
+            get_collection_store(target)._collection.upsert(
+                ids=t_ids,
+                embeddings=t_embeddings,
+                documents=t_documents,
+                metadatas=t_metadatas,
+            )
+
+        if delete_source and not dry_run:
+            moved_ids = [i for group in grouped.values() for i in group[0]]
+            source.delete(ids=moved_ids)
+            # deleted rows shift the window, only skip what stayed behind
+            offset += len(ids) - len(moved_ids)
+        else:
+            offset += len(ids)
+
+    return {"moved": moved, "skipped": skipped, "collections": len(targets)}
+
+
+# main processing function
+def main():
+    parser = argparse.ArgumentParser(description="partition class vectors")
+    parser.add_argument("--to", choices=PARTITIONING_CHOICES, required=True)
+    parser.add_argument("--shards", type=int, default=VECTOR_SHARDS)
+    parser.add_argument("--delete-source", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if args.to == "global":
+        print("Nothing to do, global is the source layout")
+        return
+
+    for base in (SYLLABUS_COLLECTION, MATERIAL_COLLECTION):
+        result = migrate_collection(
+            base, args.to, args.shards, args.delete_source, args.dry_run
+        )
+        print(
+            f"{base}: moved {result['moved']} vectors into "
+            f"{result['collections']} collections, "
+            f"skipped {result['skipped']} without class_id"
+        )
+    print(f"Set VECTOR_PARTITIONING={args.to} (and VECTOR_SHARDS) to serve from it")
+
+
+# entry point
+if __name__ == "__main__":
+    main()
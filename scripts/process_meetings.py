@@ -3,6 +3,7 @@
 
 # imports
 import os
+import sys
 import asyncio
 import aiohttp
 import requests
@@ -18,6 +19,10 @@ from langchain.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.llm_telemetry_util import llm_tags, llm_telemetry
+
 load_dotenv()
 
 # environment variables
@@ -37,7 +42,7 @@ aai_config = aai.TranscriptionConfig(speech_model=aai.SpeechModel.best)
 aai_transcriber = aai.Transcriber(config=aai_config)
 
 # gemini settings
-gemini = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+gemini = ChatGoogleGenerativeAI(model="gemini-2.5-flash", callbacks=[llm_telemetry])
 
 # db settings
 db = Prisma()
@@ -166,7 +171,9 @@ async def transcribe_file(audio_path: str) -> str:
 # summarize transcript
 async def summarize_transcript(transcript: str) -> str:
     chain = summary_template | gemini | parser
-    summary = chain.invoke({"transcript": transcript})
+    summary = chain.invoke(
+        {"transcript": transcript}, {"metadata": {"chain": "meeting_summary"}}
+    )
     return summary
 
 
@@ -176,7 +183,11 @@ async def main():
     meetings = await db.classmeetings.find_many(
         where={"meetingData": {"none": {}}},
     )
-    meeting_ids = [{"id": m.id, "meetId": m.meetId} for m in meetings if m.meetId]
+    meeting_ids = [
+        {"id": m.id, "meetId": m.meetId, "classroomId": m.classroomId}
+        for m in meetings
+        if m.meetId
+    ]
 
     for meet in meeting_ids:
         meet_id = meet["id"]
@@ -209,7 +220,8 @@ async def main():
                 print(f"Skipping meeting — failed to transcribe audio for {audio_path}")
                 continue
             else:
-                summary_text = await summarize_transcript(transcript_text)
+                with llm_tags(class_id=meet["classroomId"]):
+                    summary_text = await summarize_transcript(transcript_text)
                 if not summary_text:
                     print(
                         f"Skipping meeting — failed to summarize transcript for {audio_path}"
@@ -227,6 +239,7 @@ async def main():
             )
 
     await db.disconnect()
+    print(f"LLM usage: {llm_telemetry.summary()['chain']}")
 
 
 # entry point
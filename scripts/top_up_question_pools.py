@@ -0,0 +1,55 @@
+# top_up_question_pools.py
+# Script to keep popular question pools warm: generates questions for the most
+# recently requested class/topic/difficulty pools that are below target, so
+# later quizzes can be served from the bank. Meant for off-peak hours.
+# usage: python scripts/top_up_question_pools.py [--limit 20] [--target 30] [--dry-run]
+
+# imports
+import os
+import sys
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db_util import db
+from services.question_bank_service import (
+    QUESTION_POOL_TARGET,
+    top_up_pool,
+    pools_to_top_up,
+)
+
+
+# main processing function
+async def main():
+    parser = argparse.ArgumentParser(description="top up popular question pools")
+    parser.add_argument("--limit", type=int, default=20, help="pools per run")
+    parser.add_argument("--target", type=int, default=QUESTION_POOL_TARGET)
+    parser.add_argument("--dry-run", action="store_true", help="only list pools")
+    args = parser.parse_args()
+
+    await db.connect()
+    try:
+        pools = await pools_to_top_up(db, args.limit, args.target)
+        print(f"{len(pools)} pools below {args.target} questions")
+        total = 0
+        for pool in pools:
+            label = f"{pool.classroomId} / {pool.topic} / {pool.difficulty}"
+            if args.dry_run:
+                print(f"would top up {label} ({pool.requests} requests)")
+                continue
+            try:
+                added = await top_up_pool(db, pool, args.target)
+                total += added
+                print(f"topped up {label}: +{added}")
+            except Exception as e:
+                print(f"Top up error for {label}: {e}")
+        if not args.dry_run:
+            print(f"added {total} questions")
+    finally:
+        await db.disconnect()
+
+
+# entry point
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,200 @@
+import os
+import asyncio
+import contextvars
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from utils.token_util import count_tokens
+from utils.metrics_util import increment, set_gauge
+from utils.llm_telemetry_util import current_tags, llm_tags
+from utils.llm_gateway_util import Priority, llm_priority
+from utils.prescore_util import EMPTY, REFERENCE_COPY, prescore, prescore_hint
+from schemas.assignment import AssignmentEvalOutput
+from scripts.assignment_eval import evaluate_assignment, evaluate_assignment_batch
+
+load_dotenv()
+
+# background answers (voice, re-evaluation) to the same assignment that arrive
+# close together are scored in one llm call; EVAL_BATCH_SIZE=1 scores every
+# answer on its own
+EVAL_BATCH_SIZE = int(os.getenv("EVAL_BATCH_SIZE", 8))  # answers per call
+EVAL_BATCH_WAIT = float(os.getenv("EVAL_BATCH_WAIT", 2))  # seconds to collect a batch
+EVAL_BATCH_MAX_TOKENS = int(os.getenv("EVAL_BATCH_MAX_TOKENS", 6000))  # answer tokens per call
+
+
+# score given to answers that reproduce the reference answer almost verbatim
+PRESCORE_REFERENCE_SCORE = int(os.getenv("PRESCORE_REFERENCE_SCORE", 95))
+
+# templated evaluations for answers settled by the local pre-scoring
+PRESCORED = {
+    EMPTY: (
+        0,
+        "No answer was found in this submission, so it could not be evaluated "
+        "against the question.",
+        [],
+        ["Write an answer that addresses the question in your own words."],
+    ),
+    REFERENCE_COPY: (
+        PRESCORE_REFERENCE_SCORE,
+        "The answer covers every point of the expected answer and matches it "
+        "almost word for word.",
+        ["Complete and accurate coverage of the expected answer"],
+        ["Explain the ideas in your own words to show your understanding."],
+    ),
+}
+
+
+_counts = {"answers": 0, "prescored": 0}
+
+
+def prescored_evaluation(
+    question: str, base_answer: str, user_answer: str
+) -> Optional[AssignmentEvalOutput]:
+    """Templated evaluation for trivially scoreable answers, None for the rest.
+    Reports the share of answers that skipped the llm."""
+    reason = prescore(question, base_answer, user_answer)
+    _counts["answers"] += 1
+    increment("evaluation.answers")
+    if reason is not None:
+        _counts["prescored"] += 1
+        increment("evaluation.prescored")
+        increment(f"evaluation.prescored.{reason}")
+    else:
+        hint = prescore_hint(question, base_answer, user_answer)
+        if hint is not None:
+            increment(f"evaluation.prescore_hint.{hint}")
+    set_gauge(
+        "evaluation.llm_calls_avoided_ratio",
+        _counts["prescored"] / _counts["answers"],
+    )
+    if reason is None:
+        return None
+    score, feedback, strengths, improvements = PRESCORED[reason]
+    return AssignmentEvalOutput(
+        score=score,
+        feedback=feedback,
+        strengths=list(strengths),
+        areas_for_improvement=list(improvements),
+    )
+
+
+async def evaluate_answer(
+    question: str, base_answer: str, user_answer: str
+) -> AssignmentEvalOutput:
+    """Score one answer a student is waiting for: settled locally when
+    trivial, otherwise its own llm call, never held back for a batch."""
+    prescored = prescored_evaluation(question, base_answer, user_answer)
+    if prescored is not None:
+        return prescored
+    return await evaluate_assignment(question, base_answer, user_answer)
+
+
+class _Pending:
+    def __init__(self, question: str, base_answer: str, user_answer: str, future):
+        self.question = question
+        self.base_answer = base_answer
+        self.user_answer = user_answer
+        self.future = future
+        self.class_id = current_tags().get("class_id")
+
+
+class EvaluationBatcher:
+    """Collects background answers per assignment version (question and
+    reference answer) and scores them together once a batch is full or
+    EVAL_BATCH_WAIT has passed since its first answer. Answers the batch call
+    does not return valid evaluations for are scored one by one. Trivially
+    scoreable answers are settled locally and never queued."""
+
+    def __init__(
+        self,
+        size: int = EVAL_BATCH_SIZE,
+        wait: float = EVAL_BATCH_WAIT,
+        max_tokens: int = EVAL_BATCH_MAX_TOKENS,
+        single=evaluate_assignment,
+        batch=evaluate_assignment_batch,
+    ):
+        self.size = size
+        self.wait = wait
+        self.max_tokens = max_tokens
+        self.single = single
+        self.batch = batch
+        self._pending: Dict[Tuple[str, str, str], List[_Pending]] = {}
+        self._timers = {}
+        self._tasks = set()
+
+    async def evaluate(
+        self, assignment_id: str, question: str, base_answer: str, user_answer: str
+    ) -> AssignmentEvalOutput:
+        prescored = prescored_evaluation(question, base_answer, user_answer)
+        if prescored is not None:
+            return prescored
+        if self.size <= 1:
+            return await self.single(question, base_answer, user_answer)
+
+        loop = asyncio.get_running_loop()
+        pending = _Pending(question, base_answer, user_answer, loop.create_future())
+        # an edited assignment never shares a call with answers to its old
+        # question or reference answer
+        key = (assignment_id, question, base_answer)
+        group = self._pending.setdefault(key, [])
+        group.append(pending)
+
+        tokens = sum(count_tokens(p.user_answer) for p in group)
+        if len(group) >= self.size or tokens >= self.max_tokens:
+            self._flush(key)
+        elif len(group) == 1:
+            self._timers[key] = loop.call_later(self.wait, self._flush, key)
+        return await pending.future
+
+    def _flush(self, key: Tuple[str, str, str]):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        group = self._pending.pop(key, None)
+        if group:
+            # a fresh context: the batch must not run with the priority, tags
+            # or request of whichever answer happened to trigger the flush
+            task = contextvars.Context().run(asyncio.create_task, self._score(group))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _score(self, group: List[_Pending]):
+        class_id = next((p.class_id for p in group if p.class_id), None)
+        with llm_priority(Priority.BACKGROUND), llm_tags(class_id=class_id):
+            await self._score_group(group)
+
+    async def _score_group(self, group: List[_Pending]):
+        question, base_answer = group[0].question, group[0].base_answer
+        # identical answers are scored once
+        answers = list(dict.fromkeys(p.user_answer.strip() for p in group))
+        results = [None] * len(answers)
+        if len(answers) > 1:
+            increment("evaluation.batches")
+            increment("evaluation.batched_answers", len(answers))
+            try:
+                results = await self.batch(question, base_answer, answers)
+            except Exception as e:
+                print(f"Batch evaluation error, scoring answers one by one: {e}")
+                increment("evaluation.batch_failures")
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if len(answers) > 1:
+            increment("evaluation.fallbacks", len(missing))
+        scored = await asyncio.gather(
+            *(self.single(question, base_answer, answers[i]) for i in missing),
+            return_exceptions=True,
+        )
+        for i, result in zip(missing, scored):
+            results[i] = result
+
+        by_answer = dict(zip(answers, results))
+        for pending in group:
+            result = by_answer[pending.user_answer.strip()]
+            if pending.future.done():
+                continue
+            if isinstance(result, BaseException):
+                pending.future.set_exception(result)
+            else:
+                pending.future.set_result(result.model_copy(deep=True))
+
+
+evaluation_batcher = EvaluationBatcher()
@@ -0,0 +1,374 @@
+# ingestion_service.py
+# Queued document ingestion for syllabi and class materials:
+# download -> parse -> chunk -> embed -> upsert, with retries and stage timings.
+
+import os
+import time
+import asyncio
+import requests
+from enum import Enum
+from typing import Callable, Optional
+from pydantic import BaseModel
+from utils.db_util import db
+from utils.metrics_util import increment, observe, set_gauge
+from utils.embedding_util import chunk_pages, embed_in_batches
+from utils.pdf_util import iter_pdf_pages, shutdown_pdf_pool
+from langchain_core.documents import Document
+from utils.retrieval_util import (
+    index_chunks,
+    remove_chunks,
+    reset_lexical_index,
+    bump_collection_version,
+)
+from services.syllabus_digest_service import (
+    refresh_syllabus_digest,
+    forget_syllabus_digest,
+)
+from services.vector_cleanup_service import (
+    delete_class_vectors,
+    delete_material_vectors,
+)
+from utils.chroma_util import (
+    embeddings,
+    get_vector_store,
+    SYLLABUS_COLLECTION,
+    MATERIAL_COLLECTION,
+)
+from utils.content_store_util import (
+    sha256_hex,
+    copy_vectors,
+    find_file_asset,
+    save_file_asset,
+    store_content_vectors,
+)
+
+DOWNLOAD_TIMEOUT = 60  # seconds
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", 2))
+INGESTION_MAX_ATTEMPTS = int(os.getenv("INGESTION_MAX_ATTEMPTS", 3))
+INGESTION_RETRY_DELAY = float(os.getenv("INGESTION_RETRY_DELAY", 5))  # seconds
+
+
+class IngestionKind(str, Enum):
+    SYLLABUS = "SYLLABUS"
+    MATERIAL = "MATERIAL"
+    DELETE_CLASS = "DELETE_CLASS"
+    DELETE_MATERIAL = "DELETE_MATERIAL"
+
+
+class IngestionJob(BaseModel):
+    kind: IngestionKind
+    class_id: str
+    file_url: Optional[str] = None
+    material_id: Optional[str] = None
+    file_bytes: Optional[bytes] = None
+    attempt: int = 0
+
+
+ingestion_queue: asyncio.Queue = asyncio.Queue()
+
+_workers = []
+_pending_retries = set()
+
+
+# download a stored file (e.g. from cloudinary) without blocking the event loop
+async def download_file(url: str) -> bytes:
+    response = await asyncio.to_thread(requests.get, url, timeout=DOWNLOAD_TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+
+def _vector_store_for(job: IngestionJob):
+    return get_vector_store(_collection_base(job), job.class_id)
+
+
+def _source_filter(job: IngestionJob) -> dict:
+    if job.kind == IngestionKind.SYLLABUS:
+        return {"class_id": job.class_id}
+    return {"material_id": job.material_id}
+
+
+def _collection_base(job: IngestionJob) -> str:
+    if job.kind in (IngestionKind.SYLLABUS, IngestionKind.DELETE_CLASS):
+        return SYLLABUS_COLLECTION
+    return MATERIAL_COLLECTION
+
+
+def _id_prefix(job: IngestionJob) -> str:
+    return f"{job.class_id}:{job.material_id or 'syllabus'}"
+
+
+def _belongs_to(job: IngestionJob) -> Callable[[Document], bool]:
+    if job.kind in (IngestionKind.SYLLABUS, IngestionKind.DELETE_CLASS):
+        return lambda doc: True
+    return lambda doc: doc.metadata.get("material_id") == job.material_id
+
+
+async def _parse(job: IngestionJob, file_bytes: bytes, sha256: str):
+    asset = await find_file_asset(db, sha256)
+    if asset and asset.pages:
+        return asset.pages
+    # parsed in memory, large documents across the process pool
+    pages = []
+    async for _, text in iter_pdf_pages(file_bytes):
+        pages.append(text)
+    await save_file_asset(db, sha256, job.file_url, pages=pages)
+    return pages
+
+
+def _clear_source(job: IngestionJob):
+    # drop whatever an earlier (partial) run or older file of this source left
+    # behind, so a shorter new file leaves no trailing chunks
+    _vector_store_for(job)._collection.delete(where=_source_filter(job))
+    remove_chunks(_collection_base(job), job.class_id, _belongs_to(job))
+
+
+def _reuse(job: IngestionJob, sha256: str, metadata: dict) -> int:
+    _clear_source(job)
+    return copy_vectors(sha256, _vector_store_for(job), metadata, _id_prefix(job))
+
+
+def _upsert(job: IngestionJob, docs, vectors, sha256: str):
+    store = _vector_store_for(job)
+    _clear_source(job)
+    if not docs:
+        return
+    prefix = _id_prefix(job)
+    ids = [f"{prefix}:{i}" for i in range(len(docs))]
+    documents = [doc.page_content for doc in docs]
+    metadatas = [doc.metadata for doc in docs]
+    store._collection.upsert(
+        ids=ids,
+        embeddings=vectors,
+        documents=documents,
+        metadatas=metadatas,
+    )
+    store_content_vectors(sha256, documents, metadatas, vectors)
+    # keep the class's bm25 index in step with the vectors
+    index_chunks(
+        _collection_base(job),
+        job.class_id,
+        ids,
+        [
+            Document(id=doc_id, page_content=doc.page_content, metadata=doc.metadata)
+            for doc_id, doc in zip(ids, docs)
+        ],
+        _belongs_to(job),
+    )
+
+
+async def run_ingestion(job: IngestionJob) -> dict:
+    """Run every stage for one job and return the time spent per stage."""
+    timings = {}
+
+    def mark(stage: str, started: float):
+        elapsed = time.perf_counter() - started
+        timings[stage] = round(elapsed, 4)
+        observe(f"ingestion.{stage}", elapsed)
+
+    started = time.perf_counter()
+    file_bytes = job.file_bytes or await download_file(job.file_url)
+    mark("download", started)
+
+    sha256 = sha256_hex(file_bytes)
+    metadata = {**_source_filter(job), "class_id": job.class_id, "content_hash": sha256}
+
+    # identical bytes were embedded before, copy the vectors instead
+    started = time.perf_counter()
+    copied = await asyncio.to_thread(_reuse, job, sha256, metadata)
+    mark("reuse", started)
+    if copied:
+        # copied chunks are picked up when the bm25 index is next built
+        reset_lexical_index(_collection_base(job), job.class_id)
+        bump_collection_version(_collection_base(job), job.class_id)
+        if job.kind == IngestionKind.SYLLABUS:
+            started = time.perf_counter()
+            pages = await _parse(job, file_bytes, sha256)
+            await refresh_syllabus_digest(db, job.class_id, pages)
+            mark("digest", started)
+        return timings
+
+    started = time.perf_counter()
+    pages = await _parse(job, file_bytes, sha256)
+    mark("parse", started)
+
+    started = time.perf_counter()
+    docs = chunk_pages(pages, metadata)
+    mark("chunk", started)
+
+    started = time.perf_counter()
+    vectors = await embed_in_batches(embeddings, [doc.page_content for doc in docs])
+    mark("embed", started)
+
+    started = time.perf_counter()
+    await asyncio.to_thread(_upsert, job, docs, vectors, sha256)
+    mark("upsert", started)
+    # cached retrievals for this class no longer reflect the collection
+    bump_collection_version(_collection_base(job), job.class_id)
+
+    if job.kind == IngestionKind.SYLLABUS:
+        started = time.perf_counter()
+        await refresh_syllabus_digest(db, job.class_id, pages)
+        mark("digest", started)
+
+    return timings
+
+
+async def run_deletion(job: IngestionJob):
+    if job.kind == IngestionKind.DELETE_CLASS:
+        await asyncio.to_thread(delete_class_vectors, job.class_id)
+        reset_lexical_index(SYLLABUS_COLLECTION, job.class_id)
+        reset_lexical_index(MATERIAL_COLLECTION, job.class_id)
+        forget_syllabus_digest(job.class_id)
+        bump_collection_version(SYLLABUS_COLLECTION, job.class_id)
+    else:
+        await asyncio.to_thread(delete_material_vectors, job.class_id, job.material_id)
+        remove_chunks(MATERIAL_COLLECTION, job.class_id, _belongs_to(job))
+    bump_collection_version(MATERIAL_COLLECTION, job.class_id)
+
+
+async def _set_status(job: IngestionJob, ingestion_status: str):
+    # deleted rows have no status left to track
+    if job.kind in (IngestionKind.DELETE_CLASS, IngestionKind.DELETE_MATERIAL):
+        return
+    try:
+        if job.kind == IngestionKind.SYLLABUS:
+            await db.classroom.update(
+                where={"id": job.class_id},
+                data={"ingestionStatus": ingestion_status},
+            )
+        else:
+            await db.material.update(
+                where={"id": job.material_id},
+                data={"ingestionStatus": ingestion_status},
+            )
+    except Exception as e:
+        print(f"Ingestion status update error: {e}")
+
+
+async def _source_exists(job: IngestionJob) -> bool:
+    if job.kind == IngestionKind.SYLLABUS:
+        return await db.classroom.find_unique(where={"id": job.class_id}) is not None
+    return await db.material.find_unique(where={"id": job.material_id}) is not None
+
+
+async def _retry_later(job: IngestionJob, delay: float):
+    await asyncio.sleep(delay)
+    await ingestion_queue.put(job)
+
+
+async def _process_job(job: IngestionJob):
+    try:
+        if job.kind in (IngestionKind.DELETE_CLASS, IngestionKind.DELETE_MATERIAL):
+            await run_deletion(job)
+            increment("ingestion.deletions")
+            return
+        # deleted after it was queued: ingesting would bring back the vectors
+        # its deletion job removed
+        if not await _source_exists(job):
+            increment("ingestion.dropped")
+            return
+        await _set_status(job, "PROCESSING")
+        timings = await run_ingestion(job)
+        await _set_status(job, "COMPLETED")
+        increment("ingestion.completed")
+        print(f"Ingested {job.kind.value} {_id_prefix(job)}: {timings}")
+    except Exception as e:
+        job.attempt += 1
+        increment("ingestion.errors")
+        if job.attempt < INGESTION_MAX_ATTEMPTS:
+            delay = INGESTION_RETRY_DELAY * 2 ** (job.attempt - 1)
+            print(f"Ingestion error ({e}), retry {job.attempt} in {delay}s")
+            await _set_status(job, "PENDING")
+            task = asyncio.create_task(_retry_later(job, delay))
+            _pending_retries.add(task)
+            task.add_done_callback(_pending_retries.discard)
+        else:
+            print(f"Ingestion failed for {_id_prefix(job)}: {e}")
+            await _set_status(job, "FAILED")
+            increment("ingestion.failed")
+
+
+async def _ingestion_worker():
+    while True:
+        job = await ingestion_queue.get()
+        try:
+            await _process_job(job)
+        except Exception as e:
+            print(f"Ingestion worker error: {e}")
+        finally:
+            ingestion_queue.task_done()
+            set_gauge("ingestion.queue_depth", ingestion_queue.qsize())
+
+
+async def enqueue_ingestion(job: IngestionJob):
+    await ingestion_queue.put(job)
+    set_gauge("ingestion.queue_depth", ingestion_queue.qsize())
+
+
+async def enqueue_syllabus(class_id: str, file_url: str, file_bytes: bytes = None):
+    await enqueue_ingestion(
+        IngestionJob(
+            kind=IngestionKind.SYLLABUS,
+            class_id=class_id,
+            file_url=file_url,
+            file_bytes=file_bytes,
+        )
+    )
+
+
+async def enqueue_material(
+    class_id: str, material_id: str, file_url: str, file_bytes: bytes = None
+):
+    await enqueue_ingestion(
+        IngestionJob(
+            kind=IngestionKind.MATERIAL,
+            class_id=class_id,
+            material_id=material_id,
+            file_url=file_url,
+            file_bytes=file_bytes,
+        )
+    )
+
+
+async def enqueue_class_deletion(class_id: str):
+    await enqueue_ingestion(
+        IngestionJob(kind=IngestionKind.DELETE_CLASS, class_id=class_id)
+    )
+
+
+async def enqueue_material_deletion(class_id: str, material_id: str):
+    await enqueue_ingestion(
+        IngestionJob(
+            kind=IngestionKind.DELETE_MATERIAL,
+            class_id=class_id,
+            material_id=material_id,
+        )
+    )
+
+
+# pick up work that was queued (or running) when the process last stopped
+async def _requeue_unfinished():
+    unfinished = {"ingestionStatus": {"in": ["PENDING", "PROCESSING"]}}
+    classrooms = await db.classroom.find_many(where=unfinished)
+    for classroom in classrooms:
+        await enqueue_syllabus(classroom.id, classroom.syllabusUrl)
+    materials = await db.material.find_many(where=unfinished)
+    for material in materials:
+        await enqueue_material(material.classroomId, material.id, material.fileUrl)
+
+
+async def start_ingestion_workers():
+    for _ in range(INGESTION_WORKERS):
+        _workers.append(asyncio.create_task(_ingestion_worker()))
+    try:
+        await _requeue_unfinished()
+    except Exception as e:
+        print(f"Ingestion requeue error: {e}")
+
+
+async def stop_ingestion_workers():
+    for task in [*_workers, *_pending_retries]:
+        task.cancel()
+    _workers.clear()
+    _pending_retries.clear()
+    shutdown_pdf_pool()
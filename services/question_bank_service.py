@@ -0,0 +1,138 @@
+import os
+import random
+import hashlib
+from typing import List
+from dotenv import load_dotenv
+from datetime import datetime, timezone
+from utils.metrics_util import increment
+from schemas.classroom import ClassQuizBody, Question
+from utils.llm_telemetry_util import llm_tags
+from utils.llm_gateway_util import Priority, llm_priority
+from services.quiz_generation_service import (
+    quiz_llm,
+    question_key,
+    valid_questions,
+    build_quiz_inputs,
+)
+
+load_dotenv()
+
+# questions a popular pool is topped up to
+QUESTION_POOL_TARGET = int(os.getenv("QUESTION_POOL_TARGET", 30))
+# requests before a pool counts as popular enough to top up
+QUESTION_POOL_MIN_REQUESTS = int(os.getenv("QUESTION_POOL_MIN_REQUESTS", 2))
+# questions generated per top-up call
+QUESTION_POOL_TOP_UP_BATCH = int(os.getenv("QUESTION_POOL_TOP_UP_BATCH", 10))
+
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+
+def question_hash(question: Question) -> str:
+    return hashlib.sha256(question_key(question).encode()).hexdigest()
+
+
+async def record_pool_request(db, data: ClassQuizBody):
+    topic = normalize_topic(data.topic)
+    return await db.questionpool.upsert(
+        where={
+            "classroomId_topic_difficulty": {
+                "classroomId": data.class_id,
+                "topic": topic,
+                "difficulty": data.difficulty,
+            }
+        },
+        data={
+            "create": {
+                "classroomId": data.class_id,
+                "topic": topic,
+                "difficulty": data.difficulty,
+                "title": data.title,
+                "description": data.description,
+                "requests": 1,
+            },
+            "update": {
+                "title": data.title,
+                "description": data.description,
+                "requests": {"increment": 1},
+                "lastRequestedAt": datetime.now(timezone.utc),
+            },
+        },
+    )
+
+
+# least served questions first, so repeated quizzes rotate through the pool
+async def sample_from_bank(db, pool_id: str, count: int) -> List[Question]:
+    candidates = await db.bankquestion.find_many(
+        where={"poolId": pool_id}, order={"timesServed": "asc"}, take=count * 2
+    )
+    picked = random.sample(candidates, min(count, len(candidates)))
+    if picked:
+        await db.bankquestion.update_many(
+            where={"id": {"in": [q.id for q in picked]}},
+            data={"timesServed": {"increment": 1}},
+        )
+    increment("question_bank.served", len(picked))
+    return [
+        Question(question=q.question, options=q.options, answer=q.answer)
+        for q in picked
+    ]
+
+
+async def add_to_bank(db, pool_id: str, questions: List[Question]) -> int:
+    if not questions:
+        return 0
+    added = await db.bankquestion.create_many(
+        data=[
+            {**q.dict(), "poolId": pool_id, "contentHash": question_hash(q)}
+            for q in questions
+        ],
+        skip_duplicates=True,
+    )
+    increment("question_bank.added", added)
+    return added
+
+
+async def top_up_pool(db, pool, target: int = QUESTION_POOL_TARGET) -> int:
+    """Generate questions for one pool until it holds `target` (one LLM call
+    of at most QUESTION_POOL_TOP_UP_BATCH questions per round)."""
+    added = 0
+    size = await db.bankquestion.count(where={"poolId": pool.id})
+    while size < target:
+        data = ClassQuizBody(
+            title=pool.title,
+            topic=pool.topic,
+            class_id=pool.classroomId,
+            description=pool.description,
+            number_of_questions=min(target - size, QUESTION_POOL_TOP_UP_BATCH),
+            difficulty=pool.difficulty,
+        )
+        with llm_priority(Priority.BACKGROUND), llm_tags(class_id=pool.classroomId):
+            result = await quiz_llm.ainvoke(await build_quiz_inputs(data))
+        new = await add_to_bank(db, pool.id, valid_questions(result.questions))
+        if not new:
+            # the model only repeats what the pool already has
+            break
+        added += new
+        size += new
+    await db.questionpool.update(
+        where={"id": pool.id}, data={"lastToppedUpAt": datetime.now(timezone.utc)}
+    )
+    return added
+
+
+async def pools_to_top_up(db, limit: int, target: int = QUESTION_POOL_TARGET):
+    """Most recently requested popular pools that are below target."""
+    pools = await db.questionpool.find_many(
+        where={"requests": {"gte": QUESTION_POOL_MIN_REQUESTS}},
+        order={"lastRequestedAt": "desc"},
+        take=limit * 3,
+    )
+    below = []
+    for pool in pools:
+        if await db.bankquestion.count(where={"poolId": pool.id}) < target:
+            below.append(pool)
+        if len(below) == limit:
+            break
+    return below
@@ -0,0 +1,91 @@
+import os
+import asyncio
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+from pydantic import BaseModel
+from langchain_core.documents import Document
+from utils.token_util import count_tokens
+from utils.metrics_util import increment, observe
+from utils.retrieval_util import retrieve
+from utils.chroma_util import SYLLABUS_COLLECTION, MATERIAL_COLLECTION
+from utils.context_util import dedupe_chunks, rank_by_relevance, pack_context
+
+load_dotenv()
+
+# candidate chunks retrieved per quiz prompt, packed down to the budget below
+QUIZ_SYLLABUS_K = int(os.getenv("QUIZ_SYLLABUS_K", 4))
+QUIZ_MATERIAL_K = int(os.getenv("QUIZ_MATERIAL_K", 8))
+
+QUIZ_CONTEXT_TOKEN_BUDGET = int(os.getenv("QUIZ_CONTEXT_TOKEN_BUDGET", 3000))
+# share of the budget reserved for the syllabus, whatever it leaves goes to materials
+QUIZ_SYLLABUS_SHARE = float(os.getenv("QUIZ_SYLLABUS_SHARE", 0.35))
+# top chunks per section kept verbatim, the rest are summarised when compressing
+QUIZ_CONTEXT_FULL_CHUNKS = int(os.getenv("QUIZ_CONTEXT_FULL_CHUNKS", 2))
+QUIZ_CONTEXT_SUMMARY_TOKENS = int(os.getenv("QUIZ_CONTEXT_SUMMARY_TOKENS", 120))
+QUIZ_CONTEXT_COMPRESSION = os.getenv("QUIZ_CONTEXT_COMPRESSION", "true").lower() == "true"
+
+
+class QuizContext(BaseModel):
+    syllabus: str
+    materials: str
+    docs: List[Document]
+    tokens: int
+
+
+def quiz_query(title: str, topic: str, description: str) -> str:
+    return f"{title}, {topic}, {description}"
+
+
+def _pack(query: str, docs: List[Document], budget: int):
+    ranked = rank_by_relevance(query, dedupe_chunks(docs))
+    return pack_context(
+        query,
+        ranked,
+        budget,
+        QUIZ_CONTEXT_FULL_CHUNKS,
+        QUIZ_CONTEXT_SUMMARY_TOKENS,
+        QUIZ_CONTEXT_COMPRESSION,
+    )
+
+
+async def assemble_quiz_context(
+    class_id: str,
+    query: str,
+    budget: int = QUIZ_CONTEXT_TOKEN_BUDGET,
+    digest: Optional[str] = None,
+) -> QuizContext:
+    """Packs retrieved chunks into the budget. A syllabus digest that fits the
+    syllabus share is used in place of the raw syllabus pages."""
+    syllabus_budget = int(budget * QUIZ_SYLLABUS_SHARE)
+    if digest and count_tokens(digest) <= syllabus_budget:
+        increment("quiz.syllabus_digest_used")
+        docs_materials = await retrieve(
+            MATERIAL_COLLECTION, class_id, query, QUIZ_MATERIAL_K
+        )
+        syllabus_text, syllabus, syllabus_tokens = digest, [], count_tokens(digest)
+    else:
+        docs_syllabus, docs_materials = await asyncio.gather(
+            retrieve(SYLLABUS_COLLECTION, class_id, query, QUIZ_SYLLABUS_K),
+            retrieve(MATERIAL_COLLECTION, class_id, query, QUIZ_MATERIAL_K),
+        )
+        syllabus, syllabus_tokens = _pack(query, docs_syllabus, syllabus_budget)
+        syllabus_text = "\n".join([doc.page_content for doc in syllabus])
+    materials, material_tokens = _pack(
+        query, docs_materials, budget - syllabus_tokens
+    )
+    tokens = syllabus_tokens + material_tokens
+    observe("quiz.context_tokens", tokens)
+    return QuizContext(
+        syllabus=syllabus_text,
+        materials="\n".join([doc.page_content for doc in materials]),
+        docs=syllabus + materials,
+        tokens=tokens,
+    )
+
+
+# syllabus + material context for a quiz prompt, as (syllabus, materials) text
+async def build_quiz_context(
+    class_id: str, query: str, digest: Optional[str] = None
+) -> Tuple[str, str]:
+    context = await assemble_quiz_context(class_id, query, digest=digest)
+    return context.syllabus, context.materials
@@ -0,0 +1,162 @@
+import os
+import asyncio
+from dotenv import load_dotenv
+from typing import AsyncIterator, List, Optional, Set
+from pydantic import ValidationError
+from langchain.prompts import PromptTemplate
+from utils.metrics_util import increment, observe
+from utils.token_util import count_tokens
+from schemas.classroom import ClassQuizBody, Question, QuizResponse
+from utils.llm_util import StructuredLLM, format_instruction
+from services.quiz_context_service import quiz_query, build_quiz_context
+
+load_dotenv()
+
+# streamed quizzes are generated in parallel parts of at most this many questions
+QUIZ_STREAM_BATCH = int(os.getenv("QUIZ_STREAM_BATCH", 5))
+
+template = PromptTemplate(
+    input_variables=[
+        "title",
+        "topic",
+        "syllabus",
+        "materials",
+        "difficulty",
+        "description",
+        "number_of_questions",
+    ],
+    partial_variables={"format_instruction": format_instruction(QuizResponse)},
+    template="""
+        You are an expert educational content creator.
+
+        Task: Generate {number_of_questions} high-quality questions based on the given details.
+
+        Title: {title}
+        Topic: {topic}
+        Difficulty: {difficulty}
+        Description: {description}
+        Syllabus: {syllabus}
+        Materials: {materials}
+
+        Guidelines:
+        - Ensure all questions are strictly within the provided syllabus, class materials and aligned with the description and topic.
+        - Match the difficulty level accurately:
+            - Easy: basic recall or understanding
+            - Medium: requires some reasoning or multi-step thinking
+            - Hard: advanced critical thinking, problem-solving, or application
+        - Questions should be diverse (not repeating the same structure).
+        - Avoid vague or ambiguous wording.
+
+        {format_instruction}
+    """,
+)
+
+quiz_llm = StructuredLLM("quiz_generate", template, QuizResponse)
+
+
+async def build_quiz_inputs(
+    data: ClassQuizBody, digest=None, in_scope: bool = True
+) -> dict:
+    query = quiz_query(data.title, data.topic, data.description)
+    if in_scope:
+        syllabus, materials = await build_quiz_context(
+            data.class_id, query, digest.text if digest else None
+        )
+    else:
+        # nothing in the syllabus mentions the topic, a vector search would
+        # only bring back unrelated chunks
+        syllabus, materials = digest.text if digest else "", ""
+    inputs = {
+        "title": data.title,
+        "topic": data.topic,
+        "syllabus": syllabus,
+        "materials": materials,
+        "difficulty": data.difficulty,
+        "description": data.description,
+        "number_of_questions": data.number_of_questions,
+    }
+    prompt_tokens = count_tokens(template.format(**inputs))
+    observe("quiz.prompt_tokens", prompt_tokens)
+    return inputs
+
+
+def question_key(question: Question) -> str:
+    return " ".join(question.question.lower().split())
+
+
+def distinct_questions(
+    questions: List[Question], exclude: Set[str], limit: int
+) -> List[Question]:
+    kept = []
+    for question in questions:
+        if question_key(question) not in exclude and len(kept) < limit:
+            exclude.add(question_key(question))
+            kept.append(question)
+    return kept
+
+
+def _valid_question(item: dict):
+    try:
+        question = Question.model_validate(item)
+    except ValidationError:
+        return None
+    if not question.options or not 0 <= question.answer < len(question.options):
+        return None
+    return question
+
+
+def valid_questions(questions: List[Question]) -> List[Question]:
+    """The questions whose answer index points at one of their options."""
+    kept = [_valid_question(q.model_dump()) for q in questions]
+    return [q for q in kept if q is not None]
+
+
+async def stream_quiz_questions(
+    inputs: dict, total: int, exclude: Optional[Set[str]] = None
+) -> AsyncIterator[Question]:
+    """Yield up to `total` distinct questions (none whose question_key is in
+    `exclude`) as they are parsed from the streamed output. Larger requests run
+    as parallel parts of QUIZ_STREAM_BATCH questions, merged in arrival order."""
+    parts = [
+        min(QUIZ_STREAM_BATCH, total - i) for i in range(0, total, QUIZ_STREAM_BATCH)
+    ]
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    async def generate_part(index: int, count: int):
+        part = {**inputs, "number_of_questions": count}
+        if len(parts) > 1:
+            part["description"] = (
+                f"{inputs['description']} (question set {index + 1} of {len(parts)}, "
+                "cover different aspects than the other sets)"
+            )
+        try:
+            async for item in quiz_llm.astream_items(part, "questions"):
+                await queue.put(item)
+        except Exception as e:
+            print(f"Quiz stream part {index + 1} error: {e}")
+            increment("quiz.stream_part_errors")
+        finally:
+            await queue.put(finished)
+
+    tasks = [asyncio.create_task(generate_part(i, c)) for i, c in enumerate(parts)]
+    seen, sent, done = set(exclude or ()), 0, 0
+    try:
+        while done < len(tasks) and sent < total:
+            item = await queue.get()
+            if item is finished:
+                done += 1
+                continue
+            question = _valid_question(item)
+            if question is None:
+                increment("quiz.stream_invalid_questions")
+                continue
+            if question_key(question) in seen:
+                increment("quiz.stream_duplicate_questions")
+                continue
+            seen.add(question_key(question))
+            sent += 1
+            yield question
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,225 @@
+import os
+import asyncio
+from typing import Optional
+from dotenv import load_dotenv
+from datetime import datetime, timezone
+from utils.db_util import db
+from utils.metrics_util import increment
+from utils.llm_telemetry_util import llm_tags
+from utils.llm_gateway_util import Priority, llm_priority
+from services.evaluation_service import evaluation_batcher
+
+load_dotenv()
+
+# submissions read, scored and written per round; the job's cursor moves
+# (in the same transaction as the scores) after each page
+REEVALUATION_PAGE_SIZE = int(os.getenv("REEVALUATION_PAGE_SIZE", 40))
+
+UNFINISHED = ["PENDING", "PROCESSING"]
+
+# job id -> task, for jobs running in this process
+_running = {}
+
+
+def _answer(submission):
+    if submission.textSubmission:
+        return submission.textSubmission.content
+    if submission.voiceSubmission:
+        return submission.voiceSubmission.transcript
+    return None
+
+
+def _result_data(result) -> dict:
+    return {
+        "score": result.score,
+        "feedback": result.feedback,
+        "strengths": result.strengths,
+        "improvements": result.areas_for_improvement,
+    }
+
+
+async def _rescore_page(job, assignment, submissions) -> Optional[int]:
+    """Score one page through the batched, rate limited evaluation path and
+    write the scores and the new cursor in one transaction. The cursor stops
+    before the first submission that could not be scored so a resumed job
+    retries it. Returns the number of failed evaluations, or None, writing
+    nothing, when the job was canceled while the page was scored."""
+    answers = [_answer(s) for s in submissions]
+    scored = [s for s, answer in zip(submissions, answers) if answer and answer.strip()]
+    with llm_priority(Priority.BACKGROUND), llm_tags(class_id=assignment.classroomId):
+        results = await asyncio.gather(
+            *(
+                evaluation_batcher.evaluate(
+                    assignment.id,
+                    assignment.question,
+                    assignment.referenceAns,
+                    _answer(s),
+                )
+                for s in scored
+            ),
+            return_exceptions=True,
+        )
+
+    # a newer edit cancels this job: its scores used the old reference and
+    # must not overwrite the new job's
+    current = await db.reevaluationjob.find_unique(where={"id": job.id})
+    if current is None or current.status == "CANCELED":
+        return None
+
+    failures = {
+        submission.id
+        for submission, result in zip(scored, results)
+        if isinstance(result, BaseException)
+    }
+    done = len(submissions)
+    for i, submission in enumerate(submissions):
+        if submission.id in failures:
+            done = i
+            break
+    cursor = submissions[done - 1].id if done else current.cursor
+    written = {s.id for s in submissions[:done]}
+    rescored = sum(1 for s in scored if s.id in written)
+    skipped = done - rescored
+
+    async with db.batch_() as batcher:
+        for submission, result in zip(scored, results):
+            if isinstance(result, BaseException):
+                print(f"Re-evaluation error for submission {submission.id}: {result}")
+                continue
+            if submission.textSubmission:
+                batcher.textsubmission.update(
+                    where={"submissionId": submission.id}, data=_result_data(result)
+                )
+            else:
+                batcher.voicesubmission.update(
+                    where={"submissionId": submission.id}, data=_result_data(result)
+                )
+        batcher.reevaluationjob.update(
+            where={"id": job.id},
+            data={
+                "cursor": cursor,
+                "processed": {"increment": done},
+                "rescored": {"increment": rescored},
+                "skipped": {"increment": skipped},
+                "failed": {"increment": len(failures)},
+            },
+        )
+    increment("reevaluation.rescored", rescored)
+    increment("reevaluation.failed", len(failures))
+    return len(failures)
+
+
+async def _run_job(job_id: str):
+    try:
+        job = await db.reevaluationjob.update(
+            where={"id": job_id}, data={"status": "PROCESSING"}
+        )
+        assignment = await db.assignment.find_unique(where={"id": job.assignmentId})
+        cursor = job.cursor
+        while True:
+            job = await db.reevaluationjob.find_unique(where={"id": job_id})
+            if job is None or job.status == "CANCELED":
+                return
+            where = {"assignmentId": assignment.id}
+            if cursor:
+                where["id"] = {"gt": cursor}
+            submissions = await db.submission.find_many(
+                where=where,
+                order={"id": "asc"},
+                take=REEVALUATION_PAGE_SIZE,
+                include={"textSubmission": True, "voiceSubmission": True},
+            )
+            if not submissions:
+                break
+            failed = await _rescore_page(job, assignment, submissions)
+            if failed is None:
+                return
+            if failed:
+                # stop at the cursor; resume=True retries from the failed one
+                await db.reevaluationjob.update(
+                    where={"id": job_id},
+                    data={
+                        "status": "FAILED",
+                        "error": f"{failed} submissions could not be re-scored",
+                        "finishedAt": datetime.now(timezone.utc),
+                    },
+                )
+                increment("reevaluation.errors")
+                return
+            cursor = submissions[-1].id
+
+        await db.reevaluationjob.update(
+            where={"id": job_id},
+            data={"status": "COMPLETED", "finishedAt": datetime.now(timezone.utc)},
+        )
+        increment("reevaluation.completed")
+    except asyncio.CancelledError:
+        # shutting down: the job stays PROCESSING and resumes on next start
+        raise
+    except Exception as e:
+        print(f"Re-evaluation job {job_id} failed: {e}")
+        increment("reevaluation.errors")
+        await db.reevaluationjob.update(
+            where={"id": job_id},
+            data={
+                "status": "FAILED",
+                "error": str(e),
+                "finishedAt": datetime.now(timezone.utc),
+            },
+        )
+    finally:
+        _running.pop(job_id, None)
+
+
+def _launch(job_id: str):
+    if job_id not in _running:
+        _running[job_id] = asyncio.create_task(_run_job(job_id))
+
+
+async def start_reevaluation(db, assignment_id: str, resume: bool = False):
+    """Start re-scoring every submission of the assignment. Unfinished jobs
+    for it are canceled first (their scores used the old reference); with
+    resume=True the latest failed job continues from its cursor instead."""
+    latest = await db.reevaluationjob.find_first(
+        where={"assignmentId": assignment_id}, order={"createdAt": "desc"}
+    )
+    if resume and latest and latest.status == "FAILED":
+        job = await db.reevaluationjob.update(
+            where={"id": latest.id},
+            data={"status": "PENDING", "error": None, "failed": 0, "finishedAt": None},
+        )
+        _launch(job.id)
+        return job
+
+    await db.reevaluationjob.update_many(
+        where={"assignmentId": assignment_id, "status": {"in": UNFINISHED}},
+        data={"status": "CANCELED", "finishedAt": datetime.now(timezone.utc)},
+    )
+    total = await db.submission.count(where={"assignmentId": assignment_id})
+    job = await db.reevaluationjob.create(
+        data={"assignmentId": assignment_id, "total": total}
+    )
+    _launch(job.id)
+    return job
+
+
+async def latest_reevaluation(db, assignment_id: str):
+    return await db.reevaluationjob.find_first(
+        where={"assignmentId": assignment_id}, order={"createdAt": "desc"}
+    )
+
+
+# continue jobs that were running when the process last stopped
+async def resume_reevaluations():
+    try:
+        jobs = await db.reevaluationjob.find_many(where={"status": {"in": UNFINISHED}})
+        for job in jobs:
+            _launch(job.id)
+    except Exception as e:
+        print(f"Re-evaluation resume error: {e}")
+
+
+async def stop_reevaluations():
+    for task in list(_running.values()):
+        task.cancel()
+    _running.clear()
@@ -0,0 +1,126 @@
+import os
+import time
+import asyncio
+from typing import List
+from dotenv import load_dotenv
+from utils.cache_util import LRUCache
+from utils.metrics_util import observe
+from utils.minhash_util import MINHASH_BANDS, MINHASH_ROWS, LSHIndex, minhash
+
+load_dotenv()
+
+# submissions whose estimated jaccard similarity reaches this are clustered
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", 0.8))
+# assignments whose lsh index is kept in memory
+SIMILARITY_INDEX_CACHE_SIZE = int(os.getenv("SIMILARITY_INDEX_CACHE_SIZE", 64))
+
+similarity_indexes = LRUCache("similarity_index", SIMILARITY_INDEX_CACHE_SIZE)
+_build_locks = {}
+
+
+def _answer_text(submission) -> str:
+    if submission.textSubmission:
+        return submission.textSubmission.content
+    if submission.voiceSubmission:
+        return submission.voiceSubmission.transcript or ""
+    return ""
+
+
+async def _build_index(db, assignment_id: str) -> LSHIndex:
+    """Index the stored signatures, computing (and storing) the missing ones
+    for submissions made before they were recorded."""
+    index = LSHIndex()
+    signed = await db.submission.find_many(
+        where={"assignmentId": assignment_id, "NOT": {"minhash": {"isEmpty": True}}}
+    )
+    stale = []
+    for submission in signed:
+        if len(submission.minhash) == MINHASH_BANDS * MINHASH_ROWS:
+            index.add(submission.id, submission.minhash)
+        else:
+            # signed with other MINHASH_BANDS / MINHASH_ROWS settings
+            stale.append(submission.id)
+
+    unsigned = await db.submission.find_many(
+        where={
+            "assignmentId": assignment_id,
+            "OR": [{"minhash": {"isEmpty": True}}, {"id": {"in": stale}}],
+        },
+        include={"textSubmission": True, "voiceSubmission": True},
+    )
+    texts = {s.id: _answer_text(s) for s in unsigned if _answer_text(s).strip()}
+    signatures = await asyncio.to_thread(
+        lambda: {sid: minhash(text) for sid, text in texts.items()}
+    )
+    for submission_id, signature in signatures.items():
+        if not signature:
+            continue
+        await db.submission.update(
+            where={"id": submission_id}, data={"minhash": signature}
+        )
+        index.add(submission_id, signature)
+    return index
+
+
+async def get_similarity_index(db, assignment_id: str) -> LSHIndex:
+    index = similarity_indexes.get(assignment_id)
+    if index is not None:
+        return index
+    lock = _build_locks.setdefault(assignment_id, asyncio.Lock())
+    async with lock:
+        index = similarity_indexes.get(assignment_id)
+        if index is None:
+            index = await _build_index(db, assignment_id)
+            similarity_indexes.set(assignment_id, index)
+    _build_locks.pop(assignment_id, None)
+    return index
+
+
+async def index_submission(db, assignment_id: str, submission_id: str, text: str):
+    """Store the answer's signature and add it to the assignment's index if
+    it is loaded. Never fails the submission it is called for."""
+    try:
+        signature = await asyncio.to_thread(minhash, text or "")
+        if not signature:
+            return
+        await db.submission.update(
+            where={"id": submission_id}, data={"minhash": signature}
+        )
+        index = similarity_indexes.get(assignment_id)
+        if index is not None:
+            index.add(submission_id, signature)
+    except Exception as e:
+        print(f"Similarity indexing error for submission {submission_id}: {e}")
+
+
+def forget_similarity_index(assignment_id: str):
+    similarity_indexes.pop(assignment_id)
+
+
+async def similarity_clusters(
+    db, assignment_id: str, threshold: float = SIMILARITY_THRESHOLD
+) -> List[dict]:
+    """Clusters of near-duplicate submissions, with the students behind them."""
+    index = await get_similarity_index(db, assignment_id)
+    started = time.perf_counter()
+    clusters = index.clusters(threshold)
+    observe("similarity.clusters", time.perf_counter() - started)
+    ids = [member for cluster in clusters for member in cluster["members"]]
+    submissions = {
+        s.id: s
+        for s in await db.submission.find_many(
+            where={"id": {"in": ids}}, include={"student": True}
+        )
+    }
+    for cluster in clusters:
+        cluster["submissions"] = [
+            {
+                "submissionId": member,
+                "studentId": submissions[member].studentId,
+                "studentName": submissions[member].student.name,
+                "submittedAt": submissions[member].submittedAt,
+            }
+            for member in cluster.pop("members")
+            if member in submissions
+        ]
+    return [cluster for cluster in clusters if len(cluster["submissions"]) > 1]
@@ -0,0 +1,229 @@
+import asyncio
+import assemblyai as aai
+from utils.db_util import db
+from utils.metrics_util import increment
+from utils.llm_telemetry_util import llm_tags
+from utils.llm_gateway_util import Priority, llm_priority
+from utils.aai_util import (
+    AAI_WEBHOOK_URL,
+    AAI_POLL_TIMEOUT,
+    AAI_POLL_INTERVAL,
+    AAI_SUBMIT_ATTEMPTS,
+    AAI_POLL_MAX_INTERVAL,
+    aai_job_transcriber,
+)
+from schemas.assignment import AssignmentEvalOutput
+from services.similarity_service import index_submission
+from services.evaluation_service import evaluation_batcher
+
+# voice answers are transcribed by assemblyai from their stored url as async
+# jobs; the finished transcript comes back by webhook (or polling) and is
+# evaluated then, so no request or worker waits on the transcription
+
+# transcript id -> polling task, for jobs watched by this process
+_polling = {}
+# submissions waiting to retry a failed submit or evaluation
+_retries = set()
+# transcript ids being completed (webhook and poll may arrive together)
+_completing = set()
+
+
+async def start_voice_transcription(
+    db, voice_submission_id: str, file_url: str, attempt: int = 0
+):
+    """Submit the stored audio for transcription and remember the job on the
+    voice submission. Failed submits are retried with backoff, then recorded
+    on the submission; never fails the submission it is called for."""
+    try:
+        transcript = await asyncio.to_thread(aai_job_transcriber.submit, file_url)
+        await db.voicesubmission.update(
+            where={"id": voice_submission_id}, data={"transcriptId": transcript.id}
+        )
+        increment("transcription.submitted")
+        if not AAI_WEBHOOK_URL:
+            _watch(transcript.id)
+    except Exception as e:
+        print(f"Transcription submit error for {voice_submission_id}: {e}")
+        increment("transcription.errors")
+        if attempt + 1 < AAI_SUBMIT_ATTEMPTS:
+            task = asyncio.create_task(
+                _retry_submit(db, voice_submission_id, file_url, attempt + 1)
+            )
+            _retries.add(task)
+            task.add_done_callback(_retries.discard)
+            return
+        increment("transcription.failed")
+        try:
+            await db.voicesubmission.update(
+                where={"id": voice_submission_id},
+                data={"feedback": f"Transcription could not be started: {e}"},
+            )
+        except Exception as error:
+            print(f"Transcription failure not saved for {voice_submission_id}: {error}")
+
+
+async def _retry_submit(db, voice_submission_id: str, file_url: str, attempt: int):
+    await asyncio.sleep(AAI_POLL_INTERVAL * 2**attempt)
+    await start_voice_transcription(db, voice_submission_id, file_url, attempt)
+
+
+async def complete_voice_transcription(
+    db, transcript_id: str, transcript=None, attempt: int = 0
+):
+    """Store and evaluate a finished transcript. The transcript is saved
+    before it is evaluated; failed evaluations are retried with backoff, then
+    recorded on the submission. Unknown or already evaluated transcripts are
+    ignored, so repeated webhooks are harmless."""
+    if transcript_id in _completing:
+        return
+    _completing.add(transcript_id)
+    try:
+        voice_submission = await db.voicesubmission.find_unique(
+            where={"transcriptId": transcript_id},
+            include={"submission": {"include": {"assignment": True}}},
+        )
+        if (
+            voice_submission is None
+            or voice_submission.score is not None
+            or voice_submission.feedback is not None
+        ):
+            return
+        text = voice_submission.transcript
+        if text is None:
+            if transcript is None:
+                transcript = await asyncio.to_thread(
+                    aai.Transcript.get_by_id, transcript_id
+                )
+
+            if transcript.status == "error":
+                print(f"Transcription error: {transcript.error}")
+                increment("transcription.failed")
+                await db.voicesubmission.update(
+                    where={"id": voice_submission.id},
+                    data={"feedback": f"Transcription failed: {transcript.error}"},
+                )
+                return
+            if transcript.status != "completed":
+                return
+
+            text = transcript.text
+            await db.voicesubmission.update(
+                where={"id": voice_submission.id}, data={"transcript": text}
+            )
+            increment("transcription.completed")
+
+        assignment = voice_submission.submission.assignment
+        try:
+            with llm_priority(Priority.BACKGROUND), llm_tags(
+                class_id=assignment.classroomId
+            ):
+                eval_result: AssignmentEvalOutput = await evaluation_batcher.evaluate(
+                    assignment.id,
+                    assignment.question,
+                    assignment.referenceAns,
+                    text,
+                )
+        except Exception as e:
+            print(f"Voice evaluation error for {voice_submission.id}: {e}")
+            increment("transcription.eval_errors")
+            if attempt + 1 < AAI_SUBMIT_ATTEMPTS:
+                task = asyncio.create_task(
+                    _retry_evaluation(db, transcript_id, attempt + 1)
+                )
+                _retries.add(task)
+                task.add_done_callback(_retries.discard)
+                return
+            increment("transcription.eval_failed")
+            await db.voicesubmission.update(
+                where={"id": voice_submission.id},
+                data={"feedback": f"Evaluation failed: {e}"},
+            )
+            return
+
+        await db.voicesubmission.update(
+            where={"id": voice_submission.id},
+            data={
+                "score": eval_result.score,
+                "feedback": eval_result.feedback,
+                "strengths": eval_result.strengths,
+                "improvements": eval_result.areas_for_improvement,
+            },
+        )
+        await index_submission(db, assignment.id, voice_submission.submissionId, text)
+    except Exception as e:
+        print(f"Voice submission processing error: {e}")
+        increment("transcription.errors")
+    finally:
+        _completing.discard(transcript_id)
+
+
+async def _retry_evaluation(db, transcript_id: str, attempt: int):
+    await asyncio.sleep(AAI_POLL_INTERVAL * 2**attempt)
+    await complete_voice_transcription(db, transcript_id, attempt=attempt)
+
+
+async def _poll(transcript_id: str):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + AAI_POLL_TIMEOUT
+    interval = AAI_POLL_INTERVAL
+    try:
+        while True:
+            if loop.time() >= deadline:
+                # still queued or running: keep checking, less often
+                interval = min(AAI_POLL_MAX_INTERVAL, interval * 2)
+            await asyncio.sleep(interval)
+            try:
+                transcript = await asyncio.to_thread(
+                    aai.Transcript.get_by_id, transcript_id
+                )
+            except Exception as e:
+                print(f"Transcription poll error for {transcript_id}: {e}")
+                continue
+            if transcript.status in ("completed", "error"):
+                await complete_voice_transcription(db, transcript_id, transcript)
+                return
+    finally:
+        _polling.pop(transcript_id, None)
+
+
+def _watch(transcript_id: str):
+    if transcript_id not in _polling:
+        _polling[transcript_id] = asyncio.create_task(_poll(transcript_id))
+
+
+# collect jobs submitted before the process last stopped (their webhook may
+# have been missed while it was down), evaluate transcripts stored but not
+# scored and submit the ones it never submitted
+async def resume_transcriptions():
+    try:
+        pending = await db.voicesubmission.find_many(
+            where={"score": None, "feedback": None}
+        )
+        for voice_submission in pending:
+            if voice_submission.transcript is not None:
+                if not voice_submission.transcriptId:
+                    continue
+                task = asyncio.create_task(
+                    complete_voice_transcription(db, voice_submission.transcriptId)
+                )
+                _retries.add(task)
+                task.add_done_callback(_retries.discard)
+            elif voice_submission.transcriptId:
+                _watch(voice_submission.transcriptId)
+            else:
+                task = asyncio.create_task(
+                    start_voice_transcription(
+                        db, voice_submission.id, voice_submission.fileUrl
+                    )
+                )
+                _retries.add(task)
+                task.add_done_callback(_retries.discard)
+    except Exception as e:
+        print(f"Transcription resume error: {e}")
+
+
+async def stop_transcriptions():
+    for task in [*_polling.values(), *_retries]:
+        task.cancel()
+    _polling.clear()
+    _retries.clear()
@@ -0,0 +1,69 @@
+import os
+from typing import List, Optional, Set
+from prisma import Json
+from dotenv import load_dotenv
+from pydantic import BaseModel
+from utils.cache_util import LRUCache
+from utils.metrics_util import increment
+from utils.token_util import count_tokens
+from utils.syllabus_digest_util import build_digest, digest_text, digest_vocabulary
+
+load_dotenv()
+
+SYLLABUS_DIGEST_CACHE_SIZE = int(os.getenv("SYLLABUS_DIGEST_CACHE_SIZE", 512))
+SYLLABUS_DIGEST_CACHE_TTL = float(os.getenv("SYLLABUS_DIGEST_CACHE_TTL", 3600))  # seconds
+
+
+class ClassDigest(BaseModel):
+    text: str
+    tokens: int
+    vocabulary: Set[str]
+
+
+# class id -> digest, dropped whenever the class's syllabus is re-digested
+digest_cache = LRUCache(
+    "syllabus_digest", SYLLABUS_DIGEST_CACHE_SIZE, SYLLABUS_DIGEST_CACHE_TTL
+)
+
+
+def _to_class_digest(entries: List[dict], outline: List[str], key_terms: List[str]):
+    text = digest_text(outline, key_terms)
+    return ClassDigest(
+        text=text,
+        tokens=count_tokens(text),
+        vocabulary=digest_vocabulary(entries, outline),
+    )
+
+
+# build or update a class's digest from its parsed syllabus pages
+async def refresh_syllabus_digest(db, class_id: str, pages: List[str]) -> int:
+    existing = await db.syllabusdigest.find_unique(where={"classroomId": class_id})
+    entries, outline, key_terms, changed = build_digest(
+        pages, existing.pages if existing else None
+    )
+    if existing and not changed and len(entries) == len(existing.pages):
+        return 0
+    data = {"outline": outline, "keyTerms": key_terms, "pages": Json(entries)}
+    await db.syllabusdigest.upsert(
+        where={"classroomId": class_id},
+        data={"create": {"classroomId": class_id, **data}, "update": data},
+    )
+    digest_cache.set(class_id, _to_class_digest(entries, outline, key_terms))
+    increment("syllabus_digest.pages_digested", changed)
+    return changed
+
+
+async def get_syllabus_digest(db, class_id: str) -> Optional[ClassDigest]:
+    digest = digest_cache.get(class_id)
+    if digest is not None:
+        return digest
+    row = await db.syllabusdigest.find_unique(where={"classroomId": class_id})
+    if not row:
+        return None
+    digest = _to_class_digest(row.pages, row.outline, row.keyTerms)
+    digest_cache.set(class_id, digest)
+    return digest
+
+
+def forget_syllabus_digest(class_id: str):
+    digest_cache.pop(class_id)
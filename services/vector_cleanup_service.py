@@ -0,0 +1,184 @@
+# vector_cleanup_service.py
+# Removes vectors whose classroom/material rows are gone, either right after a
+# delete (through the ingestion queue) or in bulk via scripts/compact_vectors.py.
+# Shared content vectors go once no class or material uses their file anymore.
+
+from utils.db_util import db
+from utils.metrics_util import increment
+from utils.vector_partition_util import route_collection, VECTOR_PARTITIONING
+from utils.chroma_util import (
+    drop_collection,
+    get_vector_store,
+    list_vector_stores,
+    content_vector_store,
+    SYLLABUS_COLLECTION,
+    MATERIAL_COLLECTION,
+)
+
+COMPACTION_PAGE_SIZE = 500  # vectors fetched per page while scanning
+COMPACTION_DELETE_BATCH = 200  # ids per delete call
+
+
+def _content_hashes(store, where: dict) -> set:
+    found = store._collection.get(where=where, include=["metadatas"])
+    return {
+        meta["content_hash"]
+        for meta in found.get("metadatas") or []
+        if meta and meta.get("content_hash")
+    }
+
+
+def _hash_in_use(sha256: str) -> bool:
+    for base in (SYLLABUS_COLLECTION, MATERIAL_COLLECTION):
+        for store in list_vector_stores(base):
+            found = store._collection.get(where={"content_hash": sha256}, limit=1)
+            if found.get("ids"):
+                return True
+    return False
+
+
+def _release_content_vectors(hashes: set):
+    """Drop the shared copy of each file's vectors nothing refers to anymore."""
+    for sha256 in hashes:
+        if not _hash_in_use(sha256):
+            content_vector_store._collection.delete(where={"content_hash": sha256})
+            increment("vectors.content_released")
+
+
+def delete_class_vectors(class_id: str):
+    hashes = set()
+    for base in (SYLLABUS_COLLECTION, MATERIAL_COLLECTION):
+        store = get_vector_store(base, class_id)
+        hashes |= _content_hashes(store, {"class_id": class_id})
+        if VECTOR_PARTITIONING == "per_class":
+            try:
+                drop_collection(route_collection(base, class_id))
+            except Exception as e:
+                # the class never had vectors of this kind
+                print(f"Drop collection skipped: {e}")
+        else:
+            store._collection.delete(where={"class_id": class_id})
+    _release_content_vectors(hashes)
+
+
+def delete_material_vectors(class_id: str, material_id: str):
+    store = get_vector_store(MATERIAL_COLLECTION, class_id)
+    hashes = _content_hashes(store, {"material_id": material_id})
+    store._collection.delete(where={"material_id": material_id})
+    _release_content_vectors(hashes)
+
+
+def _scan_metadata(store, page_size: int):
+    offset = 0
+    while True:
+        page = store._collection.get(
+            include=["metadatas"], limit=page_size, offset=offset
+        )
+        ids = page.get("ids") or []
+        if not ids:
+            return
+        yield from zip(ids, page["metadatas"])
+        offset += len(ids)
+
+
+async def _existing_ids(model, ids: set) -> set:
+    found = set()
+    ids = list(ids)
+    for i in range(0, len(ids), COMPACTION_PAGE_SIZE):
+        rows = await model.find_many(
+            where={"id": {"in": ids[i : i + COMPACTION_PAGE_SIZE]}}
+        )
+        found.update(row.id for row in rows)
+    return found
+
+
+async def _compact_store(
+    store, base: str, key: str, model, dry_run: bool, live_hashes: set
+) -> dict:
+    by_owner = {}
+    hashes = {}
+    scanned = 0
+    for vector_id, metadata in _scan_metadata(store, COMPACTION_PAGE_SIZE):
+        scanned += 1
+        metadata = metadata or {}
+        owner = metadata.get(key)
+        if not owner:
+            # not written by ingestion, not ours to judge
+            continue
+        by_owner.setdefault(owner, []).append(vector_id)
+        if metadata.get("content_hash"):
+            hashes.setdefault(owner, set()).add(metadata["content_hash"])
+
+    alive = await _existing_ids(model, set(by_owner))
+    orphaned = [
+        vector_id
+        for owner, vector_ids in by_owner.items()
+        if owner not in alive
+        for vector_id in vector_ids
+    ]
+    for owner in alive:
+        live_hashes |= hashes.get(owner, set())
+
+    if not dry_run and orphaned:
+        name = store._collection.name
+        if name != base and len(orphaned) == scanned:
+            # a partition with nothing alive left, drop it whole
+            drop_collection(name)
+        else:
+            for i in range(0, len(orphaned), COMPACTION_DELETE_BATCH):
+                store._collection.delete(
+                    ids=orphaned[i : i + COMPACTION_DELETE_BATCH]
+                )
+        increment("vectors.compacted", len(orphaned))
+
+    return {"scanned": scanned, "orphaned": len(orphaned)}
+
+
+async def _compact_kind(
+    base: str, key: str, model, dry_run: bool, live_hashes: set
+) -> dict:
+    totals = {"collections": 0, "scanned": 0, "orphaned": 0}
+    for store in list_vector_stores(base):
+        counts = await _compact_store(store, base, key, model, dry_run, live_hashes)
+        totals["collections"] += 1
+        totals["scanned"] += counts["scanned"]
+        totals["orphaned"] += counts["orphaned"]
+    return totals
+
+
+def _compact_content(live_hashes: set, dry_run: bool) -> dict:
+    """Shared vectors whose file no surviving class or material uses."""
+    orphaned, scanned = [], 0
+    for vector_id, metadata in _scan_metadata(
+        content_vector_store, COMPACTION_PAGE_SIZE
+    ):
+        scanned += 1
+        content_hash = (metadata or {}).get("content_hash")
+        if content_hash and content_hash not in live_hashes:
+            orphaned.append(vector_id)
+
+    if not dry_run and orphaned:
+        for i in range(0, len(orphaned), COMPACTION_DELETE_BATCH):
+            content_vector_store._collection.delete(
+                ids=orphaned[i : i + COMPACTION_DELETE_BATCH]
+            )
+        increment("vectors.compacted", len(orphaned))
+
+    return {"collections": 1, "scanned": scanned, "orphaned": len(orphaned)}
+
+
+async def compact_orphaned_vectors(dry_run: bool = False) -> dict:
+    """Delete vectors with no matching Classroom/Material row across every
+    partition, then the shared content vectors no remaining vector refers
+    to. Returns per-kind counts of scanned and reclaimed vectors."""
+    live_hashes = set()
+    result = {
+        "syllabus": await _compact_kind(
+            SYLLABUS_COLLECTION, "class_id", db.classroom, dry_run, live_hashes
+        ),
+        "materials": await _compact_kind(
+            MATERIAL_COLLECTION, "material_id", db.material, dry_run, live_hashes
+        ),
+    }
+    result["content"] = _compact_content(live_hashes, dry_run)
+    return result
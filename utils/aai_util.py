@@ -6,6 +6,32 @@ load_dotenv()
 
 aai.settings.api_key = os.getenv("ASSEMBLY_AI_API_KEY")
 
+# public url of POST /webhooks/assemblyai; without it finished transcripts
+# are collected by polling
+AAI_WEBHOOK_URL = os.getenv("AAI_WEBHOOK_URL")
+# sent back by assemblyai in AAI_WEBHOOK_HEADER so the webhook can trust it
+AAI_WEBHOOK_SECRET = os.getenv("AAI_WEBHOOK_SECRET")
+AAI_WEBHOOK_HEADER = "X-Webhook-Secret"
+AAI_POLL_INTERVAL = float(os.getenv("AAI_POLL_INTERVAL", 5))  # seconds
+# jobs still unfinished after this are polled less and less often, up to
+# every AAI_POLL_MAX_INTERVAL
+AAI_POLL_TIMEOUT = float(os.getenv("AAI_POLL_TIMEOUT", 900))  # seconds
+AAI_POLL_MAX_INTERVAL = 300  # seconds
+# tries to submit a job, or to evaluate its transcript, before the voice
+# submission is marked as failed
+AAI_SUBMIT_ATTEMPTS = int(os.getenv("AAI_SUBMIT_ATTEMPTS", 3))
+
 aai_config = aai.TranscriptionConfig(speech_model=aai.SpeechModel.best)
 
 aai_transcriber = aai.Transcriber(config=aai_config)
+
+# async jobs: submit() returns at once with the queued transcript
+aai_job_config = aai.TranscriptionConfig(speech_model=aai.SpeechModel.best)
+if AAI_WEBHOOK_URL:
+    aai_job_config.set_webhook(
+        AAI_WEBHOOK_URL,
+        AAI_WEBHOOK_HEADER if AAI_WEBHOOK_SECRET else None,
+        AAI_WEBHOOK_SECRET,
+    )
+
+aai_job_transcriber = aai.Transcriber(config=aai_job_config)
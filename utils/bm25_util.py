@@ -0,0 +1,118 @@
+import re
+import math
+import threading
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+
+# keeps course codes / formula names like "cs-301" or "o(n.log.n)" parts together
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        # "cs-301" also matches a query for "cs301" / "301"
+        parts = re.split(r"[-_.]", token)
+        if len(parts) > 1:
+            tokens.append("".join(parts))
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """Incremental in-memory BM25 inverted index over one class's chunks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs: Dict[str, Document] = {}
+        self._lengths: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, ids: List[str], docs: List[Document]):
+        with self._lock:
+            for doc_id, doc in zip(ids, docs):
+                if doc_id in self._docs:
+                    self._remove(doc_id)
+                counts = Counter(tokenize(doc.page_content))
+                self._docs[doc_id] = doc
+                self._lengths[doc_id] = sum(counts.values())
+                self._total_length += self._lengths[doc_id]
+                for term, tf in counts.items():
+                    self._postings[term][doc_id] = tf
+
+    def _remove(self, doc_id: str):
+        doc = self._docs.pop(doc_id)
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in set(tokenize(doc.page_content)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def remove_where(self, predicate: Callable[[Document], bool]):
+        with self._lock:
+            for doc_id in [i for i, d in self._docs.items() if predicate(d)]:
+                self._remove(doc_id)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, Document, float]]:
+        with self._lock:
+            count = len(self._docs)
+            if not count:
+                return []
+            avg_length = self._total_length / count
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = BM25_K1 * (
+                        1 - BM25_B + BM25_B * self._lengths[doc_id] / avg_length
+                    )
+                    scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [(doc_id, self._docs[doc_id], score) for doc_id, score in ranked]
+
+
+# (kind, class id) -> index, built from the vector store on first use
+_indexes: Dict[Tuple[str, str], BM25Index] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_bm25_index(base: str, class_id: str) -> Optional[BM25Index]:
+    return _indexes.get((base, class_id))
+
+
+def set_bm25_index(base: str, class_id: str, index: BM25Index):
+    with _indexes_lock:
+        _indexes[(base, class_id)] = index
+
+
+def drop_bm25_index(base: str, class_id: str):
+    with _indexes_lock:
+        _indexes.pop((base, class_id), None)
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Tuple[str, Document]]], k: int, rrf_k: int = 60
+) -> List[Document]:
+    """Merge ranked (id, doc) lists: score = sum of 1 / (rrf_k + rank)."""
+    scores = defaultdict(float)
+    docs = {}
+    for ranking in rankings:
+        for rank, (doc_id, doc) in enumerate(ranking):
+            scores[doc_id] += 1.0 / (rrf_k + rank + 1)
+            docs.setdefault(doc_id, doc)
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+    return [docs[doc_id] for doc_id, _ in ranked]
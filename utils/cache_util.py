@@ -0,0 +1,109 @@
+import math
+import time
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+from utils.metrics_util import increment
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional per-entry ttl (seconds).
+    Hits and misses are counted in /metrics under cache.<name>."""
+
+    def __init__(self, name: str, maxsize: int, ttl: Optional[float] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    increment(f"cache.{self.name}.hit")
+                    return value
+                del self._data[key]
+        increment(f"cache.{self.name}.miss")
+        return default
+
+    def set(self, key: Hashable, value: Any):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                increment(f"cache.{self.name}.evicted")
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def items(self):
+        """Live entries; expired ones are dropped on the way."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                key
+                for key, (_, expires_at) in self._data.items()
+                if expires_at is not None and expires_at <= now
+            ]
+            for key in expired:
+                del self._data[key]
+            return [(key, value) for key, (value, _) in self._data.items()]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class SemanticCache:
+    """Bounded nearest-neighbour cache: a lookup hits the most similar stored
+    vector if its cosine similarity is at least `threshold`. LRU + ttl eviction
+    as in LRUCache, counted under cache.<name>."""
+
+    def __init__(
+        self, name: str, maxsize: int, threshold: float, ttl: Optional[float] = None
+    ):
+        self.name = name
+        self.threshold = threshold
+        self._entries = LRUCache(name, maxsize, ttl)
+        self._next_key = itertools.count()
+
+    def get(self, vector: List[float], default: Any = None) -> Any:
+        query = _normalize(vector)
+        best_key, best_score = None, self.threshold
+        for key, (stored, _) in self._entries.items():
+            score = sum(a * b for a, b in zip(query, stored))
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is None:
+            increment(f"cache.{self.name}.miss")
+            return default
+        # re-read through the lru so expiry and recency apply
+        entry = self._entries.get(best_key)
+        return default if entry is None else entry[1]
+
+    def set(self, vector: List[float], value: Any):
+        self._entries.set(next(self._next_key), (_normalize(vector), value))
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
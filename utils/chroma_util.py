@@ -1,24 +1,109 @@
 import os
+import chromadb
+from typing import List
 from dotenv import load_dotenv
 from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from chromadb.config import Settings
+from utils.vector_partition_util import route_collection
+from utils.embedding_util import CachedQueryEmbeddings, QUERY_EMBEDDING_CACHE_PATH
 
 load_dotenv()
 
-embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
-
-syllabus_vector_store = Chroma(
-    embedding_function=embeddings,
-    collection_name="class-syllabus",
-    tenant=os.getenv("CHROMA_TENANT"),
-    database=os.getenv("CHROMA_DATABASE"),
-    chroma_cloud_api_key=os.getenv("CHROMA_API_KEY"),
-)
-
-class_material_vector_store = Chroma(
-    embedding_function=embeddings,
-    collection_name="class-materials",
-    tenant=os.getenv("CHROMA_TENANT"),
-    database=os.getenv("CHROMA_DATABASE"),
-    chroma_cloud_api_key=os.getenv("CHROMA_API_KEY"),
-)
+# where vectors live:
+#   cloud  -> chroma cloud (CHROMA_API_KEY / CHROMA_TENANT / CHROMA_DATABASE)
+#   local  -> embedded chroma persisted on disk at CHROMA_PERSIST_DIR
+#   memory -> embedded chroma kept in memory, for tests and benchmarks
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "cloud")
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", ".chroma")
+
+# gemini, or local for the deterministic offline stand-in
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "gemini")
+
+SYLLABUS_COLLECTION = "class-syllabus"
+MATERIAL_COLLECTION = "class-materials"
+# one copy of the chunk vectors per content hash, used to dedupe uploads
+CONTENT_COLLECTION = "content-vectors"
+
+
+def _make_embeddings():
+    if EMBEDDING_BACKEND == "local":
+        from utils.local_embedding_util import LocalHashEmbeddings
+
+        return LocalHashEmbeddings()
+
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    return GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
+
+
+def _make_client():
+    settings = Settings(anonymized_telemetry=False)
+    if VECTOR_BACKEND == "local":
+        return chromadb.PersistentClient(path=CHROMA_PERSIST_DIR, settings=settings)
+    if VECTOR_BACKEND == "memory":
+        return chromadb.EphemeralClient(settings=settings)
+    return chromadb.CloudClient(
+        tenant=os.getenv("CHROMA_TENANT"),
+        database=os.getenv("CHROMA_DATABASE"),
+        api_key=os.getenv("CHROMA_API_KEY"),
+    )
+
+
+# repeated queries (quiz regeneration, agent lookups) skip the embedding call
+embeddings = CachedQueryEmbeddings(_make_embeddings())
+
+chroma_client = _make_client()
+
+# collection name -> store, filled lazily as classes are routed
+_stores = {}
+
+
+def get_collection_store(collection_name: str) -> Chroma:
+    if collection_name not in _stores:
+        _stores[collection_name] = Chroma(
+            client=chroma_client,
+            embedding_function=embeddings,
+            collection_name=collection_name,
+        )
+    return _stores[collection_name]
+
+
+def load_query_embedding_cache():
+    try:
+        embeddings.load(QUERY_EMBEDDING_CACHE_PATH)
+    except Exception as e:
+        print(f"Query embedding cache load error: {e}")
+
+
+def save_query_embedding_cache():
+    try:
+        embeddings.save(QUERY_EMBEDDING_CACHE_PATH)
+    except Exception as e:
+        print(f"Query embedding cache save error: {e}")
+
+
+def get_vector_store(base: str, class_id: str) -> Chroma:
+    return get_collection_store(route_collection(base, class_id))
+
+
+def drop_collection(collection_name: str):
+    _stores.pop(collection_name, None)
+    chroma_client.delete_collection(collection_name)
+
+
+def list_vector_stores(base: str) -> List[Chroma]:
+    """Every collection that may hold vectors of this kind, including the
+    global one left over from before partitioning."""
+    names = []
+    for collection in chroma_client.list_collections():
+        name = getattr(collection, "name", collection)
+        if name == base or name.startswith(f"{base}-"):
+            names.append(name)
+    return [get_collection_store(name) for name in names]
+
+
+syllabus_vector_store = get_collection_store(SYLLABUS_COLLECTION)
+
+class_material_vector_store = get_collection_store(MATERIAL_COLLECTION)
+
+content_vector_store = get_collection_store(CONTENT_COLLECTION)
@@ -1,5 +1,8 @@
 import os
+import time
+import uuid
 import cloudinary
+import cloudinary.utils
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,6 +11,9 @@ CLOUDINARY_CLIENT_NAME = os.getenv("CLOUDINARY_CLIENT_NAME")
 CLOUDINARY_CLIENT_API = os.getenv("CLOUDINARY_CLIENT_API")
 CLOUDINARY_CLIENT_SECRET = os.getenv("CLOUDINARY_CLIENT_SECRET")
 
+# how long a signed upload stays valid for (seconds)
+SIGNED_UPLOAD_TTL_SECONDS = int(os.getenv("SIGNED_UPLOAD_TTL_SECONDS", 600))
+
 
 cloudinary.config(
     cloud_name=CLOUDINARY_CLIENT_NAME,
@@ -15,3 +21,47 @@ cloudinary.config(
     api_secret=CLOUDINARY_CLIENT_SECRET,
     secure=True,
 )
+
+
+def generate_upload_signature(folder: str) -> dict:
+    """Sign upload params so the client can upload straight to Cloudinary.
+
+    The public id is part of the signature, so one signature can only ever
+    create one asset inside the given folder.
+    """
+    timestamp = int(time.time())
+    public_id = f"{folder}/{uuid.uuid4()}"
+    params = {
+        "public_id": public_id,
+        "timestamp": timestamp,
+        "access_mode": "public",
+    }
+    signature = cloudinary.utils.api_sign_request(params, CLOUDINARY_CLIENT_SECRET)
+    return {
+        **params,
+        "signature": signature,
+        "api_key": CLOUDINARY_CLIENT_API,
+        "cloud_name": CLOUDINARY_CLIENT_NAME,
+        "expires_at": timestamp + SIGNED_UPLOAD_TTL_SECONDS,
+        "upload_url": f"https://api.cloudinary.com/v1_1/{CLOUDINARY_CLIENT_NAME}/auto/upload",
+    }
+
+
+def verify_signed_upload(
+    public_id: str, version: int, signature: str, secure_url: str, folder: str
+) -> bool:
+    """Check that an upload reported by the client really came from Cloudinary,
+    landed in the expected folder and is being confirmed within the ttl."""
+    if not public_id.startswith(f"{folder}/"):
+        return False
+    if not secure_url.startswith(
+        f"https://res.cloudinary.com/{CLOUDINARY_CLIENT_NAME}/"
+    ):
+        return False
+    if public_id not in secure_url:
+        return False
+    if int(time.time()) - int(version) > SIGNED_UPLOAD_TTL_SECONDS:
+        return False
+    return cloudinary.utils.verify_api_response_signature(
+        public_id, version, signature
+    )
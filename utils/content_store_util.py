@@ -0,0 +1,101 @@
+import hashlib
+from typing import List, Optional
+from utils.chroma_util import content_vector_store
+
+# per-class keys that must not leak from one copy of a file to another
+OWNER_KEYS = ("class_id", "material_id")
+
+
+def sha256_hex(file_bytes: bytes) -> str:
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+async def find_file_asset(db, sha256: str):
+    return await db.fileasset.find_unique(where={"sha256": sha256})
+
+
+async def find_owned_file_asset(db, sha256: str, teacher_id: str):
+    """The stored file with these bytes, but only if this teacher already
+    uses it in one of their classes: a bare hash proves nothing about
+    holding the file, so it must not hand out anyone else's upload."""
+    file_asset = await find_file_asset(db, sha256)
+    if not file_asset:
+        return None
+    owned = await db.classroom.find_first(
+        where={"teacherId": teacher_id, "syllabusUrl": file_asset.fileUrl}
+    ) or await db.material.find_first(
+        where={
+            "fileUrl": file_asset.fileUrl,
+            "classroom": {"is": {"teacherId": teacher_id}},
+        }
+    )
+    return file_asset if owned else None
+
+
+async def save_file_asset(
+    db, sha256: str, file_url: str, pages: Optional[List[str]] = None
+):
+    update = {"fileUrl": file_url}
+    if pages is not None:
+        update["pages"] = pages
+    return await db.fileasset.upsert(
+        where={"sha256": sha256},
+        data={
+            "create": {"sha256": sha256, "fileUrl": file_url, "pages": pages or []},
+            "update": update,
+        },
+    )
+
+
+def store_content_vectors(sha256: str, documents: List[str], metadatas: List[dict], vectors):
+    """Keep one owner-free copy of a file's chunk vectors, keyed by its hash."""
+    content_vector_store._collection.upsert(
+        ids=[f"{sha256}:{i}" for i in range(len(documents))],
+        embeddings=vectors,
+        documents=documents,
+        metadatas=[
+            {k: v for k, v in meta.items() if k not in OWNER_KEYS}
+            for meta in metadatas
+        ],
+    )
+
+
+def copy_vectors(sha256: str, target_store, metadata: dict, id_prefix: str) -> int:
+    """Reuse embeddings already computed for identical bytes.
+
+    Looks up vectors tagged with the same content hash in the content store
+    (or, for data ingested before it existed, the target store) and re-adds
+    them to target_store with the new per-class metadata. Returns the number
+    of vectors written, 0 when nothing could be reused.
+    """
+    for source_store in (content_vector_store, target_store):
+        found = source_store.get(
+            where={"content_hash": sha256},
+            include=["embeddings", "documents", "metadatas"],
+        )
+        if not found or not found.get("ids"):
+            continue
+
+        # the same file may already be attached to several classes, keep one copy
+        seen = set()
+        embeddings, documents, metadatas = [], [], []
+        for embedding, document, meta in zip(
+            found["embeddings"], found["documents"], found["metadatas"]
+        ):
+            key = (meta.get("page"), meta.get("chunk"), document)
+            if key in seen:
+                continue
+            seen.add(key)
+            embeddings.append(list(embedding))
+            documents.append(document)
+            source_meta = {k: v for k, v in meta.items() if k not in OWNER_KEYS}
+            metadatas.append({**source_meta, **metadata})
+
+        target_store._collection.upsert(
+            ids=[f"{id_prefix}:{i}" for i in range(len(documents))],
+            embeddings=embeddings,
+            documents=documents,
+            metadatas=metadatas,
+        )
+        return len(documents)
+    return 0
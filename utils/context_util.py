@@ -0,0 +1,132 @@
+import re
+from typing import List, Set, Tuple
+from langchain_core.documents import Document
+from utils.token_util import CHARS_PER_TOKEN, count_tokens
+from utils.bm25_util import tokenize, reciprocal_rank_fusion
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# chunks sharing this much of their 5-word shingles count as duplicates
+DUPLICATE_THRESHOLD = 0.8
+# shorter shared prefixes/suffixes between chunks are left alone
+MIN_OVERLAP_CHARS = 40
+# remaining budget below which nothing more is packed
+MIN_PIECE_TOKENS = 20
+
+
+def _shingles(text: str, size: int = 5) -> Set[tuple]:
+    words = text.lower().split()
+    return {tuple(words[i : i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def _shared_edge(head: str, tail: str) -> int:
+    """Length of the longest suffix of head that is also a prefix of tail."""
+    if len(tail) < MIN_OVERLAP_CHARS:
+        return 0
+    # the shared text starts where head first contains the start of tail
+    start = head.find(tail[:MIN_OVERLAP_CHARS])
+    while start != -1:
+        if tail.startswith(head[start:]):
+            return len(head) - start
+        start = head.find(tail[:MIN_OVERLAP_CHARS], start + 1)
+    return 0
+
+
+def _adjacent(a: Document, b: Document) -> bool:
+    """Neighbouring chunks of the same page, the only ones the splitter overlaps."""
+    source = ("material_id", "class_id", "page")
+    if any(a.metadata.get(key) != b.metadata.get(key) for key in source):
+        return False
+    chunks = (a.metadata.get("chunk"), b.metadata.get("chunk"))
+    return None not in chunks and abs(chunks[0] - chunks[1]) == 1
+
+
+def dedupe_chunks(docs: List[Document]) -> List[Document]:
+    """Drop near-duplicate chunks and trim the text adjacent chunks share
+    (the splitter's overlap), keeping the first (highest ranked) copy."""
+    kept, kept_shingles = [], []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        if any(
+            len(shingles & seen) / len(shingles | seen) >= DUPLICATE_THRESHOLD
+            for seen in kept_shingles
+        ):
+            continue
+        text = doc.page_content
+        for other in kept:
+            if len(text) <= MIN_OVERLAP_CHARS or not _adjacent(doc, other):
+                continue
+            text = text[_shared_edge(other.page_content, text) :]
+            shared = _shared_edge(text, other.page_content)
+            if shared:
+                text = text[:-shared]
+        text = text.strip()
+        if not text:
+            continue
+        kept.append(Document(id=doc.id, page_content=text, metadata=doc.metadata))
+        kept_shingles.append(shingles)
+    return kept
+
+
+def rank_by_relevance(query: str, docs: List[Document]) -> List[Document]:
+    """Fuse the retrieval order with query term coverage."""
+    terms = set(tokenize(query))
+    keyed = [(str(i), doc) for i, doc in enumerate(docs)]
+    coverage = {
+        key: len(terms & set(tokenize(doc.page_content))) for key, doc in keyed
+    }
+    by_coverage = sorted(keyed, key=lambda item: coverage[item[0]], reverse=True)
+    return reciprocal_rank_fusion([keyed, by_coverage], len(docs))
+
+
+def extractive_summary(text: str, query: str, max_tokens: int) -> str:
+    """Keep the sentences that mention the most query terms, in their original
+    order, within max_tokens."""
+    terms = set(tokenize(query))
+    sentences = [s.strip() for s in SENTENCE_RE.split(text) if s.strip()]
+    scored = sorted(
+        range(len(sentences)),
+        key=lambda i: len(terms & set(tokenize(sentences[i]))),
+        reverse=True,
+    )
+    chosen, used = set(), 0
+    for i in scored:
+        tokens = count_tokens(sentences[i])
+        if used + tokens <= max_tokens:
+            chosen.add(i)
+            used += tokens
+    if not chosen and sentences:
+        # one long sentence, cut it down
+        return sentences[scored[0]][: max_tokens * CHARS_PER_TOKEN].rsplit(" ", 1)[0]
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+def pack_context(
+    query: str,
+    docs: List[Document],
+    budget: int,
+    full_chunks: int,
+    summary_tokens: int,
+    compress: bool = True,
+) -> Tuple[List[Document], int]:
+    """Pack ranked chunks into a token budget. The first full_chunks go in
+    verbatim when they fit, later ones are compressed to summary_tokens when
+    compress is set. Returns the packed chunks and the tokens they use."""
+    packed, used = [], 0
+    for rank, doc in enumerate(docs):
+        remaining = budget - used
+        if remaining < MIN_PIECE_TOKENS:
+            break
+        limit = remaining
+        if compress and rank >= full_chunks:
+            limit = min(remaining, summary_tokens)
+        text = doc.page_content
+        if count_tokens(text) > limit:
+            if not compress:
+                continue
+            text = extractive_summary(text, query, limit)
+            if not text:
+                continue
+        packed.append(Document(id=doc.id, page_content=text, metadata=doc.metadata))
+        used += count_tokens(text)
+    return packed, used
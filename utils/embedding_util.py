@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import asyncio
+from typing import List
+from dotenv import load_dotenv
+from utils.cache_util import LRUCache
+from utils.metrics_util import increment
+from utils.llm_telemetry_util import llm_telemetry
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+load_dotenv()
+
+# chunking
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))  # characters
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 150))  # characters
+
+# embedding requests
+# gemini embeds up to 100 texts per request, keep the batch size at or below that
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))  # texts per request
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", 4))  # requests in flight
+
+text_splitter = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=CHUNK_OVERLAP,
+    separators=["\n\n", "\n", ". ", " ", ""],
+)
+
+
+def chunk_pages(pages: List[str], metadata: dict) -> List[Document]:
+    """Split page text into overlapping chunks, keeping page + chunk position."""
+    docs = []
+    for page, text in enumerate(pages):
+        if not text.strip():
+            continue
+        for chunk in text_splitter.split_text(text):
+            docs.append(
+                Document(
+                    page_content=chunk,
+                    metadata={**metadata, "page": page, "chunk": len(docs)},
+                )
+            )
+    return docs
+
+
+async def embed_in_batches(
+    embedding_model,
+    texts: List[str],
+    batch_size: int = EMBED_BATCH_SIZE,
+    concurrency: int = EMBED_CONCURRENCY,
+) -> List[List[float]]:
+    """Embed texts with one request per batch and a cap on parallel requests.
+    Output order matches the input order."""
+    semaphore = asyncio.Semaphore(concurrency)
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    async def embed_batch(batch: List[str]) -> List[List[float]]:
+        async with semaphore:
+            increment("embedding.requests")
+            increment("embedding.texts", len(batch))
+            return await asyncio.to_thread(embedding_model.embed_documents, batch)
+
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    return [vector for batch in results for vector in batch]
+
+
+# query embedding cache
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 2048))
+# optional json file the cache is loaded from at startup and saved to on shutdown
+QUERY_EMBEDDING_CACHE_PATH = os.getenv("QUERY_EMBEDDING_CACHE_PATH")
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Wraps an embedding model and memoises embed_query in a bounded LRU.
+    Document embeddings pass straight through. Calls that reach the model are
+    reported to llm_telemetry."""
+
+    def __init__(self, model, maxsize: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.model = model
+        self.model_name = getattr(model, "model", type(model).__name__)
+        self.cache = LRUCache("query_embedding", maxsize)
+
+    def _timed(self, fn, texts: List[str]):
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            llm_telemetry.record_embedding(
+                self.model_name, texts, time.perf_counter() - started, type(e).__name__
+            )
+            raise
+        llm_telemetry.record_embedding(
+            self.model_name, texts, time.perf_counter() - started
+        )
+        return result
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._timed(lambda: self.model.embed_documents(texts), texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = " ".join(text.split())
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self._timed(lambda: self.model.embed_query(text), [text])
+            self.cache.set(key, vector)
+        return vector
+
+    def load(self, path: str):
+        if not path or not os.path.exists(path):
+            return
+        with open(path) as f:
+            for key, vector in json.load(f):
+                self.cache.set(key, vector)
+
+    def save(self, path: str):
+        if not path:
+            return
+        with open(path, "w") as f:
+            json.dump(self.cache.items(), f)
@@ -1,6 +1,90 @@
 from dotenv import load_dotenv
+from utils.token_util import count_tokens
+from utils.llm_telemetry_util import llm_telemetry
 from langchain_google_genai import ChatGoogleGenerativeAI
+from utils.llm_gateway_util import (
+    get_gateway,
+    is_rate_limited,
+    LLM_OUTPUT_TOKENS_ESTIMATE,
+)
 
 load_dotenv()
 
-gemini = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+
+def _estimate(messages) -> int:
+    return (
+        sum(count_tokens(str(message.content)) for message in messages)
+        + LLM_OUTPUT_TOKENS_ESTIMATE
+    )
+
+
+def _on_retry(run_manager):
+    if run_manager is None:
+        return None
+    return lambda: llm_telemetry.record_retry(run_manager.run_id)
+
+
+def _usage(result) -> int:
+    usage = getattr(result.generations[0].message, "usage_metadata", None)
+    return usage["total_tokens"] if usage else None
+
+
+class GatewayChatGoogleGenerativeAI(ChatGoogleGenerativeAI):
+    """Gemini chat model whose calls are admitted through the model's
+    llm gateway, so every chain built on it shares one set of limits."""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return get_gateway(self.model).call(
+            lambda: super(GatewayChatGoogleGenerativeAI, self)._generate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            ),
+            _estimate(messages),
+            _usage,
+            _on_retry(run_manager),
+        )
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return await get_gateway(self.model).acall(
+            lambda: super(GatewayChatGoogleGenerativeAI, self)._agenerate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            ),
+            _estimate(messages),
+            _usage,
+            _on_retry(run_manager),
+        )
+
+    # streams hold their slot until the last chunk and are not retried
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        gateway, tokens = get_gateway(self.model), _estimate(messages)
+        gateway.acquire(tokens)
+        limited = False
+        try:
+            yield from super()._stream(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            )
+        except Exception as e:
+            limited = is_rate_limited(e)
+            raise
+        finally:
+            gateway.release(tokens, rate_limited=limited)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        gateway, tokens = get_gateway(self.model), _estimate(messages)
+        await gateway.aacquire(tokens)
+        limited = False
+        try:
+            async for chunk in super()._astream(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            ):
+                yield chunk
+        except Exception as e:
+            limited = is_rate_limited(e)
+            raise
+        finally:
+            gateway.release(tokens, rate_limited=limited)
+
+
+# retries on rate limits are left to the gateway, which backs off globally
+gemini = GatewayChatGoogleGenerativeAI(
+    model="gemini-2.5-flash", max_retries=1, callbacks=[llm_telemetry]
+)
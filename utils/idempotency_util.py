@@ -0,0 +1,218 @@
+import os
+import re
+import json
+import random
+import asyncio
+import hashlib
+from dotenv import load_dotenv
+from utils.db_util import db
+from utils.metrics_util import increment
+from prisma.errors import UniqueViolationError
+from datetime import datetime, timedelta, timezone
+
+load_dotenv()
+
+# how long a key's stored response is replayed
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 86400))  # seconds
+# how long a duplicate waits for the original request to finish
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", 30))  # seconds
+# a key still PROCESSING this long after it was claimed is taken over by a
+# retry (the process running it crashed or was redeployed); keep it above the
+# slowest request
+IDEMPOTENCY_LEASE = float(os.getenv("IDEMPOTENCY_LEASE", 300))  # seconds
+# larger responses are not stored (the key is released instead)
+IDEMPOTENCY_MAX_BODY = int(os.getenv("IDEMPOTENCY_MAX_BODY", 1024 * 1024))  # bytes
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.5  # seconds
+
+# POST endpoints that start llm, transcription or upload work
+IDEMPOTENT_PATHS = [
+    re.compile(pattern)
+    for pattern in (
+        r"^/quiz/generate(/stream)?$",
+        r"^/assignment/[^/]+/submit/(text|voice)$",
+        r"^/assignment/[^/]+/reevaluate$",
+        r"^/admin/classroom$",
+        r"^/class/material$",
+        r"^/upload/(classroom|material|voice)/confirm$",
+        r"^/mermaid/generate$",
+    )
+]
+
+
+class _Replay(Exception):
+    def __init__(self, status: int, body: bytes, content_type: str, replayed: bool):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.replayed = replayed
+
+
+def _error(status: int, detail: str) -> _Replay:
+    return _Replay(
+        status, json.dumps({"detail": detail}).encode(), "application/json", False
+    )
+
+
+def _now() -> datetime:
+    # millisecond precision, as stored, so claimedAt can be matched exactly
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+async def _claim(record_id: str, fingerprint: str) -> datetime:
+    """Own the key and return its claim time, or raise _Replay with the stored
+    response, a conflict, or 409 when the original request is still running
+    after IDEMPOTENCY_WAIT. A claim whose lease ran out is taken over."""
+    now = _now()
+    if random.random() < 0.01:
+        await db.idempotencykey.delete_many(where={"expiresAt": {"lt": now}})
+    deadline = asyncio.get_running_loop().time() + IDEMPOTENCY_WAIT
+    while True:
+        try:
+            await db.idempotencykey.create(
+                data={
+                    "id": record_id,
+                    "fingerprint": fingerprint,
+                    "claimedAt": now,
+                    "expiresAt": now + timedelta(seconds=IDEMPOTENCY_TTL),
+                }
+            )
+            return now
+        except UniqueViolationError:
+            pass
+        record = await db.idempotencykey.find_unique(where={"id": record_id})
+        if record is None:
+            continue  # released in between, claim it again
+        if record.expiresAt < datetime.now(timezone.utc):
+            await db.idempotencykey.delete_many(where={"id": record_id})
+            continue
+        if record.fingerprint != fingerprint:
+            raise _error(422, "Idempotency-Key was already used for another request")
+        if record.status == "COMPLETED":
+            increment("idempotency.replayed")
+            raise _Replay(
+                record.statusCode,
+                record.body.encode(),
+                record.contentType or "application/json",
+                True,
+            )
+        if record.claimedAt + timedelta(seconds=IDEMPOTENCY_LEASE) < _now():
+            # whoever ran it is gone, take the key over unless another retry
+            # just did
+            claimed_at = _now()
+            taken = await db.idempotencykey.update_many(
+                where={
+                    "id": record_id,
+                    "status": "PROCESSING",
+                    "claimedAt": record.claimedAt,
+                },
+                data={"claimedAt": claimed_at},
+            )
+            if taken:
+                increment("idempotency.reclaimed")
+                return claimed_at
+            continue
+        if asyncio.get_running_loop().time() >= deadline:
+            raise _error(409, "A request with this Idempotency-Key is in progress")
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+class IdempotencyMiddleware:
+    """Idempotency-Key support for IDEMPOTENT_PATHS. The first request with
+    a key runs and its complete response (below 500) is stored; retries with
+    the same key, caller and body get that response without running the
+    endpoint again, waiting for it if it is still in flight."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not any(p.match(scope["path"]) for p in IDEMPOTENT_PATHS)
+        ):
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        key = headers.get(HEADER, b"").decode(errors="replace").strip()
+        if not key:
+            return await self.app(scope, receive, send)
+
+        # the body is buffered to fingerprint it, then replayed to the app
+        messages, body = [], b""
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        caller = headers.get(b"authorization", b"")
+        record_id = hashlib.sha256(
+            b"\0".join([caller, scope["path"].encode(), key.encode()])
+        ).hexdigest()
+        try:
+            if len(key) > MAX_KEY_LENGTH:
+                raise _error(400, f"Idempotency-Key is longer than {MAX_KEY_LENGTH}")
+            claimed_at = await _claim(record_id, hashlib.sha256(body).hexdigest())
+        except _Replay as replay:
+            response_headers = [(b"content-type", replay.content_type.encode())]
+            if replay.replayed:
+                response_headers.append((b"idempotent-replayed", b"true"))
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": replay.status,
+                    "headers": response_headers,
+                }
+            )
+            await send({"type": "http.response.body", "body": replay.body})
+            return
+
+        async def replay_receive():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        response = {"status": 500, "content_type": None, "body": b"", "done": False}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        response["content_type"] = value.decode()
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+                response["done"] = not message.get("more_body", False)
+            await send(message)
+
+        # a retry that took the key over after the lease owns it now
+        owned = {"id": record_id, "claimedAt": claimed_at}
+        stored = False
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            if (
+                response["done"]
+                and response["status"] < 500
+                and len(response["body"]) <= IDEMPOTENCY_MAX_BODY
+            ):
+                await db.idempotencykey.update_many(
+                    where=owned,
+                    data={
+                        "status": "COMPLETED",
+                        "statusCode": response["status"],
+                        "contentType": response["content_type"],
+                        "body": response["body"].decode(errors="replace"),
+                    },
+                )
+                stored = True
+        finally:
+            if not stored:
+                # failed or unstorable: let a retry run the work again
+                await db.idempotencykey.delete_many(where=owned)
@@ -0,0 +1,263 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from enum import IntEnum
+from dotenv import load_dotenv
+from contextvars import ContextVar
+from contextlib import contextmanager
+from utils.metrics_util import increment, observe, set_gauge
+
+load_dotenv()
+
+# admission control for llm calls, one gateway per model
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))  # calls in flight
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 300))  # 0 = no limit
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 1000000))  # 0 = no limit
+# output tokens assumed per call before the real usage is known
+LLM_OUTPUT_TOKENS_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKENS_ESTIMATE", 1000))
+# rate limited (429) calls are retried after an exponential backoff
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 4))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 2))  # seconds
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 60))  # seconds
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # a user is waiting on the response
+    BACKGROUND = 1  # evaluations, top-ups, anything that can wait
+
+
+_priority: ContextVar = ContextVar("llm_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: Priority):
+    """Run the llm calls made inside the block (and the tasks/threads it
+    starts) at this priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    text = f"{type(error).__name__} {error}"
+    return "429" in text or "ResourceExhausted" in text or "RESOURCE_EXHAUSTED" in text
+
+
+class TokenBucket:
+    """Continuously refilled per-minute budget. Not thread-safe on its own,
+    the gateway holds its lock around every use."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.level = float(per_minute)
+        self.rate = per_minute / 60
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` can be taken."""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        if self.capacity > 0:
+            self._refill()
+            self.level -= amount
+
+
+class _Waiter:
+    def __init__(self, priority: Priority, tokens: int, loop=None):
+        self.priority = priority
+        self.tokens = tokens
+        self.loop = loop
+        self.future = loop.create_future() if loop else None
+        self.event = None if loop else threading.Event()
+        self.admitted = False
+        self.cancelled = False
+        self.enqueued_at = time.monotonic()
+
+    def admit(self):
+        self.admitted = True
+        if self.loop:
+            self.loop.call_soon_threadsafe(self._resolve)
+        else:
+            self.event.set()
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class LLMGateway:
+    """Admits calls to one model in priority order, within a concurrency limit
+    and request/token per minute buckets. The concurrency limit halves on a
+    429 and grows back by one per `limit` successful calls. Usable from both
+    async code and worker threads."""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._limit = float(max_concurrency)
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._lock = threading.Lock()
+        self._waiters = []
+        self._seq = itertools.count()
+        self._inflight = 0
+        self._timer = None
+        self._cooldown_until = 0.0
+        self._backoff = 0.0
+
+    # admission
+
+    def _enqueue(self, waiter: _Waiter):
+        with self._lock:
+            heapq.heappush(self._waiters, (waiter.priority, next(self._seq), waiter))
+            self._dispatch_locked()
+
+    def _dispatch(self):
+        with self._lock:
+            self._timer = None
+            self._dispatch_locked()
+
+    def _dispatch_locked(self):
+        while self._waiters:
+            waiter = self._waiters[0][2]
+            if waiter.cancelled:
+                heapq.heappop(self._waiters)
+                continue
+            if self._inflight >= max(1, int(self._limit)):
+                break
+            delay = max(
+                self._cooldown_until - time.monotonic(),
+                self._requests.delay(1),
+                self._tokens.delay(waiter.tokens),
+            )
+            if delay > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(delay, self._dispatch)
+                    self._timer.daemon = True
+                    self._timer.start()
+                break
+            heapq.heappop(self._waiters)
+            self._inflight += 1
+            self._requests.take(1)
+            self._tokens.take(waiter.tokens)
+            waiter.admit()
+        set_gauge(f"llm_gateway.{self.name}.queue_depth", len(self._waiters))
+        set_gauge(f"llm_gateway.{self.name}.inflight", self._inflight)
+
+    def _admitted(self, waiter: _Waiter):
+        wait = time.monotonic() - waiter.enqueued_at
+        observe(f"llm_gateway.{self.name}.wait", wait)
+        observe(f"llm_gateway.{self.name}.wait.{waiter.priority.name.lower()}", wait)
+
+    def acquire(self, tokens: int):
+        waiter = _Waiter(_priority.get(), tokens)
+        self._enqueue(waiter)
+        waiter.event.wait()
+        self._admitted(waiter)
+
+    async def aacquire(self, tokens: int):
+        waiter = _Waiter(_priority.get(), tokens, asyncio.get_running_loop())
+        self._enqueue(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                waiter.cancelled = True
+            if waiter.admitted:
+                self.release(tokens)
+            raise
+        self._admitted(waiter)
+
+    def release(self, tokens: int, used_tokens: int = None, rate_limited: bool = False):
+        with self._lock:
+            self._inflight -= 1
+            if used_tokens is not None:
+                # settle the estimate against the real usage
+                self._tokens.take(used_tokens - tokens)
+            if rate_limited:
+                self._limit = max(1.0, self._limit / 2)
+                self._backoff = min(
+                    LLM_BACKOFF_MAX, max(LLM_BACKOFF_BASE, self._backoff * 2)
+                )
+                self._cooldown_until = time.monotonic() + self._backoff
+                increment(f"llm_gateway.{self.name}.rate_limited")
+            else:
+                self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+                self._backoff = 0.0
+            set_gauge(f"llm_gateway.{self.name}.limit", int(self._limit))
+            self._dispatch_locked()
+
+    # calls
+
+    def call(self, fn, tokens: int, usage=None, on_retry=None):
+        """Run fn() once admitted, retrying rate limited calls. `usage` maps
+        the result to the tokens it actually used, `on_retry` is called
+        before each retry."""
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            self.acquire(tokens)
+            used, limited = None, False
+            try:
+                result = fn()
+                used = usage(result) if usage else None
+                return result
+            except Exception as e:
+                limited = is_rate_limited(e)
+                if not limited or attempt == LLM_MAX_RETRIES:
+                    raise
+            finally:
+                self.release(tokens, used, rate_limited=limited)
+            increment(f"llm_gateway.{self.name}.retries")
+            if on_retry:
+                on_retry()
+
+    async def acall(self, fn, tokens: int, usage=None, on_retry=None):
+        """Async call(): fn() returns the awaitable to run."""
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await self.aacquire(tokens)
+            used, limited = None, False
+            try:
+                result = await fn()
+                used = usage(result) if usage else None
+                return result
+            except Exception as e:
+                limited = is_rate_limited(e)
+                if not limited or attempt == LLM_MAX_RETRIES:
+                    raise
+            finally:
+                # also on cancellation, or the slot would stay taken for good
+                self.release(tokens, used, rate_limited=limited)
+            increment(f"llm_gateway.{self.name}.retries")
+            if on_retry:
+                on_retry()
+
+
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(model: str) -> LLMGateway:
+    with _gateways_lock:
+        if model not in _gateways:
+            _gateways[model] = LLMGateway(model)
+        return _gateways[model]
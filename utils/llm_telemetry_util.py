@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from uuid import UUID
+from dotenv import load_dotenv
+from contextvars import ContextVar
+from contextlib import contextmanager
+from collections import defaultdict
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from datetime import datetime, timezone
+from utils.token_util import count_tokens
+from utils.metrics_util import increment, observe
+from langchain_core.callbacks import BaseCallbackHandler
+
+load_dotenv()
+
+# one json line per llm / embedding call, read by scripts/llm_usage_report.py
+# (empty, the default, to only keep the in-process totals)
+LLM_USAGE_LOG = os.getenv("LLM_USAGE_LOG", "")
+# the log rolls over to .1, .2, ... past this size
+LLM_USAGE_LOG_MAX_BYTES = int(os.getenv("LLM_USAGE_LOG_MAX_BYTES", 10 * 1024 * 1024))
+LLM_USAGE_LOG_BACKUPS = int(os.getenv("LLM_USAGE_LOG_BACKUPS", 3))
+
+# usd per million tokens, used to estimate cost (gemini 2.5 flash pricing)
+LLM_INPUT_COST_PER_MTOK = float(os.getenv("LLM_INPUT_COST_PER_MTOK", 0.30))
+LLM_OUTPUT_COST_PER_MTOK = float(os.getenv("LLM_OUTPUT_COST_PER_MTOK", 2.50))
+EMBEDDING_COST_PER_MTOK = float(os.getenv("EMBEDDING_COST_PER_MTOK", 0.15))
+
+# totals are kept per chain, per route and per class
+DIMENSIONS = ("chain", "route", "class_id")
+
+_tags: ContextVar = ContextVar("llm_tags", default={})
+_request_scope: ContextVar = ContextVar("llm_request_scope", default=None)
+
+
+@contextmanager
+def llm_tags(**tags):
+    """Tag the llm calls made inside the block, e.g. llm_tags(class_id=...)."""
+    token = _tags.set({**_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def current_tags() -> dict:
+    """Explicit tags, falling back to the route and class id of the request
+    being served."""
+    tags = {}
+    scope = _request_scope.get()
+    if scope is not None:
+        route = scope.get("route")
+        path = route.path if route is not None else scope.get("path")
+        tags["route"] = f"{scope.get('method')} {path}"
+        class_id = scope.get("path_params", {}).get("class_id")
+        if class_id:
+            tags["class_id"] = class_id
+    tags.update({key: value for key, value in _tags.get().items() if value})
+    return tags
+
+
+class RequestTagMiddleware:
+    """Makes the current request visible to current_tags(). The route is read
+    when a call is made, after routing has filled it in."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+
+
+def _cost(input_tokens: int, output_tokens: int, embedding: bool = False) -> float:
+    if embedding:
+        return input_tokens * EMBEDDING_COST_PER_MTOK / 1_000_000
+    return (
+        input_tokens * LLM_INPUT_COST_PER_MTOK
+        + output_tokens * LLM_OUTPUT_COST_PER_MTOK
+    ) / 1_000_000
+
+
+def _new_totals() -> dict:
+    return {
+        "calls": 0,
+        "errors": 0,
+        "retries": 0,
+        "parse_failures": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cost": 0.0,
+        "seconds": 0.0,
+    }
+
+
+class LLMTelemetry(BaseCallbackHandler):
+    """Callback handler recording latency, tokens, retries and cost of every
+    call made through the models it is attached to. Embedding calls and
+    parse failures are reported to it directly."""
+
+    # read the request context in the calling task, not an executor thread
+    run_inline = True
+
+    def __init__(self, log_path: str = LLM_USAGE_LOG):
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._log = self._open_log(log_path) if log_path else None
+        self._runs = {}
+        self._totals = {dimension: defaultdict(_new_totals) for dimension in DIMENSIONS}
+
+    # run tracking
+
+    def _start(self, run_id: UUID, serialized: dict, metadata: dict):
+        metadata = metadata or {}
+        tags = current_tags()
+        if metadata.get("chain"):
+            tags["chain"] = metadata["chain"]
+        model = metadata.get("ls_model_name") or (serialized or {}).get(
+            "kwargs", {}
+        ).get("model", "unknown")
+        with self._lock:
+            self._runs[run_id] = {
+                "tags": tags,
+                "model": model,
+                "retries": 0,
+                "started": time.perf_counter(),
+            }
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, serialized, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, serialized, metadata)
+
+    def record_retry(self, run_id: UUID):
+        with self._lock:
+            if run_id in self._runs:
+                self._runs[run_id]["retries"] += 1
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        input_tokens = output_tokens = 0
+        generation = response.generations[0][0] if response.generations else None
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        if usage:
+            input_tokens = usage.get("input_tokens", 0)
+            output_tokens = usage.get("output_tokens", 0)
+        elif generation is not None:
+            # no usage reported (e.g. some streams), estimate the output
+            output_tokens = count_tokens(generation.text)
+        self._record(run, input_tokens=input_tokens, output_tokens=output_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is not None:
+            self._record(run, error=type(error).__name__)
+
+    # direct reports
+
+    def record_embedding(self, model: str, texts, seconds: float, error: str = None):
+        run = {
+            "tags": {"chain": "embedding", **current_tags()},
+            "model": model,
+            "retries": 0,
+            "seconds": seconds,
+        }
+        tokens = sum(count_tokens(text) for text in texts)
+        self._record(run, input_tokens=tokens, error=error, embedding=True)
+
+    def record_parse_failure(self, chain: str):
+        tags = {**current_tags(), "chain": chain}
+        increment(f"llm_usage.{chain}.parse_failures")
+        self._add(tags, {"parse_failures": 1})
+        self._write({"event": "parse_failure", **tags})
+
+    # aggregation
+
+    def _record(
+        self,
+        run: dict,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        error: str = None,
+        embedding: bool = False,
+    ):
+        seconds = run.get("seconds", time.perf_counter() - run.get("started", 0))
+        tags = {"chain": "unknown", **run["tags"]}
+        cost = _cost(input_tokens, output_tokens, embedding)
+        chain = tags["chain"]
+        increment(f"llm_usage.{chain}.calls")
+        increment(f"llm_usage.{chain}.input_tokens", input_tokens)
+        increment(f"llm_usage.{chain}.output_tokens", output_tokens)
+        observe(f"llm_usage.{chain}.latency", seconds)
+        if error:
+            increment(f"llm_usage.{chain}.errors")
+        self._add(
+            tags,
+            {
+                "calls": 1,
+                "errors": 1 if error else 0,
+                "retries": run["retries"],
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cost": cost,
+                "seconds": seconds,
+            },
+        )
+        self._write(
+            {
+                "event": "embedding" if embedding else "call",
+                "model": run["model"],
+                **tags,
+                "seconds": round(seconds, 4),
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "retries": run["retries"],
+                "cost": round(cost, 8),
+                "error": error,
+            }
+        )
+
+    def _add(self, tags: dict, values: dict):
+        with self._lock:
+            for dimension in DIMENSIONS:
+                totals = self._totals[dimension][tags.get(dimension, "none")]
+                for key, value in values.items():
+                    totals[key] += value
+
+    @staticmethod
+    def _open_log(log_path: str) -> logging.Logger:
+        """Lines are queued by the caller and written (and rotated) by a
+        listener thread, so logging a call never touches the disk."""
+        handler = RotatingFileHandler(
+            log_path,
+            maxBytes=LLM_USAGE_LOG_MAX_BYTES,
+            backupCount=LLM_USAGE_LOG_BACKUPS,
+            delay=True,
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        records = queue.SimpleQueue()
+        listener = QueueListener(records, handler)
+        listener.start()
+        atexit.register(listener.stop)
+        log = logging.getLogger(f"llm_usage.{log_path}")
+        log.setLevel(logging.INFO)
+        log.propagate = False
+        log.addHandler(QueueHandler(records))
+        return log
+
+    def _write(self, record: dict):
+        if self._log is None:
+            return
+        record = {"at": datetime.now(timezone.utc).isoformat(), **record}
+        self._log.info(json.dumps(record))
+
+    def summary(self) -> dict:
+        """Totals since start, per chain, route and class."""
+        with self._lock:
+            return {
+                dimension: {
+                    key: {
+                        **totals,
+                        "cost": round(totals["cost"], 6),
+                        "avg_seconds": round(totals["seconds"] / totals["calls"], 4)
+                        if totals["calls"]
+                        else 0.0,
+                    }
+                    for key, totals in self._totals[dimension].items()
+                }
+                for dimension in DIMENSIONS
+            }
+
+
+llm_telemetry = LLMTelemetry()
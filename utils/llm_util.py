@@ -0,0 +1,307 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+from dotenv import load_dotenv
+from typing import Any, AsyncIterator, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from utils.gemini_util import gemini
+from utils.chroma_util import embeddings
+from utils.metrics_util import increment
+from utils.llm_telemetry_util import llm_telemetry
+from utils.token_util import count_tokens
+from utils.cache_util import LRUCache, SemanticCache
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.output_parsers import PydanticOutputParser
+
+load_dotenv()
+
+# pass the pydantic model as gemini's response schema instead of pasting format
+# instructions into the prompt; set to false to go back to prompt instructions
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"
+
+SCHEMA_INSTRUCTION = (
+    "Respond with a single JSON object that follows the response schema."
+)
+
+# response cache for chains created with cache=True
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 512))  # entries per chain
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 86400))  # seconds
+# cosine similarity needed for a semantic hit on chains with semantic_fields
+LLM_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", 0.95))
+
+# invalid list items (e.g. a truncated last question) dropped before giving up
+MAX_PRUNE_ROUNDS = 3
+
+FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+class StructuredOutputError(Exception):
+    pass
+
+
+def format_instruction(schema: Type[BaseModel]) -> str:
+    """Value for a prompt's {format_instruction} slot."""
+    if LLM_STRUCTURED_OUTPUT:
+        return SCHEMA_INSTRUCTION
+    return PydanticOutputParser(pydantic_object=schema).get_format_instructions()
+
+
+def _close_json(text: str) -> str:
+    """Close the strings, objects and arrays a truncated json text left open."""
+    stack, in_string, escaped = [], False, False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    return text + "".join(reversed(stack))
+
+
+def _load_partial_json(text: str) -> Optional[Any]:
+    text = FENCE_RE.sub("", text.strip())
+    start = text.find("{")
+    if start == -1:
+        return None
+    text = text[start:]
+    # cut back to earlier commas until what is left closes into valid json
+    cuts = [len(text)] + [i for i in range(len(text) - 1, 0, -1) if text[i] == ","]
+    for cut in cuts[:50]:
+        candidate = TRAILING_COMMA_RE.sub(r"\1", _close_json(text[:cut].rstrip(", \n")))
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def _validate_pruned(data: dict, schema: Type[BaseModel]) -> Optional[BaseModel]:
+    for _ in range(MAX_PRUNE_ROUNDS):
+        try:
+            return schema.model_validate(data)
+        except ValidationError as e:
+            bad = {
+                (err["loc"][0], err["loc"][1])
+                for err in e.errors()
+                if len(err["loc"]) >= 2
+                and isinstance(err["loc"][1], int)
+                and isinstance(data.get(err["loc"][0]), list)
+            }
+            if not bad:
+                return None
+            for field in {field for field, _ in bad}:
+                data[field] = [
+                    item
+                    for i, item in enumerate(data[field])
+                    if (field, i) not in bad
+                ]
+    return None
+
+
+def repair_structured_output(text: str, schema: Type[BaseModel]) -> Optional[BaseModel]:
+    """Recover a schema instance from malformed or truncated model output:
+    strips fences, closes open json and drops list items that don't validate."""
+    data = _load_partial_json(text)
+    if not isinstance(data, dict):
+        return None
+    return _validate_pruned(data, schema)
+
+
+class JsonArrayStream:
+    """Pulls complete objects out of one array field of a json document while
+    it is still streaming in, e.g. each question of {"questions": [...]}."""
+
+    def __init__(self, field: str):
+        self.field_re = re.compile(rf'"{re.escape(field)}"\s*:\s*\[')
+        self.buffer = ""
+        self.index = None  # scan position, set once the array has opened
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.item_start = None
+        self.closed = False
+
+    def feed(self, text: str) -> List[dict]:
+        self.buffer += text
+        if self.index is None:
+            match = self.field_re.search(self.buffer)
+            if not match:
+                return []
+            self.index = match.end()
+        items = []
+        while self.index < len(self.buffer) and not self.closed:
+            char = self.buffer[self.index]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                if self.depth == 0:
+                    self.item_start = self.index
+                self.depth += 1
+            elif char in "}]":
+                if self.depth == 0:
+                    self.closed = True
+                else:
+                    self.depth -= 1
+                    if self.depth == 0 and self.item_start is not None:
+                        try:
+                            items.append(
+                                json.loads(self.buffer[self.item_start : self.index + 1])
+                            )
+                        except json.JSONDecodeError:
+                            pass
+                        self.item_start = None
+            self.index += 1
+        return items
+
+
+class StructuredLLM:
+    """prompt | gemini returning a pydantic model. Output that fails to parse
+    is repaired locally instead of regenerated. Counters under llm.<name>.
+
+    cache=True answers repeated prompts (same text up to whitespace) from an
+    LRU + ttl cache. semantic_fields also answers prompts whose values for
+    those inputs embed close to a cached one; only use it where near-identical
+    requests may share an answer."""
+
+    def __init__(
+        self,
+        name: str,
+        prompt: BasePromptTemplate,
+        schema: Type[BaseModel],
+        llm=gemini,
+        cache: bool = False,
+        semantic_fields: Tuple[str, ...] = (),
+    ):
+        self.name = name
+        # calls are tagged with the chain name in llm_telemetry
+        self.config = {"metadata": {"chain": name}}
+        self.schema = schema
+        self.prompt = prompt
+        self.parser = PydanticOutputParser(pydantic_object=schema)
+        self.cache = (
+            LRUCache(f"llm_{name}", LLM_CACHE_SIZE, LLM_CACHE_TTL) if cache else None
+        )
+        self.semantic_fields = semantic_fields
+        self.semantic_cache = (
+            SemanticCache(
+                f"llm_{name}_semantic",
+                LLM_CACHE_SIZE,
+                LLM_SEMANTIC_CACHE_THRESHOLD,
+                LLM_CACHE_TTL,
+            )
+            if cache and semantic_fields
+            else None
+        )
+        # streamed output is plain text, so the prompt carries the full format
+        self.stream_chain = (
+            prompt.partial(format_instruction=self.parser.get_format_instructions())
+            | llm
+        )
+        if LLM_STRUCTURED_OUTPUT:
+            self.chain = prompt | llm.with_structured_output(
+                schema, method="json_mode", include_raw=True
+            )
+            self.tokens_saved = count_tokens(
+                self.parser.get_format_instructions()
+            ) - count_tokens(SCHEMA_INSTRUCTION)
+        else:
+            self.chain = prompt | llm
+            self.tokens_saved = 0
+
+    def _finish(self, result) -> BaseModel:
+        increment(f"llm.{self.name}.calls")
+        increment(f"llm.{self.name}.prompt_tokens_saved", self.tokens_saved)
+        if LLM_STRUCTURED_OUTPUT:
+            if result["parsed"] is not None:
+                return result["parsed"]
+            text = result["raw"].content
+        else:
+            text = result.content
+            try:
+                return self.parser.parse(text)
+            except Exception:
+                pass
+
+        increment(f"llm.{self.name}.parse_failures")
+        llm_telemetry.record_parse_failure(self.name)
+        repaired = repair_structured_output(text, self.schema)
+        if repaired is None:
+            increment(f"llm.{self.name}.unrecoverable")
+            raise StructuredOutputError(
+                f"{self.name}: model output does not match {self.schema.__name__}"
+            )
+        increment(f"llm.{self.name}.repaired")
+        return repaired
+
+    def _lookup(self, inputs: dict):
+        """Returns (cache key, semantic vector, cached result or None)."""
+        prompt_text = " ".join(self.prompt.format(**inputs).split())
+        key = hashlib.sha256(prompt_text.encode()).hexdigest()
+        cached = self.cache.get(key)
+        if cached is not None or self.semantic_cache is None:
+            return key, None, cached
+        try:
+            vector = embeddings.embed_query(
+                "\n".join(str(inputs.get(field, "")) for field in self.semantic_fields)
+            )
+        except Exception as e:
+            # the semantic cache is an optimisation, the llm may still be up
+            print(f"{self.name}: semantic cache lookup skipped: {e}")
+            increment(f"llm.{self.name}.semantic_cache_errors")
+            return key, None, None
+        return key, vector, self.semantic_cache.get(vector)
+
+    def _store(self, key: str, vector, result: BaseModel):
+        self.cache.set(key, result)
+        if vector is not None:
+            self.semantic_cache.set(vector, result)
+
+    def invoke(self, inputs: dict) -> BaseModel:
+        if self.cache is None:
+            return self._finish(self.chain.invoke(inputs, self.config))
+        key, vector, cached = self._lookup(inputs)
+        if cached is not None:
+            return cached.model_copy(deep=True)
+        result = self._finish(self.chain.invoke(inputs, self.config))
+        self._store(key, vector, result)
+        return result.model_copy(deep=True)
+
+    async def ainvoke(self, inputs: dict) -> BaseModel:
+        if self.cache is None:
+            return self._finish(await self.chain.ainvoke(inputs, self.config))
+        key, vector, cached = await asyncio.to_thread(self._lookup, inputs)
+        if cached is not None:
+            return cached.model_copy(deep=True)
+        result = self._finish(await self.chain.ainvoke(inputs, self.config))
+        self._store(key, vector, result)
+        return result.model_copy(deep=True)
+
+    async def astream_items(self, inputs: dict, field: str) -> AsyncIterator[dict]:
+        """Yield each object of the output's `field` array as soon as it is
+        complete in the streamed text."""
+        increment(f"llm.{self.name}.streams")
+        stream = JsonArrayStream(field)
+        async for chunk in self.stream_chain.astream(inputs, self.config):
+            content = chunk.content if isinstance(chunk.content, str) else ""
+            for item in stream.feed(content):
+                yield item
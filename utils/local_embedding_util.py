@@ -0,0 +1,39 @@
+import os
+import re
+import math
+import hashlib
+from typing import List
+from langchain_core.embeddings import Embeddings
+
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", 384))
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class LocalHashEmbeddings(Embeddings):
+    """Deterministic offline stand-in for the gemini embedding model.
+
+    Word unigrams and bigrams are feature-hashed into a fixed size, signed
+    vector and L2 normalised, so texts sharing terms land close together.
+    Same text -> same vector, in every process, with no network access.
+    """
+
+    def __init__(self, dim: int = LOCAL_EMBEDDING_DIM):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        tokens = TOKEN_RE.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector = [0.0] * self.dim
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dim] += 1.0 if value >> 63 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
@@ -0,0 +1,52 @@
+import threading
+from collections import defaultdict, deque
+
+# in-process metrics, exposed through GET /metrics
+TIMING_WINDOW = 500  # samples kept per timing for percentiles
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_gauges = {}
+_timings = defaultdict(lambda: deque(maxlen=TIMING_WINDOW))
+
+
+def increment(name: str, value: float = 1):
+    with _lock:
+        _counters[name] += value
+
+
+def set_gauge(name: str, value: float):
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, seconds: float):
+    with _lock:
+        _timings[name].append(seconds)
+
+
+def _percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def snapshot() -> dict:
+    with _lock:
+        timings = {
+            name: {
+                "count": len(samples),
+                "avg": sum(samples) / len(samples) if samples else 0.0,
+                "p50": _percentile(list(samples), 50),
+                "p95": _percentile(list(samples), 95),
+                "max": max(samples) if samples else 0.0,
+            }
+            for name, samples in _timings.items()
+        }
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "timings": timings,
+        }
@@ -0,0 +1,159 @@
+import os
+import random
+import hashlib
+import threading
+from collections import defaultdict
+from dotenv import load_dotenv
+from typing import Dict, List, Set
+from utils.bm25_util import tokenize
+
+load_dotenv()
+
+# minhash signatures: MINHASH_BANDS * MINHASH_ROWS values per text. Pairs with
+# jaccard similarity s become lsh candidates with probability
+# 1 - (1 - s^rows)^bands, ~0.5 at s = (1 / bands)^(1 / rows), about 0.7 here
+MINHASH_BANDS = int(os.getenv("MINHASH_BANDS", 16))
+MINHASH_ROWS = int(os.getenv("MINHASH_ROWS", 8))
+MINHASH_SHINGLE = 3  # words per shingle
+
+# values fit a postgres integer, so signatures are stored as Int[]
+_PRIME = (1 << 31) - 1
+_rng = random.Random(20261019)  # fixed so stored signatures stay comparable
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME))
+    for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+
+
+def _shingles(text: str) -> Set[int]:
+    words = tokenize(text)
+    grams = {
+        " ".join(words[i : i + MINHASH_SHINGLE])
+        for i in range(max(1, len(words) - MINHASH_SHINGLE + 1))
+    }
+    return {
+        int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), "big")
+        for g in grams
+        if g
+    }
+
+
+def minhash(text: str) -> List[int]:
+    """Signature of the text's word shingles, empty for texts without words."""
+    shingles = _shingles(text)
+    if not shingles:
+        return []
+    return [min((a * s + b) % _PRIME for s in shingles) for a, b in _PERMUTATIONS]
+
+
+def estimate_similarity(a: List[int], b: List[int]) -> float:
+    """Estimated jaccard similarity of the texts behind two signatures."""
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class LSHIndex:
+    """Incremental lsh over minhash signatures: each signature is split into
+    bands and only signatures sharing a band bucket are compared. Items with
+    identical signatures (e.g. the same pasted text) share one entry."""
+
+    def __init__(self, bands: int = MINHASH_BANDS, rows: int = MINHASH_ROWS):
+        self.bands = bands
+        self.rows = rows
+        self._lock = threading.Lock()
+        self._items: Dict[str, tuple] = {}
+        self._members: Dict[tuple, Set[str]] = {}
+        self._buckets = [defaultdict(set) for _ in range(bands)]
+
+    def _keys(self, signature: tuple):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows : (band + 1) * self.rows]
+
+    def add(self, item_id: str, signature: List[int]):
+        if len(signature) != self.bands * self.rows:
+            return
+        signature = tuple(signature)
+        with self._lock:
+            self._remove_locked(item_id)
+            self._items[item_id] = signature
+            if signature not in self._members:
+                self._members[signature] = set()
+                for band, key in self._keys(signature):
+                    self._buckets[band][key].add(signature)
+            self._members[signature].add(item_id)
+
+    def remove(self, item_id: str):
+        with self._lock:
+            self._remove_locked(item_id)
+
+    def _remove_locked(self, item_id: str):
+        signature = self._items.pop(item_id, None)
+        if signature is None:
+            return
+        members = self._members[signature]
+        members.discard(item_id)
+        if members:
+            return
+        del self._members[signature]
+        for band, key in self._keys(signature):
+            bucket = self._buckets[band][key]
+            bucket.discard(signature)
+            if not bucket:
+                del self._buckets[band][key]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def clusters(self, threshold: float) -> List[dict]:
+        """Groups of items linked by pairs with estimated similarity of at
+        least threshold, largest first."""
+        with self._lock:
+            candidates = set()
+            for buckets in self._buckets:
+                for bucket in buckets.values():
+                    if len(bucket) < 2:
+                        continue
+                    members = sorted(bucket)
+                    for i, a in enumerate(members):
+                        for b in members[i + 1 :]:
+                            candidates.add((a, b))
+            members = {sig: sorted(ids) for sig, ids in self._members.items()}
+
+        parent = {}
+
+        def find(x):
+            parent.setdefault(x, x)
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        scores = defaultdict(list)
+        for a, b in candidates:
+            similarity = estimate_similarity(a, b)
+            if similarity >= threshold:
+                parent[find(a)] = find(b)
+                scores[a].append(similarity)
+        # identical signatures are a cluster on their own
+        for sig, ids in members.items():
+            if len(ids) > 1:
+                find(sig)
+                scores[sig].append(1.0)
+
+        groups = defaultdict(lambda: {"members": [], "similarities": []})
+        for sig in parent:
+            group = groups[find(sig)]
+            group["members"].extend(members[sig])
+            group["similarities"].extend(scores.get(sig, []))
+        return sorted(
+            (
+                {
+                    "members": sorted(group["members"]),
+                    "max_similarity": round(max(group["similarities"]), 3),
+                    "min_similarity": round(min(group["similarities"]), 3),
+                }
+                for group in groups.values()
+            ),
+            key=lambda c: (-len(c["members"]), -c["max_similarity"]),
+        )
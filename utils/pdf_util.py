@@ -0,0 +1,115 @@
+import os
+import mmap
+import asyncio
+import multiprocessing
+from io import BytesIO
+from pypdf import PdfReader, PdfWriter
+from typing import AsyncIterator, List, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+
+# kept import-light on purpose: pool workers are spawned and re-import this module
+
+# documents with at least this many pages are split across the process pool
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 40))
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", os.cpu_count() or 2))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 20))
+
+# raw bytes, or a path to a file that gets memory-mapped
+PdfSource = Union[bytes, str]
+
+_pool = None
+
+
+def _open_reader(source: PdfSource) -> Tuple[PdfReader, object]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return PdfReader(BytesIO(source)), None
+    f = open(source, "rb")
+    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    f.close()
+    return PdfReader(mapped), mapped
+
+
+def _extract_range(source: PdfSource, start: int, end: int) -> List[str]:
+    reader, mapped = _open_reader(source)
+    try:
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+    finally:
+        if mapped is not None:
+            mapped.close()
+
+
+def _split_ranges(reader: PdfReader, ranges: List[Tuple[int, int]]) -> List[bytes]:
+    """Write each page range as a standalone pdf, so a pool task ships and
+    parses only its own pages instead of the whole document."""
+    parts = []
+    for start, end in ranges:
+        writer = PdfWriter()
+        for i in range(start, end):
+            writer.add_page(reader.pages[i])
+        out = BytesIO()
+        writer.write(out)
+        parts.append(out.getvalue())
+    return parts
+
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the api process runs threads and an event loop
+        _pool = ProcessPoolExecutor(
+            max_workers=PDF_PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pdf_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def iter_pdf_pages(source: PdfSource) -> AsyncIterator[Tuple[int, str]]:
+    """Yield (page number, text) in page order without blocking the event loop.
+
+    Small documents are parsed in a worker thread; large ones are split once,
+    here, into page-range pdfs that are parsed in parallel in the process
+    pool and yielded as soon as the next range in order is ready.
+    """
+    reader, mapped = await asyncio.to_thread(_open_reader, source)
+    futures = []
+    try:
+        page_count = await asyncio.to_thread(lambda: len(reader.pages))
+
+        if page_count < PDF_PARALLEL_MIN_PAGES:
+            texts = await asyncio.to_thread(
+                lambda: [reader.pages[i].extract_text() or "" for i in range(page_count)]
+            )
+            for page, text in enumerate(texts):
+                yield page, text
+            return
+
+        loop = asyncio.get_running_loop()
+        pool = get_pdf_pool()
+        ranges = [
+            (start, min(start + PDF_PAGES_PER_TASK, page_count))
+            for start in range(0, page_count, PDF_PAGES_PER_TASK)
+        ]
+        parts = await asyncio.to_thread(_split_ranges, reader, ranges)
+        futures = [
+            loop.run_in_executor(pool, _extract_range, part, 0, end - start)
+            for part, (start, end) in zip(parts, ranges)
+        ]
+        for (start, _), future in zip(ranges, futures):
+            for offset, text in enumerate(await future):
+                yield start + offset, text
+    finally:
+        for future in futures:
+            future.cancel()
+        if mapped is not None:
+            mapped.close()
+
+
+async def extract_pdf_pages(source: PdfSource) -> List[str]:
+    return [text async for _, text in iter_pdf_pages(source)]
@@ -0,0 +1,96 @@
+import os
+import math
+from collections import Counter
+from dotenv import load_dotenv
+from typing import List, Optional, Set
+from utils.bm25_util import tokenize
+from utils.context_util import SENTENCE_RE
+from utils.syllabus_digest_util import content_terms
+
+load_dotenv()
+
+# local checks that settle trivially scoreable answers without the llm
+PRESCORE_ENABLED = os.getenv("PRESCORE_ENABLED", "true").lower() == "true"
+# answers with fewer content words beyond the question's look like a restated
+# question (only a hint: short answers like "Paris" can be right)
+PRESCORE_MIN_TERMS = int(os.getenv("PRESCORE_MIN_TERMS", 3))
+# share of 3-word sequences two texts must have in common to count as a copy
+PRESCORE_COPY_THRESHOLD = float(os.getenv("PRESCORE_COPY_THRESHOLD", 0.9))
+# tf-idf cosine to the question + reference below which an answer looks off
+# topic (only a hint: a paraphrase can share no exact words)
+PRESCORE_OFF_TOPIC_SIMILARITY = float(os.getenv("PRESCORE_OFF_TOPIC_SIMILARITY", 0.02))
+
+EMPTY = "empty"
+QUESTION_COPY = "question_copy"
+REFERENCE_COPY = "reference_copy"
+OFF_TOPIC = "off_topic"
+
+
+def _ngrams(tokens: List[str], n: int = 3) -> Set[tuple]:
+    if len(tokens) < n:
+        return {tuple(tokens)} if tokens else set()
+    return {tuple(tokens[i : i + n]) for i in range(len(tokens) - n + 1)}
+
+
+def containment(part: str, whole: str) -> float:
+    """Share of `part`'s 3-word sequences that also appear in `whole`."""
+    part_grams = _ngrams(tokenize(part))
+    if not part_grams:
+        return 0.0
+    return len(part_grams & _ngrams(tokenize(whole))) / len(part_grams)
+
+
+def tfidf_similarity(answer: str, context: str) -> float:
+    """Cosine between tf-idf vectors of the answer and the context, with idf
+    fitted on the context's sentences so terms every sentence repeats weigh
+    little and the distinctive ones weigh most."""
+    sentences = [s for s in SENTENCE_RE.split(context) if s.strip()]
+    document_frequency = Counter()
+    for sentence in sentences:
+        document_frequency.update(set(content_terms(sentence)))
+
+    def vector(text: str) -> dict:
+        counts = Counter(content_terms(text))
+        return {
+            term: count
+            * (math.log((len(sentences) + 1) / (document_frequency[term] + 1)) + 1)
+            for term, count in counts.items()
+        }
+
+    a, b = vector(answer), vector(context)
+    dot = sum(weight * b.get(term, 0.0) for term, weight in a.items())
+    norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(
+        sum(w * w for w in b.values())
+    )
+    return dot / norm if norm else 0.0
+
+
+def prescore(question: str, reference: str, answer: str) -> Optional[str]:
+    """Why the answer can be scored without the llm (EMPTY when it has no
+    letters or digits, REFERENCE_COPY when it is the reference answer), or
+    None when it needs a real evaluation."""
+    if not PRESCORE_ENABLED:
+        return None
+    if not any(c.isalnum() for c in answer):
+        return EMPTY
+    if (
+        containment(reference, answer) >= PRESCORE_COPY_THRESHOLD
+        and containment(answer, reference) >= PRESCORE_COPY_THRESHOLD
+    ):
+        return REFERENCE_COPY
+    return None
+
+
+def prescore_hint(question: str, reference: str, answer: str) -> Optional[str]:
+    """QUESTION_COPY or OFF_TOPIC when the answer looks like one. Too coarse
+    to score on (no stemming or synonyms), so it is only counted and the
+    answer still goes to the llm."""
+    if not PRESCORE_ENABLED:
+        return None
+    terms = content_terms(answer)
+    question_terms = set(content_terms(question))
+    if len([t for t in terms if t not in question_terms]) < PRESCORE_MIN_TERMS:
+        return QUESTION_COPY
+    if tfidf_similarity(answer, f"{question}\n{reference}") < PRESCORE_OFF_TOPIC_SIMILARITY:
+        return OFF_TOPIC
+    return None
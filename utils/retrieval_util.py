@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+from typing import Callable, List
+from collections import defaultdict
+from dotenv import load_dotenv
+from utils.cache_util import LRUCache
+from utils.metrics_util import increment
+from langchain_core.documents import Document
+from utils.chroma_util import get_vector_store
+from utils.vector_partition_util import class_filter
+from utils.bm25_util import (
+    BM25Index,
+    get_bm25_index,
+    set_bm25_index,
+    drop_bm25_index,
+    reciprocal_rank_fusion,
+)
+
+load_dotenv()
+
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", 1024))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", 3600))  # seconds
+
+# hybrid (bm25 + vectors fused with rrf) | vector | lexical
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# slower vector searches fall back to bm25 only ...
+VECTOR_SEARCH_TIMEOUT = float(os.getenv("VECTOR_SEARCH_TIMEOUT", 3))  # seconds
+# ... and vectors are skipped for this long after a failure or timeout
+VECTOR_SEARCH_COOLDOWN = float(os.getenv("VECTOR_SEARCH_COOLDOWN", 30))  # seconds
+
+# (kind, class id, query, k, mode, collection version) -> retrieved chunks
+retrieval_cache = LRUCache("retrieval", RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL)
+
+# bumped whenever a class's vectors of a kind change, so old entries stop matching
+_collection_versions = defaultdict(int)
+
+_vector_unavailable_until = 0.0
+
+
+def bump_collection_version(base: str, class_id: str):
+    _collection_versions[(base, class_id)] += 1
+
+
+def collection_version(base: str, class_id: str) -> int:
+    return _collection_versions[(base, class_id)]
+
+
+def _load_bm25_index(base: str, class_id: str) -> BM25Index:
+    index = get_bm25_index(base, class_id)
+    if index is None:
+        # built from the stored chunks, no embedding calls involved
+        found = get_vector_store(base, class_id).get(
+            where=class_filter(class_id), include=["documents", "metadatas"]
+        )
+        index = BM25Index()
+        index.add(
+            found["ids"],
+            [
+                Document(id=doc_id, page_content=text, metadata=meta or {})
+                for doc_id, text, meta in zip(
+                    found["ids"], found["documents"], found["metadatas"]
+                )
+            ],
+        )
+        set_bm25_index(base, class_id, index)
+    return index
+
+
+def index_chunks(
+    base: str,
+    class_id: str,
+    ids: List[str],
+    docs: List[Document],
+    replaces: Callable[[Document], bool],
+):
+    """Keep a loaded bm25 index in step with an upsert. Indexes that are not
+    loaded yet are built from the store on their first query."""
+    index = get_bm25_index(base, class_id)
+    if index is None:
+        return
+    index.remove_where(replaces)
+    index.add(ids, docs)
+
+
+def remove_chunks(base: str, class_id: str, predicate: Callable[[Document], bool]):
+    index = get_bm25_index(base, class_id)
+    if index is not None:
+        index.remove_where(predicate)
+
+
+def reset_lexical_index(base: str, class_id: str):
+    drop_bm25_index(base, class_id)
+
+
+def _doc_key(doc: Document) -> str:
+    return doc.id or doc.page_content
+
+
+async def _vector_search(base: str, class_id: str, query: str, k: int):
+    store = get_vector_store(base, class_id)
+    return await asyncio.wait_for(
+        asyncio.to_thread(store.similarity_search, query, k, class_filter(class_id)),
+        timeout=VECTOR_SEARCH_TIMEOUT,
+    )
+
+
+# single entry point for class-scoped retrieval, whatever the partitioning
+async def retrieve(
+    base: str, class_id: str, query: str, k: int, mode: str = RETRIEVAL_MODE
+) -> List[Document]:
+    global _vector_unavailable_until
+
+    normalized = " ".join(query.split())
+    key = (base, class_id, normalized, k, mode, collection_version(base, class_id))
+    docs = retrieval_cache.get(key)
+    if docs is not None:
+        return docs
+
+    if mode == "vector":
+        docs = await _vector_search(base, class_id, query, k)
+        retrieval_cache.set(key, docs)
+        return docs
+
+    index = await asyncio.to_thread(_load_bm25_index, base, class_id)
+    lexical = [(doc_id, doc) for doc_id, doc, _ in index.search(normalized, k * 2)]
+
+    vector = None
+    if mode == "hybrid" and time.monotonic() >= _vector_unavailable_until:
+        try:
+            vector = await _vector_search(base, class_id, query, k * 2)
+        except Exception as e:
+            print(f"Vector search unavailable, using lexical only: {e!r}")
+            _vector_unavailable_until = time.monotonic() + VECTOR_SEARCH_COOLDOWN
+            increment("retrieval.vector_fallback")
+
+    if vector is None:
+        docs = [doc for _, doc in lexical[:k]]
+        if mode == "hybrid":
+            # degraded answer, don't keep it once vectors are back
+            increment("retrieval.lexical_only")
+            return docs
+    else:
+        docs = reciprocal_rank_fusion(
+            [[(_doc_key(doc), doc) for doc in vector], lexical], k
+        )
+    retrieval_cache.set(key, docs)
+    return docs
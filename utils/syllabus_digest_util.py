@@ -0,0 +1,158 @@
+import re
+import math
+import hashlib
+from collections import Counter
+from typing import List, Optional, Set, Tuple
+from utils.bm25_util import tokenize
+
+# outline entries look like "Unit 3: Paging", "2.1 Scheduling" or "MODULE IV"
+HEADING_RE = re.compile(
+    r"^\s*(?:(?:unit|module|chapter|week|lecture|topic|section|part)\s*[\divxlc]+\b"
+    r"|\d+(?:\.\d+)*[.)]?\s+[A-Za-z])",
+    re.IGNORECASE,
+)
+MAX_HEADING_CHARS = 90
+MAX_OUTLINE_ENTRIES = 60
+KEY_TERMS = 40
+
+STOPWORDS = set(
+    """
+    a about above after again all also an and any are as at be because been
+    before being below between both but by can course credit credits did do
+    does doing during each etc few for from further had has have having here
+    how i if in into is it its lecture marks module more most no nor not of off
+    on once only or other our out over own per same semester should so some
+    student students such syllabus than that the their them then there these
+    they this those through to topic topics under unit until up use used using
+    very was we week were what when where which while who why will with within
+    you your
+    """.split()
+)
+
+
+def page_hash(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode()).hexdigest()
+
+
+# numbering like "3.1" or "iv" says nothing about the content
+NUMBERING_RE = re.compile(
+    r"[\d._-]+|(?=[ivxlcdm])m*(c[md]|d?c{0,3})(x[cl]|l?x{0,3})(i[xv]|v?i{0,3})"
+)
+
+
+def content_terms(text: str) -> List[str]:
+    return [
+        t
+        for t in tokenize(text)
+        if len(t) > 2 and t not in STOPWORDS and not NUMBERING_RE.fullmatch(t)
+    ]
+
+
+def _headings(text: str) -> List[str]:
+    headings = []
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if not line or len(line) > MAX_HEADING_CHARS:
+            continue
+        if HEADING_RE.match(line) or (line.isupper() and len(line.split()) <= 8):
+            headings.append(line.rstrip(".:"))
+    return headings
+
+
+def digest_page(text: str) -> dict:
+    """Headings and term counts of one syllabus page, stored per page so a
+    changed syllabus only re-digests the pages that changed."""
+    counts = Counter(content_terms(text))
+    return {
+        "hash": page_hash(text),
+        "headings": _headings(text),
+        "terms": dict(counts),
+    }
+
+
+def build_digest(
+    pages: List[str], previous: Optional[List[dict]] = None
+) -> Tuple[List[dict], List[str], List[str], int]:
+    """Returns (page entries, outline, key terms, pages re-digested)."""
+    known = {entry["hash"]: entry for entry in previous or []}
+    entries, changed = [], 0
+    for text in pages:
+        if not text.strip():
+            continue
+        entry = known.get(page_hash(text))
+        if entry is None:
+            entry = digest_page(text)
+            changed += 1
+        entries.append(entry)
+
+    outline = []
+    for entry in entries:
+        for heading in entry["headings"]:
+            if heading not in outline and len(outline) < MAX_OUTLINE_ENTRIES:
+                outline.append(heading)
+
+    # terms frequent in the syllabus but not spread over every page rank first
+    page_count = len(entries) or 1
+    totals, spread = Counter(), Counter()
+    for entry in entries:
+        totals.update(entry["terms"])
+        spread.update(entry["terms"].keys())
+    scores = {
+        term: count * math.log(1 + page_count / spread[term])
+        for term, count in totals.items()
+    }
+    key_terms, seen = [], set()
+    for term in sorted(scores, key=scores.get, reverse=True):
+        # "cs-301" and "cs301" are one key term
+        folded = re.sub(r"[-_.]", "", term)
+        if folded not in seen and len(key_terms) < KEY_TERMS:
+            seen.add(folded)
+            key_terms.append(term)
+    return entries, outline, key_terms, changed
+
+
+def digest_text(outline: List[str], key_terms: List[str]) -> str:
+    lines = []
+    if outline:
+        lines.append("Outline:")
+        lines.extend(f"- {heading}" for heading in outline)
+    if key_terms:
+        lines.append(f"Key terms: {', '.join(key_terms)}")
+    return "\n".join(lines)
+
+
+def digest_vocabulary(entries: List[dict], outline: List[str]) -> Set[str]:
+    vocabulary = set()
+    for entry in entries:
+        vocabulary.update(entry["terms"].keys())
+    for heading in outline:
+        vocabulary.update(content_terms(heading))
+    return vocabulary
+
+
+# inflections dropped before comparing terms ("deadlocks", "scheduler")
+SUFFIX_RE = re.compile(r"(?:ings?|ers?|ions?|ed|es|s)$")
+MIN_STEM = 4
+
+
+def stem(term: str) -> str:
+    stemmed = SUFFIX_RE.sub("", term)
+    return stemmed if len(stemmed) >= MIN_STEM else term
+
+
+def topic_in_scope(query: str, vocabulary: Set[str]) -> bool:
+    """False only when no content word of the query matches anything in the
+    syllabus, i.e. the topic is obviously out of scope. Words match when one
+    stem is a prefix of the other, so the check errs towards in scope."""
+    terms = {stem(t) for t in content_terms(query)}
+    if not terms or not vocabulary:
+        return True
+    stems = {stem(t) for t in vocabulary}
+    if not terms.isdisjoint(stems):
+        return True
+    return any(
+        a.startswith(b) or b.startswith(a)
+        for a in terms
+        for b in stems
+        if len(a) >= MIN_STEM and len(b) >= MIN_STEM
+    )
@@ -0,0 +1,9 @@
+import math
+
+# gemini averages about 4 characters per token for english text, close enough
+# for budgeting and cost tracking without a tokenizer round trip
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
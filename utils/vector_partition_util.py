@@ -0,0 +1,38 @@
+import os
+import zlib
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# how class vectors are spread over collections:
+#   global    -> one shared collection per kind, queries filter on class_id
+#   per_class -> one collection per class and kind, no filter needed
+#   sharded   -> VECTOR_SHARDS collections per kind, class routed by hash
+VECTOR_PARTITIONING = os.getenv("VECTOR_PARTITIONING", "global")
+VECTOR_SHARDS = int(os.getenv("VECTOR_SHARDS", 16))
+
+PARTITIONING_CHOICES = ("global", "per_class", "sharded")
+
+
+def route_collection(
+    base: str,
+    class_id: str,
+    partitioning: str = VECTOR_PARTITIONING,
+    shards: int = VECTOR_SHARDS,
+) -> str:
+    if partitioning == "per_class":
+        return f"{base}-{class_id}"
+    if partitioning == "sharded":
+        # crc32 is stable across processes, unlike hash()
+        return f"{base}-shard-{zlib.crc32(class_id.encode()) % shards}"
+    return base
+
+
+def class_filter(
+    class_id: str, partitioning: str = VECTOR_PARTITIONING
+) -> Optional[dict]:
+    # a per-class collection only ever holds that class
+    if partitioning == "per_class":
+        return None
+    return {"class_id": class_id}